@@ -2,15 +2,33 @@ import os
 import datetime
 from dotenv import load_dotenv
 from google.adk.agents import Agent
-from google.adk.tools import agent_tool
-from google.adk.tools import google_search
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
-from .youtube import get_youtube_transcript
-from .instruction import root_instruction, datetime_instruction, search_instruction, filesystem_instruction, fetch_instruction, youtube_instruction, dice_instruction, summary_instruction 
+from google.adk.agents.context_cache_config import ContextCacheConfig
+from google.adk.apps import App
+from .cache import ContentStore, default_cache_dir
+from .compaction import HistoryCompactor
+from .file_index import FileIndex
+from .lazy import lazy_agent_tool
+from .mcp_pool import MCPConnectionManager, MCPServerPool, stdio_server
+from .model_tiers import ModelTierPolicy, parse_tiers
+from .page_cache import PageCache
+from .parallel import ParallelAgentRunner
+from .resilience import ResilienceLayer, parse_timeouts
+from .response_cache import ResponseCache, gemini_embed, parse_ttls
+from .router import FastPathRouter
+from .summarize import MapReduceSummarizer, gemini_generate
+from . import tracing
+from .youtube import get_youtube_transcript, get_youtube_transcript_window, get_youtube_transcripts
+from .instruction import root_instruction, root_instruction_compact, datetime_instruction, search_instruction, filesystem_instruction, fetch_instruction, youtube_instruction, dice_instruction, summary_instruction 
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Record spans of agent runs, model calls and tool calls to a JSONL file and/or an OTLP collector.
+tracer = tracing.configure(
+    jsonl_path=os.getenv("TRACE_JSONL_PATH", os.path.join(default_cache_dir("traces"), "traces.jsonl")),
+    otlp_endpoint=os.getenv("TRACE_OTLP_ENDPOINT"),
+)
+
 # --- Configuration ---
 # Defines the target directory for the FileSystemAgent.
 # This path is loaded from the .env file.
@@ -18,6 +36,45 @@ TARGET_FOLDER_PATH = os.path.abspath(
     os.getenv("FILESYSTEM_TARGET_FOLDER_PATH", os.getcwd())
 )
 
+# Number of warm server processes kept for each MCP server.
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", 1))
+
+# Seconds an MCP server process may take to start and answer. `npx` and `uvx` may
+# download the server package on the first start, which takes longer than ADK's 5s default.
+MCP_STARTUP_TIMEOUT = float(os.getenv("MCP_STARTUP_TIMEOUT", 30))
+
+# Agents run on the cheapest model of their tiers and escalate to the next tier
+# when a response fails or has low confidence, or when a tool call fails.
+MODEL_TIER_MIN_CONFIDENCE = float(os.getenv("MODEL_TIER_MIN_CONFIDENCE", 0.5))
+
+root_model_tiers = ModelTierPolicy(
+    parse_tiers(os.getenv("ROOT_MODEL_TIERS", "gemini-2.5-flash-lite,gemini-2.5-flash")),
+    min_confidence=MODEL_TIER_MIN_CONFIDENCE,
+)
+sub_agent_model_tiers = ModelTierPolicy(
+    parse_tiers(os.getenv("SUB_AGENT_MODEL_TIERS", "gemini-2.0-flash-lite,gemini-2.5-flash")),
+    min_confidence=MODEL_TIER_MIN_CONFIDENCE,
+)
+SUB_AGENT_MODEL = sub_agent_model_tiers.tiers[0]
+
+# Prestarts the MCP servers and restarts them when they crash.
+mcp_manager = MCPConnectionManager(
+    health_check_interval=float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", 30)),
+)
+
+# Every sub-agent, tool function and MCP tool runs with a timeout adapted to its recent
+# latencies and a circuit breaker; transient errors of read-only tools are retried with
+# jitter. Failures come back as error results ('timeout', 'unavailable' or 'error')
+# instead of hanging the turn.
+resilience = ResilienceLayer(
+    min_timeout=float(os.getenv("TOOL_MIN_TIMEOUT", 5)),
+    max_timeout=float(os.getenv("TOOL_MAX_TIMEOUT", 120)),
+    max_timeouts=parse_timeouts(os.getenv("TOOL_MAX_TIMEOUTS", "")),
+    max_retries=int(os.getenv("TOOL_MAX_RETRIES", 2)),
+    failure_threshold=int(os.getenv("TOOL_FAILURE_THRESHOLD", 5)),
+    reset_timeout=float(os.getenv("TOOL_RESET_TIMEOUT", 30)),
+)
+
 # --- Tool Functions ---
 def get_current_datetime() -> str:
     """
@@ -28,117 +85,318 @@ def get_current_datetime() -> str:
 
     return f"Current Date and Time: {now.strftime('%Y-%m-%d %H:%M:%S')}"
 
+# Full-text index over the FileSystemAgent's target folder, refreshed incrementally on search.
+file_index = FileIndex(
+    TARGET_FOLDER_PATH,
+    refresh_interval=float(os.getenv("FILE_INDEX_REFRESH_INTERVAL", 5)),
+    snapshot_dir=os.getenv("FILE_INDEX_DIR", default_cache_dir("file_index")),
+)
+# Built from the last snapshot in a background thread, which then keeps it up to date.
+file_index.start()
+
+def search_file_contents(query: str, max_results: int = 10) -> dict:
+    """
+    Tool function that searches the contents and names of the files in the allowed directory.
+    Use it to find files by what they contain instead of listing and reading directories.
+
+    Args:
+        query: Words to search for.
+        max_results: Maximum number of files to return.
+
+    Returns:
+        A dict with a ranked 'results' list; each result has the absolute 'path', a relevance
+        'score' and 'snippets' holding the matching lines with their line numbers. While the
+        index is still being built, a dict with 'status' 'indexing' and a 'message' instead.
+    """
+    if not file_index.ready:
+        return {
+            "status": "indexing",
+            "files_indexed": file_index.stats()["files"],
+            "message": "The file index is still being built. List and read the directories instead, "
+                       "or search again in a minute.",
+        }
+    return {"results": file_index.search(query, max_results=max_results)}
+
+# Fetched pages as markdown, cached by normalized URL and revalidated with ETag/Last-Modified.
+page_cache = PageCache(
+    store=ContentStore(
+        os.getenv("PAGE_CACHE_DIR", default_cache_dir("pages")),
+        ttl=float(os.getenv("PAGE_CACHE_TTL", 7 * 24 * 60 * 60)),
+        max_bytes=int(os.getenv("PAGE_CACHE_MAX_MB", 256)) * 1024 * 1024,
+    ),
+    max_age=float(os.getenv("PAGE_CACHE_MAX_AGE", 5 * 60)),
+    respect_robots=os.getenv("PAGE_CACHE_ROBOTS_TXT", "respect") != "ignore",
+)
+
+# --- Fast-Path Handlers ---
+# Answer trivial requests routed by the FastPathRouter without any model call. The router
+# runs them in a worker thread, so the blocking transcript fetch doesn't stall the event loop.
+
+def answer_datetime(route) -> str:
+    if route.language == "ko":
+        return f"현재 날짜와 시간: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    return get_current_datetime()
+
+def answer_dice(route) -> str:
+    from .mcp.dice_engine import roll
+    results = roll(route.args["n_dice"])["dice"]
+    if route.language == "ko":
+        return f"주사위 {len(results)}개를 굴렸습니다: {results} (합계 {sum(results)})"
+    return f"Rolled {len(results)} dice: {results} (total {sum(results)})"
+
+def answer_youtube(route) -> str | None:
+    # A missing transcript raises, and the router falls back to the model, which can explain the failure.
+    return get_youtube_transcript(route.args["url"]) or None
+
+fast_path_router = FastPathRouter(
+    handlers={
+        "datetime": answer_datetime,
+        "dice": answer_dice,
+        "youtube": answer_youtube,
+    },
+    min_confidence=float(os.getenv("FAST_PATH_MIN_CONFIDENCE", 0.8)),
+)
+
+# --- MCP Servers ---
+# The pools are created here so they can be prestarted with the first request; their
+# toolsets, and the MCP client modules, are only created when the servers start.
+
+filesystem_server = mcp_manager.register(MCPServerPool(
+    name="filesystem",
+    connection_params=stdio_server(
+        command='npx',
+        args=[
+            "-y",
+            "@modelcontextprotocol/server-filesystem",
+            os.path.abspath(TARGET_FOLDER_PATH),
+        ],
+        timeout=MCP_STARTUP_TIMEOUT,
+    ),
+    size=MCP_POOL_SIZE,
+))
+
+fetch_server = mcp_manager.register(MCPServerPool(
+    name="fetch",
+    connection_params=stdio_server(
+        command='uvx',
+        args=[
+            "mcp-server-fetch"
+        ],
+        timeout=MCP_STARTUP_TIMEOUT,
+    ),
+    size=MCP_POOL_SIZE,
+))
+
+dice_server = mcp_manager.register(MCPServerPool(
+    name="dice",
+    connection_params=stdio_server(
+        command='python3',
+        args=[
+            os.path.abspath("./allinone/mcp/dice_roller.py"),
+        ],
+        timeout=MCP_STARTUP_TIMEOUT,
+    ),
+    size=MCP_POOL_SIZE,
+))
+
 # --- Agent Definitions ---
+# Sub-agents are built on their first call rather than at import, so starting the
+# process and answering requests that need no sub-agent don't pay for them.
+
+def instrument_sub_agent(agent) -> None:
+    """Applies the model tier policy and tracing to a sub-agent once it is built."""
+    sub_agent_model_tiers.instrument(agent)
+    tracer.instrument(agent)
 
 # Agent for handling date and time related queries.
-datetime_agent = Agent(
-    model='gemini-2.0-flash-lite',
-    name='DateTimeAgent',
-    instruction=datetime_instruction,
-    description="Agent for handling date and time queries",
-    tools=[get_current_datetime],
-)
+@lazy_agent_tool("DateTimeAgent", "Agent for handling date and time queries", [instrument_sub_agent])
+def datetime_agent(name, description):
+    return Agent(
+        model=SUB_AGENT_MODEL,
+        name=name,
+        instruction=datetime_instruction,
+        description=description,
+        tools=resilience.wrap_all([get_current_datetime], idempotent=True),
+    )
 
 # Agent for performing web searches using Google Search.
-search_agent = Agent(
-    model='gemini-2.0-flash-lite',
-    name='SearchAgent',
-    instruction=search_instruction,
-    description="Agent for performing web searches",
-    tools=[google_search],
-)
+# The search runs inside the model call, so it is bounded by the SearchAgent's own guard.
+@lazy_agent_tool("SearchAgent", "Agent for performing web searches", [instrument_sub_agent])
+def search_agent(name, description):
+    from google.adk.tools import google_search
+    return Agent(
+        model=SUB_AGENT_MODEL,
+        name=name,
+        instruction=search_instruction,
+        description=description,
+        tools=[google_search],
+    )
 
 # Agent for interacting with the local filesystem.
 # It uses the Model-Context-Protocol (MCP) to securely manage file operations.
-filesystem_agent = Agent(
-    model='gemini-2.0-flash-lite',
-    name='FileSystemAgent',
-    instruction=filesystem_instruction,
-    description="Agent for interacting with the local filesystem",
-    tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command='npx',
-                args=[
-                    "-y",
-                    "@modelcontextprotocol/server-filesystem",
-                    os.path.abspath(TARGET_FOLDER_PATH),
-                ],
-            ),
-        )
-    ],
-)
+@lazy_agent_tool("FileSystemAgent", "Agent for interacting with the local filesystem", [instrument_sub_agent])
+def filesystem_agent(name, description):
+    return Agent(
+        model=SUB_AGENT_MODEL,
+        name=name,
+        instruction=filesystem_instruction,
+        description=description,
+        tools=resilience.wrap_all([search_file_contents, filesystem_server], idempotent=True),
+    )
 
 # Agent for fetching and processing content from web pages.
-# It uses an MCP server to handle the fetching process.
-fetch_agent = Agent(
-    model='gemini-2.0-flash-lite',
-    name='fetch',
-    instruction=fetch_instruction,
-    description="Agent for fetching content from web pages",
-    tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command='uvx',
-                args=[
-                    "mcp-server-fetch"
-                ],
-            ),
-        )
-    ],
-)
+# Pages are read through the local page cache; the MCP fetch server is the fallback.
+@lazy_agent_tool("fetch", "Agent for fetching content from web pages", [instrument_sub_agent])
+def fetch_agent(name, description):
+    return Agent(
+        model=SUB_AGENT_MODEL,
+        name=name,
+        instruction=fetch_instruction,
+        description=description,
+        tools=resilience.wrap_all([page_cache.make_tool(), fetch_server], idempotent=True),
+    )
 
 # Agent for extracting transcripts from YouTube videos.
-youtube_agent = Agent(
-    model='gemini-2.0-flash-lite',
-    name='YouTubeAgent',
-    instruction=youtube_instruction,
-    description="Agent for extracting transcripts from YouTube videos",
-    tools=[get_youtube_transcript],
-)
+@lazy_agent_tool("YouTubeAgent", "Agent for extracting transcripts from YouTube videos", [instrument_sub_agent])
+def youtube_agent(name, description):
+    return Agent(
+        model=SUB_AGENT_MODEL,
+        name=name,
+        instruction=youtube_instruction,
+        description=description,
+        tools=resilience.wrap_all(
+            [get_youtube_transcript, get_youtube_transcript_window, get_youtube_transcripts], idempotent=True
+        ),
+    )
 
 # Agent for simulating dice rolls.
-# It uses an MCP server to roll virtual six-sided dice and return the results.
-dice_agent = Agent(
-    model='gemini-2.0-flash-lite',
-    name='DiceRoller',
-    instruction=dice_instruction,
-    description="Agent for rolling dice",
-    tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command='python3',
-                args=[
-                    os.path.abspath("./allinone/mcp/dice_roller.py"),
-                ],
-            ),
-        )
-    ],
+# It uses an MCP server that rolls dice in NdM+K notation with NumPy, from single rolls
+# to statistics over millions of dice.
+@lazy_agent_tool("DiceRoller", "Agent for rolling dice", [instrument_sub_agent])
+def dice_agent(name, description):
+    return Agent(
+        model=SUB_AGENT_MODEL,
+        name=name,
+        instruction=dice_instruction,
+        description=description,
+        tools=resilience.wrap_all([dice_server]),
+    )
+
+# Condenses long inputs (e.g. transcripts, fetched pages) with chunked map-reduce
+# summarization before they reach the SummaryAgent's model.
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gemini-2.0-flash-lite")
+
+summarizer = MapReduceSummarizer(
+    generate=gemini_generate(SUMMARY_MODEL),
+    model=SUMMARY_MODEL,
+    store=ContentStore(
+        os.getenv("SUMMARY_CACHE_DIR", default_cache_dir("summaries")),
+        ttl=30 * 24 * 60 * 60,
+        memory_entries=256,
+    ),
+    max_chunk_tokens=int(os.getenv("SUMMARY_CHUNK_TOKENS", 2000)),
+    threshold_tokens=int(os.getenv("SUMMARY_THRESHOLD_TOKENS", 8000)),
+    max_concurrency=int(os.getenv("SUMMARY_MAX_CONCURRENCY", 4)),
 )
 
 # Agent for summarizing text content.
-summary_agent = Agent(
-    model='gemini-2.0-flash-lite',
-    name='SummaryAgent',
-    instruction=summary_instruction,
-    description="Agent for summarizing text content",
+@lazy_agent_tool("SummaryAgent", "Agent for summarizing text content", [instrument_sub_agent])
+def summary_agent(name, description):
+    return Agent(
+        model=SUB_AGENT_MODEL,
+        name=name,
+        instruction=summary_instruction,
+        description=description,
+        before_model_callback=summarizer.before_model,
+    )
+
+# --- Response Cache ---
+# Serves repeated and near-duplicate questions without running the agent chain.
+# A similarity threshold of 0 disables the embedding tier.
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.92))
+
+response_cache = ResponseCache(
+    agent_ttls=parse_ttls(os.getenv("RESPONSE_CACHE_TTLS", "")),
+    default_ttl=float(os.getenv("RESPONSE_CACHE_DEFAULT_TTL", 10 * 60)),
+    embed=gemini_embed(os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "text-embedding-004"))
+    if RESPONSE_CACHE_SIMILARITY > 0 else None,
+    similarity_threshold=RESPONSE_CACHE_SIMILARITY,
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 512)),
+    file_index=file_index,
+)
+
+# --- History Compaction ---
+# Keeps long sessions within a token budget: large tool outputs of earlier turns are
+# replaced by stored references, and the oldest turns are folded into a rolling summary.
+history_compactor = HistoryCompactor(
+    store=ContentStore(
+        os.getenv("HISTORY_STORE_DIR", default_cache_dir("history")),
+        ttl=7 * 24 * 60 * 60,
+    ),
+    token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", 8000)),
+    summary_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", 1000)),
+    max_tool_tokens=int(os.getenv("HISTORY_MAX_TOOL_TOKENS", 500)),
+    keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", 2)),
 )
 
 # --- Root Agent ---
+# Each sub-agent is exposed to the root agent as a tool, built on its first call.
+sub_agent_tools = [
+    datetime_agent,
+    search_agent,
+    filesystem_agent,
+    fetch_agent,
+    youtube_agent,
+    dice_agent,
+    summary_agent,
+]
+
+# The root agent calls the sub-agents through their resilience guards. Sub-agent runs are
+# never retried: a run that timed out may have already made its model and tool calls.
+guarded_sub_agent_tools = resilience.wrap_all(sub_agent_tools)
+
+# Runs independent sub-agent calls concurrently when a request needs several agents.
+parallel_runner = ParallelAgentRunner(
+    guarded_sub_agent_tools,
+    max_concurrency=int(os.getenv("PARALLEL_MAX_CONCURRENCY", 4)),
+    timeout=float(os.getenv("PARALLEL_CALL_TIMEOUT", 60)),
+)
+
 # The main agent that orchestrates the other agents.
 # It analyzes the user's request and delegates the task to the most appropriate sub-agent.
+# The MCP servers are warmed up in the background while the root model picks a sub-agent.
+# Cached answers are served before the agent runs, and new answers are stored after it finishes.
+# Trivial requests are answered by the fast-path router before the root model is called,
+# and the history of the other requests is compacted before it is sent.
 root_agent = Agent(
     name="RootAgent",
-    model="gemini-2.5-flash",
-    instruction=root_instruction,
+    model=root_model_tiers.tiers[0],
+    instruction=root_instruction if os.getenv("ROOT_INSTRUCTION", "compact") == "full" else root_instruction_compact,
     description="Root Agent",
-    tools=[
-        agent_tool.AgentTool(agent=datetime_agent),
-        agent_tool.AgentTool(agent=search_agent),
-        agent_tool.AgentTool(agent=filesystem_agent),
-        agent_tool.AgentTool(agent=fetch_agent),
-        agent_tool.AgentTool(agent=youtube_agent),
-        agent_tool.AgentTool(agent=dice_agent),
-        agent_tool.AgentTool(agent=summary_agent),
-    ],
-)
\ No newline at end of file
+    before_agent_callback=[mcp_manager.warm_up, response_cache.before_agent],
+    before_model_callback=[fast_path_router.before_model, history_compactor.before_model],
+    after_model_callback=[response_cache.after_model],
+    after_tool_callback=[response_cache.after_tool],
+    after_agent_callback=[response_cache.after_agent],
+    tools=[*guarded_sub_agent_tools, parallel_runner.make_tool(), history_compactor.make_tool()],
+)
+
+# Apply the model tier policy and tracing; sub-agents get them when they are built.
+root_model_tiers.instrument(root_agent)
+tracer.instrument(root_agent)
+
+# --- App ---
+# Context caching keeps the static prefix of a session's requests (instruction, tool
+# declarations and earlier turns) in a Gemini cache, so repeated turns don't re-send it.
+# A TTL of 0 disables it.
+CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", 30 * 60))
+
+app = App(
+    name="allinone",
+    root_agent=root_agent,
+    context_cache_config=ContextCacheConfig(
+        ttl_seconds=CONTEXT_CACHE_TTL,
+        cache_intervals=int(os.getenv("CONTEXT_CACHE_INTERVALS", 10)),
+        min_tokens=int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", 0)),
+    ) if CONTEXT_CACHE_TTL > 0 else None,
+)
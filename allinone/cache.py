@@ -0,0 +1,314 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A small thread-safe in-memory mapping that evicts the least recently used entry
+    once `max_entries` is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def items(self) -> list:
+        """Returns a snapshot of the (key, value) pairs, least recently used first."""
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class ContentStore:
+    """
+    Content-addressed on-disk key/value store with an in-memory LRU front.
+
+    Values are stored once per distinct content under `objects/<sha256>`, and a JSON
+    index maps each key to its digest. Entries expire after `ttl` seconds, and the
+    least recently used keys are evicted once the stored objects exceed `max_bytes`.
+
+    Args:
+        directory: The directory holding the index and the objects.
+        ttl: Lifetime of an entry in seconds. None keeps entries until evicted.
+        max_bytes: Upper bound for the total size of the stored objects.
+        memory_entries: Number of values kept in the in-memory LRU front.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory: str, ttl: float | None = None,
+                 max_bytes: int = 256 * 1024 * 1024, memory_entries: int = 64):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memory = LRUCache(memory_entries)
+        self._lock = threading.RLock()
+        self._index = self._load_index()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- Public API ---
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the value stored under `key`, or None on a miss or an expired entry."""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str) -> tuple[bytes, dict] | None:
+        """Returns `(value, metadata)` for `key`, or None on a miss or an expired entry."""
+        with self._lock:
+            found = self._lookup(key)
+            if found is None:
+                return None
+            record, (_, data, _) = found
+            return data, record.get("metadata", {})
+
+    def get_decoded(self, key: str, decode):
+        """
+        Returns `decode(value)` for `key`, or None on a miss or an expired entry.
+        The decoded value is kept beside the raw one in the in-memory front, so later
+        reads skip decoding. `decode` must not return None.
+        """
+        with self._lock:
+            found = self._lookup(key)
+        if found is None:
+            return None
+        record, (digest, data, decoded) = found
+        if decoded is None:
+            decoded = decode(data)
+            with self._lock:
+                if self._index.get(key) is record:
+                    self._memory.put(key, (digest, data, decoded))
+        return decoded
+
+    def put(self, key: str, data: bytes, metadata: dict | None = None, decoded=None) -> str:
+        """
+        Stores `data` under `key` and returns its content digest. `decoded` optionally
+        seeds the value `get_decoded()` returns until the entry leaves the memory front.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            path = self._object_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+
+            if key in self._index:
+                self._remove_key(key)
+            now = time.time()
+            self._index[key] = {
+                "digest": digest,
+                "size": len(data),
+                "stored_at": now,
+                "accessed_at": now,
+                "metadata": metadata or {},
+            }
+            self._memory.put(key, (digest, data, decoded))
+            self._evict()
+            self._save_index()
+        return digest
+
+    def contains(self, key: str) -> bool:
+        """Returns whether `key` holds an unexpired value, without reading it."""
+        with self._lock:
+            record = self._index.get(key)
+            return record is not None and not self._is_expired(record) \
+                and os.path.exists(self._object_path(record["digest"]))
+
+    def touch(self, key: str, metadata: dict | None = None) -> None:
+        """Renews the lifetime of `key`, optionally replacing its metadata."""
+        with self._lock:
+            record = self._index.get(key)
+            if record is None:
+                return
+            record["stored_at"] = record["accessed_at"] = time.time()
+            if metadata is not None:
+                record["metadata"] = metadata
+            self._save_index()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._index:
+                self._remove_key(key)
+                self._save_index()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current size of the store."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total_bytes(),
+            }
+
+    # --- Internals ---
+
+    def _lookup(self, key: str):
+        """
+        Returns the index record of `key` and its `(digest, value, decoded)` memory entry,
+        reading the value from disk when it is not in memory, or None on a miss. Counts
+        the hit or miss. Must be called with the lock held.
+        """
+        record = self._index.get(key)
+        if record is None or self._is_expired(record):
+            if record is not None:
+                self._remove_key(key)
+                self._save_index()
+            self.misses += 1
+            return None
+
+        record["accessed_at"] = time.time()
+        cached = self._memory.get(key)
+        if cached is not None and cached[0] == record["digest"]:
+            self.hits += 1
+            self.memory_hits += 1
+            return record, cached
+
+        try:
+            with open(self._object_path(record["digest"]), "rb") as f:
+                data = f.read()
+        except OSError:
+            # The object was removed behind our back; drop the dangling key.
+            self._remove_key(key)
+            self._save_index()
+            self.misses += 1
+            return None
+
+        cached = (record["digest"], data, None)
+        self._memory.put(key, cached)
+        self.hits += 1
+        return record, cached
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def _is_expired(self, record: dict) -> bool:
+        return self.ttl is not None and time.time() - record["stored_at"] > self.ttl
+
+    def _total_bytes(self) -> int:
+        sizes = {record["digest"]: record["size"] for record in self._index.values()}
+        return sum(sizes.values())
+
+    def _remove_key(self, key: str) -> None:
+        record = self._index.pop(key)
+        self._memory.pop(key)
+        # Objects are shared between keys with identical content.
+        if not any(r["digest"] == record["digest"] for r in self._index.values()):
+            try:
+                os.remove(self._object_path(record["digest"]))
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        for key in [k for k, r in self._index.items() if self._is_expired(r)]:
+            self._remove_key(key)
+            self.evictions += 1
+        while self._index and self._total_bytes() > self.max_bytes:
+            oldest = min(self._index, key=lambda k: self._index[k]["accessed_at"])
+            self._remove_key(oldest)
+            self.evictions += 1
+
+    def _load_index(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, self.INDEX_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self.INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, path)
+
+
+class TranscriptCache:
+    """
+    Caches fetched YouTube transcript segments keyed by (video_id, language_code).
+
+    Reads return the segments together with their start times. Both are decoded once
+    and kept beside the stored JSON in the store's in-memory front, so time-window reads
+    neither decode the transcript again nor rebuild the start times.
+    """
+
+    def __init__(self, store: ContentStore):
+        self.store = store
+
+    @staticmethod
+    def _key(video_id: str, language_code: str) -> str:
+        return f"{video_id}:{language_code}"
+
+    @staticmethod
+    def _timeline(segments: list[dict]) -> tuple[list[dict], list[float]]:
+        return segments, [segment["start"] for segment in segments]
+
+    def get(self, video_id: str, language_code: str) -> list[dict] | None:
+        timeline = self.get_timeline(video_id, language_code)
+        return timeline[0] if timeline else None
+
+    def get_timeline(self, video_id: str, language_code: str) -> tuple[list[dict], list[float]] | None:
+        """Returns the segments and their start times, or None on a miss or an expired entry."""
+        return self.store.get_decoded(self._key(video_id, language_code),
+                                      lambda data: self._timeline(json.loads(data)))
+
+    def put(self, video_id: str, language_code: str, segments: list[dict]) -> tuple[list[dict], list[float]]:
+        """Stores the segments and returns them with their start times."""
+        data = json.dumps(segments, ensure_ascii=False).encode("utf-8")
+        timeline = self._timeline(segments)
+        self.store.put(self._key(video_id, language_code), data, decoded=timeline)
+        return timeline
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+def default_cache_dir(name: str) -> str:
+    """Returns the default directory for the cache called `name`."""
+    base = os.getenv("GEMAGENT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "gemagent"))
+    return os.path.join(base, name)
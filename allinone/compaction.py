@@ -0,0 +1,265 @@
+import hashlib
+import json
+from google.genai import types
+from .cache import ContentStore
+from .summarize import estimate_tokens
+
+SUMMARY_HEADER = "Summary of the earlier conversation (oldest first):\n"
+
+# Session state key holding the number of leading turns folded into the summary.
+FOLDED_TURNS_STATE_KEY = "history_folded_turns"
+
+# Session state key holding the number of leading turns whose tool outputs are references.
+REFERENCED_TURNS_STATE_KEY = "history_referenced_turns"
+
+
+def _response_text(response) -> str:
+    """Returns the text of a function response, unwrapping {'result': '...'} from agent tools."""
+    if isinstance(response, dict) and len(response) == 1 and isinstance(next(iter(response.values())), str):
+        return next(iter(response.values()))
+    return json.dumps(response, ensure_ascii=False, default=str)
+
+
+def _part_tokens(part) -> int:
+    if part.text:
+        return estimate_tokens(part.text)
+    if part.function_call:
+        return estimate_tokens(json.dumps(part.function_call.args or {}, ensure_ascii=False, default=str))
+    if part.function_response:
+        return estimate_tokens(_response_text(part.function_response.response))
+    return 0
+
+
+def _contents_tokens(contents) -> int:
+    return sum(_part_tokens(part) for content in contents for part in content.parts or [])
+
+
+def _is_user_message(content) -> bool:
+    parts = content.parts or []
+    return content.role == "user" and any(part.text for part in parts) \
+        and not any(part.function_response for part in parts)
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "…"
+
+
+class HistoryCompactor:
+    """
+    Keeps the history sent to the model within a token budget in long sessions.
+
+    Two steps run before every model call of the agent:
+
+    - Large tool outputs of earlier turns (e.g. transcripts, fetched pages) are moved
+      to `store` and replaced by a reference ID and a short excerpt. The model can
+      read them back with the tool returned by `make_tool()`. Outputs inside the
+      prefix held by the context cache are only replaced once none of them is, or
+      when turns are folded, which rewrites the prefix anyway; replacing them one
+      turn at a time would invalidate the cache on every turn.
+    - Once the history exceeds `token_budget`, the oldest turns are folded into a
+      rolling extractive summary of at most `summary_tokens`, leaving half the budget
+      for recent turns, so a request stays below about `token_budget + summary_tokens`.
+      The folded turn count is kept in the session state, so the summary only changes
+      when more turns are folded and the request prefix stays stable for context
+      caching in between.
+
+    Only the request is compacted; the session keeps the full events.
+
+    Args:
+        store: Store holding the original tool outputs.
+        token_budget: Estimated tokens of history above which early turns are folded.
+        summary_tokens: Upper bound for the estimated tokens of the rolling summary.
+        max_tool_tokens: Tool outputs of earlier turns above this are replaced by a reference.
+        keep_turns: Number of most recent turns that are never folded.
+    """
+
+    def __init__(self, store: ContentStore, token_budget: int = 8000, summary_tokens: int = 1000,
+                 max_tool_tokens: int = 500, keep_turns: int = 2):
+        self.store = store
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.max_tool_tokens = max_tool_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.references_created = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    # --- Callbacks ---
+
+    def before_model(self, callback_context, llm_request):
+        contents = llm_request.contents
+        starts = [i for i, content in enumerate(contents) if _is_user_message(content)]
+        if not starts:
+            return None
+        self.tokens_before += _contents_tokens(contents)
+
+        # Turns folded earlier are only summarized. Tool outputs of the current turn stay
+        # intact, since the model is working with them, and so do those of the turns from
+        # `referenced` on while the context cache holds any of them.
+        current = len(starts) - 1
+        folded = max(0, min(callback_context.state.get(FOLDED_TURNS_STATE_KEY, 0), len(starts) - self.keep_turns))
+        referenced = min(max(folded, callback_context.state.get(REFERENCED_TURNS_STATE_KEY, 0)), current)
+        cached = self._cached_contents(llm_request, starts, folded)
+        if not any(self._has_large_output(content) for content in contents[starts[referenced]:min(cached, starts[current])]):
+            referenced = current
+        contents = self._referenced(contents, starts, folded, referenced)
+
+        ends = starts[1:] + [len(contents)]
+        turn_tokens = {k: _contents_tokens(contents[starts[k]:ends[k]]) for k in range(folded, len(starts))}
+        total = sum(turn_tokens.values())
+        if total > self.token_budget and referenced < current:
+            # Folding would rewrite the cached prefix anyway, so first try replacing every
+            # earlier output.
+            referenced = current
+            contents = self._referenced(contents, starts, folded, referenced)
+            turn_tokens = {k: _contents_tokens(contents[starts[k]:ends[k]]) for k in range(folded, len(starts))}
+            total = sum(turn_tokens.values())
+        if total > self.token_budget:
+            while folded < len(starts) - self.keep_turns and total > self.token_budget // 2:
+                total -= turn_tokens[folded]
+                folded += 1
+            callback_context.state[FOLDED_TURNS_STATE_KEY] = folded
+        if referenced != callback_context.state.get(REFERENCED_TURNS_STATE_KEY, 0):
+            callback_context.state[REFERENCED_TURNS_STATE_KEY] = referenced
+
+        if folded > 0:
+            first = contents[starts[folded]]
+            summary = types.Part(text=SUMMARY_HEADER + self._summarize(contents[:starts[folded]], starts[:folded]))
+            contents = [types.Content(role="user", parts=[summary, *(first.parts or [])]),
+                        *contents[starts[folded] + 1:]]
+
+        llm_request.contents = contents
+        self.tokens_after += _contents_tokens(contents)
+        return None
+
+    # --- References ---
+
+    @staticmethod
+    def _cached_contents(llm_request, starts, folded) -> int:
+        """
+        Returns the number of leading contents, counted before folding, that the context
+        cache holds or fingerprints. The cache metadata counts the contents as sent, in
+        which the folded turns and the first kept message are a single content.
+        """
+        metadata = getattr(llm_request, "cache_metadata", None)
+        if metadata is None:
+            return 0
+        return metadata.contents_count + (starts[folded] if folded else 0)
+
+    def _referenced(self, contents, starts, folded, referenced):
+        """Replaces the large tool outputs of the turns from `folded` up to `referenced`."""
+        return contents[:starts[folded]] \
+            + [self._with_references(content) for content in contents[starts[folded]:starts[referenced]]] \
+            + contents[starts[referenced]:]
+
+    def _is_large_output(self, part) -> bool:
+        return bool(part.function_response) and _part_tokens(part) > self.max_tool_tokens
+
+    def _has_large_output(self, content) -> bool:
+        return any(self._is_large_output(part) for part in content.parts or [])
+
+    def _with_references(self, content):
+        if not self._has_large_output(content):
+            return content
+        new_parts = []
+        for part in content.parts or []:
+            if self._is_large_output(part):
+                response = part.function_response
+                text = _response_text(response.response)
+                new_parts.append(types.Part(function_response=types.FunctionResponse(
+                    id=response.id,
+                    name=response.name,
+                    response={
+                        "reference_id": self._store(text),
+                        "excerpt": _shorten(text, 400),
+                        "original_tokens": estimate_tokens(text),
+                        "note": "Output stored by reference; call expand_reference to read it in full.",
+                    },
+                )))
+            else:
+                new_parts.append(part)
+        return types.Content(role=content.role, parts=new_parts)
+
+    def _store(self, text: str) -> str:
+        data = text.encode("utf-8")
+        reference_id = hashlib.sha256(data).hexdigest()[:16]
+        # The store may have evicted or expired an output referenced earlier.
+        if not self.store.contains(reference_id):
+            self.store.put(reference_id, data)
+            self.references_created += 1
+        return reference_id
+
+    def expand(self, reference_id: str, start: int = 0, max_chars: int = 20000) -> dict:
+        """Returns up to `max_chars` characters of a stored output, starting at `start`."""
+        data = self.store.get(reference_id.strip())
+        if data is None:
+            return {"error": f"Unknown or expired reference '{reference_id}'."}
+        text = data.decode("utf-8")
+        end = start + max_chars
+        return {
+            "content": text[start:end],
+            "total_chars": len(text),
+            "next_start": end if end < len(text) else None,
+        }
+
+    def make_tool(self):
+        """Returns the function tool that reads stored outputs back."""
+
+        def expand_reference(reference_id: str, start: int = 0, max_chars: int = 20000) -> dict:
+            """
+            Returns the full text of an earlier tool output that was replaced by a reference
+            to keep the conversation short. Use it when the excerpt is not enough.
+
+            Args:
+                reference_id: The 'reference_id' of the replaced output.
+                start: Character offset to start reading from, for outputs longer than max_chars.
+                max_chars: Maximum number of characters to return.
+
+            Returns:
+                A dict with the 'content', the 'total_chars' of the output and the 'next_start'
+                offset of the remaining text (None at the end), or an 'error'.
+            """
+            return self.expand(reference_id, start, max_chars)
+
+        return expand_reference
+
+    # --- Summary ---
+
+    def _summarize(self, contents, starts) -> str:
+        """Builds one line per folded turn and keeps the most recent lines that fit the budget."""
+        lines = []
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else len(contents)
+            request = "".join(part.text or "" for part in contents[start].parts or [])
+            tools, answer = [], ""
+            for content in contents[start + 1:end]:
+                for part in content.parts or []:
+                    if part.function_call:
+                        tools.append(part.function_call.name)
+                    elif part.text and content.role == "model":
+                        answer = part.text
+            line = f"- User: {_shorten(request, 200)}"
+            if tools:
+                line += f" | Used: {', '.join(dict.fromkeys(tools))}"
+            if answer:
+                line += f" | Answer: {_shorten(answer, 300)}"
+            lines.append(line)
+
+        kept, tokens = [], 0
+        for line in reversed(lines):
+            tokens += estimate_tokens(line)
+            if tokens > self.summary_tokens:
+                break
+            kept.append(line)
+        omitted = len(lines) - len(kept)
+        header = [f"- ({omitted} earlier turns omitted)"] if omitted else []
+        return "\n".join(header + kept[::-1])
+
+    def stats(self) -> dict:
+        return {
+            "references_created": self.references_created,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_before - self.tokens_after,
+        }
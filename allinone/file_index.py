@@ -0,0 +1,309 @@
+import hashlib
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from collections import Counter
+
+# Directories that are never worth indexing.
+SKIPPED_DIRECTORIES = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+# Changed files are tokenized in batches of this many outside the lock, so searches
+# running during a refresh wait for one batch at most.
+BATCH_FILES = 1000
+
+# Bumped whenever the layout of the snapshot file changes.
+SNAPSHOT_VERSION = 1
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase word tokens (Unicode-aware, so Korean words are kept)."""
+    return re.findall(r"\w+", text.lower())
+
+
+class FileIndex:
+    """
+    Incremental inverted index over the text files below a root directory.
+
+    `refresh()` walks the tree and reindexes only the files whose mtime or size changed,
+    and drops the files that disappeared. `search()` ranks files with BM25 and returns
+    the matching lines as snippets; it never touches the tree itself.
+
+    `start()` builds the index in a background thread and keeps refreshing it there every
+    `refresh_interval` seconds, so no search pays for a walk. With a `snapshot_dir`, the
+    postings and the (mtime_ns, size) of every file are saved after each change and loaded
+    on the next start, so a new process only reindexes the files that changed meanwhile.
+
+    Args:
+        root: The directory to index.
+        max_file_bytes: Larger files are skipped.
+        refresh_interval: Seconds between the background refreshes.
+        snapshot_dir: Directory holding the saved index. None keeps it in memory only.
+    """
+
+    def __init__(self, root: str, max_file_bytes: int = 1024 * 1024, refresh_interval: float = 5.0,
+                 snapshot_dir: str | None = None):
+        self.root = os.path.abspath(root)
+        self.max_file_bytes = max_file_bytes
+        self.refresh_interval = refresh_interval
+        self.snapshot_path = None
+        if snapshot_dir:
+            name = hashlib.sha256(self.root.encode("utf-8")).hexdigest()[:16]
+            self.snapshot_path = os.path.join(snapshot_dir, f"{name}.pickle")
+        self._stats = {}          # path -> (mtime_ns, size)
+        self._file_tokens = {}    # path -> tokens of the file
+        self._lengths = {}        # path -> number of tokens
+        self._postings = {}       # token -> {path: number of occurrences}
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        # Incremented whenever a refresh finds a change, so callers can tell the tree changed.
+        self.generation = 0
+
+    @property
+    def ready(self) -> bool:
+        """Whether the first refresh has finished, so searches cover the whole tree."""
+        return self._ready.is_set()
+
+    # --- Background Refresh ---
+
+    def start(self) -> None:
+        """Starts building and refreshing the index in a daemon thread. Idempotent."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="file-index", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stops the background thread after its current refresh."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Blocks until the first refresh has finished; returns whether it has."""
+        return self._ready.wait(timeout)
+
+    def _run(self) -> None:
+        self.load()
+        while not self._stop.is_set():
+            try:
+                changes = self.refresh()
+                if changes["added"] or changes["updated"] or changes["removed"]:
+                    self.save()
+            except Exception as e:
+                print(f"Error refreshing the file index of {self.root}: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    # --- Snapshot ---
+
+    def save(self) -> None:
+        """Writes the index to the snapshot file, if there is one."""
+        if not self.snapshot_path:
+            return
+        # Only refreshes change the index, so holding their lock keeps searches running.
+        with self._refresh_lock:
+            data = pickle.dumps({
+                "version": SNAPSHOT_VERSION,
+                "root": self.root,
+                "max_file_bytes": self.max_file_bytes,
+                "stats": self._stats,
+                "lengths": self._lengths,
+                "postings": self._postings,
+            }, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def load(self) -> bool:
+        """
+        Replaces the index with the snapshot file, if one matches this root and file size limit.
+        The next `refresh()` reindexes the files that changed since it was saved.
+
+        Returns:
+            Whether a snapshot was loaded.
+        """
+        if not self.snapshot_path:
+            return False
+        try:
+            # The snapshot is private to this user's cache directory, like the other caches.
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+            if (snapshot["version"], snapshot["root"], snapshot["max_file_bytes"]) != \
+                    (SNAPSHOT_VERSION, self.root, self.max_file_bytes):
+                return False
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+            return False
+
+        file_tokens = {path: [] for path in snapshot["stats"]}
+        for token, postings in snapshot["postings"].items():
+            for path in postings:
+                file_tokens[path].append(token)
+        with self._refresh_lock, self._lock:
+            self._stats = snapshot["stats"]
+            self._lengths = snapshot["lengths"]
+            self._file_tokens = {path: tuple(tokens) for path, tokens in file_tokens.items()}
+            self._postings = snapshot["postings"]
+            self.generation += 1
+        return True
+
+    # --- Indexing ---
+
+    def refresh(self) -> dict:
+        """
+        Brings the index up to date with the files on disk. Blocking; the background
+        thread calls it, but it can also be called directly.
+
+        Returns:
+            The number of added, updated and removed files, and the seconds it took.
+        """
+        start = time.perf_counter()
+        with self._refresh_lock:
+            # Only refreshes change `_stats`, so the walk can read it without the lock.
+            seen, changed, added = set(), [], 0
+            for path, stat in self._walk():
+                seen.add(path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                previous = self._stats.get(path)
+                if previous != signature:
+                    changed.append((path, signature))
+                    added += previous is None
+            removed = [path for path in self._stats if path not in seen]
+
+            for i in range(0, len(changed), BATCH_FILES):
+                batch = [(path, signature, self._read(path, signature[1]))
+                         for path, signature in changed[i:i + BATCH_FILES]]
+                with self._lock:
+                    for path, signature, counts in batch:
+                        self._remove(path)
+                        self._stats[path] = signature
+                        self._index(path, counts)
+            with self._lock:
+                for path in removed:
+                    self._remove(path)
+                    del self._stats[path]
+                if changed or removed:
+                    self.generation += 1
+            self._ready.set()
+
+        return {"added": added, "updated": len(changed) - added, "removed": len(removed),
+                "seconds": time.perf_counter() - start}
+
+    def _walk(self):
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIPPED_DIRECTORIES and not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.path, entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+
+    def _read(self, path: str, size: int) -> Counter:
+        """Returns the token counts of a file. Reads the file, so it runs outside the lock."""
+        # The file name is indexed too, so files can be found by name.
+        counts = Counter(tokenize(os.path.basename(path)))
+
+        if size <= self.max_file_bytes:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = b""
+            # Skip binary files.
+            if b"\0" not in data[:1024]:
+                counts.update(tokenize(data.decode("utf-8", errors="ignore")))
+        return counts
+
+    def _index(self, path: str, counts: Counter) -> None:
+        self._file_tokens[path] = tuple(counts)
+        self._lengths[path] = sum(counts.values())
+        for token, frequency in counts.items():
+            self._postings.setdefault(token, {})[path] = frequency
+
+    def _remove(self, path: str) -> None:
+        for token in self._file_tokens.pop(path, {}):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(path, None)
+                if not postings:
+                    del self._postings[token]
+        self._lengths.pop(path, None)
+
+    # --- Search ---
+
+    def search(self, query: str, max_results: int = 10, max_snippets: int = 3) -> list[dict]:
+        """
+        Finds the files that best match the query.
+
+        Args:
+            query: Words to search for.
+            max_results: Maximum number of files to return.
+            max_snippets: Maximum number of matching lines returned per file.
+
+        Returns:
+            A ranked list of dicts with 'path', 'score' and 'snippets' ({'line', 'text'}).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            n_files = len(self._lengths)
+            if not terms or not n_files:
+                return []
+            avg_length = sum(self._lengths.values()) / n_files or 1.0
+
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term, {})
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_files - len(postings) + 0.5) / (len(postings) + 0.5))
+                for path, frequency in postings.items():
+                    norm = K1 * (1 - B + B * self._lengths[path] / avg_length)
+                    scores[path] = scores.get(path, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:max_results]
+
+        # Matching lines are only located for the returned files, which keeps indexing cheap.
+        return [
+            {"path": path, "score": round(score, 3), "snippets": self._snippets(path, set(terms), max_snippets)}
+            for path, score in ranked
+        ]
+
+    def _snippets(self, path: str, terms: set[str], max_snippets: int) -> list[dict]:
+        snippets = []
+        try:
+            if os.path.getsize(path) > self.max_file_bytes:
+                return snippets
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if terms.intersection(tokenize(line)):
+                        snippets.append({"line": line_number, "text": line.strip()[:200]})
+                        if len(snippets) >= max_snippets:
+                            break
+        except OSError:
+            pass
+        return snippets
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._stats), "terms": len(self._postings), "generation": self.generation,
+                    "ready": self.ready}
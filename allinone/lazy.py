@@ -0,0 +1,79 @@
+import threading
+from typing import Callable
+from google.adk.tools.base_tool import BaseTool
+from google.genai import types
+
+
+class LazyAgentTool(BaseTool):
+    """
+    Exposes a sub-agent to the root agent as a tool without building it at startup.
+
+    The root model only needs the tool's name, description and `request` parameter,
+    the same declaration `AgentTool` produces. The agent itself, with its model client
+    and toolsets, is built by `factory` on the first call, wrapped in an `AgentTool`
+    and reused afterwards. Requests that never reach a sub-agent (fast path, cache
+    hits, direct answers) therefore never build one.
+
+    Args:
+        name: Name of the agent, which is the tool name seen by the root model.
+        description: Description of the agent, shown to the root model.
+        factory: Function returning the agent; called once, on first use.
+        build_hooks: Functions called with the agent right after it is built
+            (e.g. to add callbacks). More can be appended before the first call.
+    """
+
+    def __init__(self, name: str, description: str, factory: Callable, build_hooks: list[Callable] | None = None):
+        super().__init__(name=name, description=description)
+        self.factory = factory
+        self.build_hooks = list(build_hooks or [])
+        self._agent_tool = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_built(self) -> bool:
+        return self._agent_tool is not None
+
+    @property
+    def agent_tool(self):
+        """The `AgentTool` wrapping the agent, built on first access."""
+        if self._agent_tool is None:
+            with self._lock:
+                if self._agent_tool is None:
+                    from google.adk.tools.agent_tool import AgentTool
+                    agent = self.factory()
+                    if agent.name != self.name:
+                        raise ValueError(f"Factory of '{self.name}' built an agent named '{agent.name}'.")
+                    for hook in self.build_hooks:
+                        hook(agent)
+                    self._agent_tool = AgentTool(agent=agent)
+        return self._agent_tool
+
+    @property
+    def agent(self):
+        return self.agent_tool.agent
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=types.Schema(
+                type=types.Type.OBJECT,
+                properties={"request": types.Schema(type=types.Type.STRING)},
+                required=["request"],
+            ),
+        )
+
+    async def run_async(self, *, args, tool_context):
+        return await self.agent_tool.run_async(args=args, tool_context=tool_context)
+
+
+def lazy_agent_tool(name: str, description: str, build_hooks: list[Callable] | None = None):
+    """
+    Decorator turning an agent factory into a `LazyAgentTool`. The factory is called
+    with the name and description, so they are declared in one place.
+    """
+
+    def decorator(factory):
+        return LazyAgentTool(name, description, lambda: factory(name=name, description=description), build_hooks)
+
+    return decorator
@@ -0,0 +1,178 @@
+import re
+import secrets
+import numpy as np
+
+# --- Limits ---
+# Dice are generated in blocks of CHUNK_DICE, so memory stays bounded however many
+# dice a call rolls; the caps bound the work and the size of the answers.
+
+# Dice generated per block.
+CHUNK_DICE = 1_000_000
+# Dice per call, for totals and statistics.
+MAX_DICE = 100_000_000
+# Individual dice (and roll totals) listed in an answer.
+MAX_LISTED_DICE = 1000
+# Sides per die.
+MAX_SIDES = 1_000_000
+# Absolute value of the +K/-K modifier.
+MAX_MODIFIER = 1_000_000_000
+# Buckets per histogram; larger histograms are left out of the statistics.
+MAX_HISTOGRAM_BINS = 1000
+
+NOTATION = re.compile(r"^\s*(\d*)\s*d\s*(\d+)\s*(?:([+-])\s*(\d+))?\s*$", re.IGNORECASE)
+
+def parse_notation(notation: str) -> tuple[int, int, int]:
+    """
+    Parses dice notation such as "3d6", "d20" or "2d8+3".
+
+    Args:
+        notation: The dice expression in NdM+K (or NdM-K) form; N defaults to 1.
+
+    Returns:
+        A tuple of (number of dice, sides per die, modifier).
+    """
+    match = NOTATION.match(notation)
+    if not match:
+        raise ValueError(f"Invalid dice notation '{notation}'; expected NdM+K, e.g. '3d6' or '2d20+5'.")
+    count, sides, sign, modifier = match.groups()
+    count = int(count) if count else 1
+    modifier = int(modifier or 0) * (-1 if sign == "-" else 1)
+    _check_dice(count, int(sides))
+    if abs(modifier) > MAX_MODIFIER:
+        raise ValueError(f"The modifier must be at most {MAX_MODIFIER} in absolute value.")
+    return count, int(sides), modifier
+
+def _check_dice(count: int, sides: int, rolls: int = 1, limit: int = MAX_DICE) -> None:
+    if count < 1 or rolls < 1:
+        raise ValueError("At least one die must be rolled.")
+    if not 2 <= sides <= MAX_SIDES:
+        raise ValueError(f"Dice must have between 2 and {MAX_SIDES} sides.")
+    if count * rolls > limit:
+        raise ValueError(f"At most {limit} dice can be rolled per call ({count * rolls} requested).")
+
+def _generator(seed: int | None) -> tuple[np.random.Generator, int]:
+    """Returns a generator and its seed; without a seed a random one is drawn so the roll can be repeated."""
+    if seed is None:
+        seed = secrets.randbelow(2**32)
+    return np.random.default_rng(seed), seed
+
+def _blocks(rng: np.random.Generator, count: int, sides: int, rolls: int):
+    """
+    Rolls `rolls` times `count` dice in blocks of at most CHUNK_DICE dice.
+
+    Yields:
+        Tuples of (faces, totals): the faces of the block and the sums (without modifier)
+        of the rolls that the block completes. A roll of more than CHUNK_DICE dice spans
+        several blocks, of which only the last has its total.
+    """
+    dtype = np.uint8 if sides <= 0xFF else np.uint16 if sides <= 0xFFFF else np.uint32
+    if count <= CHUNK_DICE:
+        per_block = CHUNK_DICE // count
+        for done in range(0, rolls, per_block):
+            faces = rng.integers(1, sides, size=(min(per_block, rolls - done), count), dtype=dtype, endpoint=True)
+            yield faces, faces.sum(axis=1, dtype=np.int64)
+        return
+    no_totals = np.empty(0, dtype=np.int64)
+    for _ in range(rolls):
+        total = 0
+        for done in range(0, count, CHUNK_DICE):
+            faces = rng.integers(1, sides, size=min(CHUNK_DICE, count - done), dtype=dtype, endpoint=True)
+            total += int(faces.sum(dtype=np.int64))
+            yield faces, np.array([total], dtype=np.int64) if done + CHUNK_DICE >= count else no_totals
+
+def roll(n_dice: int, sides: int = 6, seed: int | None = None) -> dict:
+    """Roll `n_dice` dice with `sides` sides and return the 'dice' and the 'seed' that repeats them."""
+    _check_dice(n_dice, sides, limit=MAX_LISTED_DICE)
+    rng, seed = _generator(seed)
+    return {"dice": [int(face) for faces, _ in _blocks(rng, n_dice, sides, 1) for face in faces.ravel()], "seed": seed}
+
+def roll_expression(notation: str, rolls: int = 1, seed: int | None = None) -> dict:
+    """
+    Rolls a dice expression `rolls` times.
+
+    Args:
+        notation: The dice expression in NdM+K notation.
+        rolls: How many times the expression is rolled.
+        seed: Seed of the random stream; the same seed repeats the same rolls.
+
+    Returns:
+        A dictionary with the total of every roll, the dice of every roll when there
+        are at most MAX_LISTED_DICE of them, and the seed.
+    """
+    count, sides, modifier = parse_notation(notation)
+    _check_dice(count, sides, rolls)
+    if rolls > MAX_LISTED_DICE:
+        raise ValueError(f"At most {MAX_LISTED_DICE} rolls can be listed; use dice_statistics for more.")
+    rng, seed = _generator(seed)
+    list_dice = count * rolls <= MAX_LISTED_DICE
+    totals, dice = [], []
+    for faces, block_totals in _blocks(rng, count, sides, rolls):
+        totals += (block_totals + modifier).tolist()
+        if list_dice:
+            dice += faces.tolist()
+    result = {"notation": notation, "rolls": rolls, "seed": seed, "totals": totals}
+    if list_dice:
+        result["dice"] = dice
+    return result
+
+def dice_statistics(notation: str, rolls: int = 1, seed: int | None = None) -> dict:
+    """
+    Rolls a dice expression `rolls` times and summarizes the results without listing them.
+
+    The dice are generated and counted block by block, so memory use does not grow
+    with the number of dice.
+
+    Args:
+        notation: The dice expression in NdM+K notation.
+        rolls: How many times the expression is rolled.
+        seed: Seed of the random stream; the same seed repeats the same rolls.
+
+    Returns:
+        A dictionary with the sum, mean, standard deviation, minimum and maximum of the
+        roll totals, the expected mean, how often each face and each total came up (when
+        there are at most MAX_HISTOGRAM_BINS of them), and the seed.
+    """
+    count, sides, modifier = parse_notation(notation)
+    _check_dice(count, sides, rolls)
+    rng, seed = _generator(seed)
+
+    span = count * (sides - 1) + 1
+    face_counts = np.zeros(sides + 1, dtype=np.int64) if sides <= MAX_HISTOGRAM_BINS else None
+    total_counts = np.zeros(span, dtype=np.int64) if span <= MAX_HISTOGRAM_BINS else None
+    n, total_sum, mean, m2 = 0, 0, 0.0, 0.0
+    low, high = None, None
+    for faces, totals in _blocks(rng, count, sides, rolls):
+        if face_counts is not None:
+            face_counts += np.bincount(faces.ravel(), minlength=sides + 1)
+        if not totals.size:
+            continue
+        if total_counts is not None:
+            total_counts += np.bincount(totals - count, minlength=span)
+        # Merge the block's mean and squared deviations into the running ones (Chan et al.).
+        block_mean = float(totals.mean())
+        block_m2 = float(np.square(totals - block_mean).sum())
+        delta = block_mean - mean
+        mean += delta * totals.size / (n + totals.size)
+        m2 += block_m2 + delta * delta * n * totals.size / (n + totals.size)
+        n += totals.size
+        total_sum += int(totals.sum())
+        low = int(totals.min()) if low is None else min(low, int(totals.min()))
+        high = int(totals.max()) if high is None else max(high, int(totals.max()))
+
+    result = {
+        "notation": notation,
+        "rolls": rolls,
+        "dice": count * rolls,
+        "seed": seed,
+        "sum": total_sum + modifier * rolls,
+        "mean": mean + modifier,
+        "expected_mean": count * (sides + 1) / 2 + modifier,
+        "std": (m2 / n) ** 0.5,
+        "min": low + modifier,
+        "max": high + modifier,
+    }
+    if face_counts is not None:
+        result["face_counts"] = {str(face): int(c) for face, c in enumerate(face_counts) if face and c}
+    if total_counts is not None and rolls > 1:
+        result["total_counts"] = {str(i + count + modifier): int(c) for i, c in enumerate(total_counts) if c}
+    return result
@@ -1,12 +1,41 @@
-import random
 from fastmcp import FastMCP
 
+# The engine is imported as a sibling module when this file runs as the MCP server script.
+try:
+    from .dice_engine import dice_statistics, roll, roll_expression
+except ImportError:
+    from dice_engine import dice_statistics, roll, roll_expression
+
 mcp = FastMCP(name="Dice Roller")
 
-@mcp.tool
-def roll_dice(n_dice: int) -> list[int]:
-    """Roll `n_dice` 6-sided dice and return the results."""
-    return [random.randint(1, 6) for _ in range(n_dice)]
+# Rolling has no side effects, so clients may retry a call that timed out.
+READ_ONLY = {"readOnlyHint": True}
+
+@mcp.tool(annotations=READ_ONLY)
+def roll_dice(n_dice: int, sides: int = 6, seed: int | None = None) -> dict:
+    """
+    Roll `n_dice` dice with `sides` sides (6 by default). Returns every result as 'dice' and the
+    'seed'; pass the seed again to repeat the same roll. At most 1000 dice.
+    """
+    return roll(n_dice, sides, seed)
+
+@mcp.tool(annotations=READ_ONLY)
+def roll_notation(notation: str, rolls: int = 1, seed: int | None = None) -> dict:
+    """
+    Roll dice written in NdM+K notation (e.g. "3d6", "d20", "2d8+3", "4d6-1") `rolls` times.
+    Returns the total of every roll, the individual dice when there are at most 1000, and the
+    seed; pass the seed again to repeat the same rolls. At most 1000 rolls.
+    """
+    return roll_expression(notation, rolls, seed)
+
+@mcp.tool(name="dice_statistics", annotations=READ_ONLY)
+def dice_statistics_tool(notation: str, rolls: int = 1, seed: int | None = None) -> dict:
+    """
+    Roll dice in NdM+K notation `rolls` times, up to 100 million dice in total, and return summary
+    statistics instead of the rolls: sum, mean, expected mean, standard deviation, minimum and
+    maximum of the totals, how often each face and each total came up, and the seed.
+    """
+    return dice_statistics(notation, rolls, seed)
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    mcp.run()
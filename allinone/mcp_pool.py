@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+from google.adk.tools.base_toolset import BaseToolset
+
+
+def stdio_server(command: str, args: list[str], timeout: float = 30.0):
+    """
+    Returns a function creating the connection parameters of an MCP server run as a
+    subprocess. The MCP client modules take about a second to import, so they are
+    only imported when the server is started.
+    """
+
+    def connection_params():
+        from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+        from google.adk.tools.mcp_tool.mcp_toolset import StdioServerParameters
+        return StdioConnectionParams(
+            server_params=StdioServerParameters(command=command, args=args),
+            timeout=timeout,
+        )
+
+    return connection_params
+
+
+class MCPServerPool(BaseToolset):
+    """
+    Toolset backed by a bounded pool of long-lived MCP server connections.
+
+    Each replica is an `MCPToolset` with its own server process. Replicas are created
+    on first use, started ahead of the first request by `MCPConnectionManager`, handed
+    out round-robin so concurrent sessions are spread over the warm servers, and
+    replaced when they fail a health check.
+
+    Args:
+        name: Name of the server, used in logs and metrics.
+        connection_params: Connection parameters passed to each `MCPToolset` replica,
+            or a function returning them (see `stdio_server`).
+        size: Number of server replicas in the pool.
+        health_check_timeout: Seconds a replica may take to list its tools before it is restarted.
+    """
+
+    def __init__(self, name: str, connection_params, size: int = 1, health_check_timeout: float = 10.0):
+        super().__init__()
+        self.name = name
+        self.connection_params = connection_params
+        self.size = max(1, size)
+        self.health_check_timeout = health_check_timeout
+        self._replicas = None
+        self._lock = threading.Lock()
+        self._next_replica = 0
+        self.startup_latency = None
+        self.first_call_latency = None
+        self.restarts = 0
+
+    def _new_replica(self):
+        from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+        params = self.connection_params() if callable(self.connection_params) else self.connection_params
+        return MCPToolset(connection_params=params)
+
+    def prepare(self) -> list:
+        """Creates the replicas if needed and returns them. Blocking; it imports the MCP client."""
+        with self._lock:
+            if self._replicas is None:
+                self._replicas = [self._new_replica() for _ in range(self.size)]
+            return self._replicas
+
+    def reconnect(self, connection_params) -> None:
+        """
+        Points the pool at different server parameters (e.g. a local stand-in server).
+        Must be called before the pool is started; running replicas are not stopped.
+        """
+        with self._lock:
+            self.connection_params = connection_params
+            self._replicas = None
+
+    async def start(self) -> None:
+        """Starts every replica and records how long the servers took to become ready."""
+        start = time.perf_counter()
+        replicas = await asyncio.to_thread(self.prepare)
+        await asyncio.gather(*(replica.get_tools() for replica in replicas))
+        self.startup_latency = time.perf_counter() - start
+
+    async def get_tools(self, readonly_context=None):
+        # Creating the replicas imports the MCP client, so it runs off the event loop.
+        replicas = self._replicas or await asyncio.to_thread(self.prepare)
+        replica = replicas[self._next_replica % len(replicas)]
+        self._next_replica += 1
+
+        tools = await replica.get_tools(readonly_context)
+        if self.first_call_latency is None:
+            for tool in tools:
+                self._time_first_call(tool)
+        return tools
+
+    def _time_first_call(self, tool) -> None:
+        """Records how long the first call of any tool of the pool takes, including the server's reply."""
+        run_async = tool.run_async
+
+        async def timed_run_async(*, args, tool_context):
+            start = time.perf_counter()
+            try:
+                return await run_async(args=args, tool_context=tool_context)
+            finally:
+                if self.first_call_latency is None:
+                    self.first_call_latency = time.perf_counter() - start
+
+        tool.run_async = timed_run_async
+
+    async def health_check(self) -> None:
+        """Lists the tools of every replica and restarts the ones that fail or hang."""
+        for i, replica in enumerate(self._replicas or []):
+            try:
+                await asyncio.wait_for(replica.get_tools(), self.health_check_timeout)
+            except Exception as e:
+                print(f"MCP server '{self.name}' (replica {i}) failed its health check: {e}. Restarting.")
+                try:
+                    await replica.close()
+                except Exception:
+                    pass
+                self._replicas[i] = self._new_replica()
+                self.restarts += 1
+                try:
+                    await asyncio.wait_for(self._replicas[i].get_tools(), self.health_check_timeout)
+                except Exception as e:
+                    print(f"MCP server '{self.name}' (replica {i}) could not be restarted: {e}")
+
+    async def close(self) -> None:
+        # Runners close the toolsets of their agents when a run ends. The pool outlives
+        # individual runs, so its servers are only stopped by `shutdown()`.
+        pass
+
+    async def shutdown(self) -> None:
+        """Stops every server in the pool."""
+        for replica in self._replicas or []:
+            try:
+                await replica.close()
+            except Exception as e:
+                print(f"Error while stopping MCP server '{self.name}': {e}")
+
+    def metrics(self) -> dict:
+        return {
+            "replicas": len(self._replicas or []),
+            "startup_latency": self.startup_latency,
+            "first_call_latency": self.first_call_latency,
+            "restarts": self.restarts,
+        }
+
+
+class MCPConnectionManager:
+    """
+    Prestarts the registered MCP server pools and keeps them healthy.
+
+    Servers are started concurrently in the background as soon as the agent begins
+    handling its first request, so the process spawn overlaps with the root model
+    call instead of blocking the first tool call. A background task then health-checks
+    every pool periodically and restarts crashed servers.
+
+    Args:
+        health_check_interval: Seconds between two health checks of every pool.
+    """
+
+    def __init__(self, health_check_interval: float = 30.0):
+        self.health_check_interval = health_check_interval
+        self.pools = {}
+        self._task = None
+
+    def register(self, pool: MCPServerPool) -> MCPServerPool:
+        self.pools[pool.name] = pool
+        return pool
+
+    def warm_up(self, callback_context=None) -> None:
+        """
+        Starts the pools on the running event loop if they are not running yet.
+        Usable as a `before_agent_callback`; it never blocks the agent.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return None
+
+    async def _run(self) -> None:
+        results = await asyncio.gather(*(pool.start() for pool in self.pools.values()), return_exceptions=True)
+        for pool, result in zip(self.pools.values(), results):
+            if isinstance(result, Exception):
+                print(f"Failed to prestart MCP server '{pool.name}': {result}")
+            else:
+                print(f"MCP server '{pool.name}' ready in {pool.startup_latency:.2f}s")
+
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            for pool in self.pools.values():
+                await pool.health_check()
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        for pool in self.pools.values():
+            await pool.shutdown()
+
+    def metrics(self) -> dict:
+        """Returns startup latency, first-call latency and restart count for each pool."""
+        return {name: pool.metrics() for name, pool in self.pools.items()}
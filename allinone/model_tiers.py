@@ -0,0 +1,221 @@
+import math
+import time
+from collections import deque
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from .cache import LRUCache
+from .resilience import ERROR_STATUSES
+from .tracing import traced
+
+# Finish reasons that mean the model did not produce a usable answer.
+FAILED_FINISH_REASONS = {
+    types.FinishReason.MALFORMED_FUNCTION_CALL,
+    types.FinishReason.MAX_TOKENS,
+    types.FinishReason.OTHER,
+    types.FinishReason.RECITATION,
+}
+
+
+def parse_tiers(value: str) -> list[str]:
+    """Parses 'model-a,model-b' into a list of model names, cheapest first."""
+    return [model.strip() for model in value.split(",") if model.strip()]
+
+
+def default_llm_factory(model: str):
+    from google.adk.models.registry import LLMRegistry
+    return LLMRegistry.new_llm(model)
+
+
+def _callbacks(value) -> list:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, list) else [value]
+
+
+def _tool_failed(tool_response) -> bool:
+    """Returns True if a tool response reports an error, including errors of parallel sub-calls."""
+    if not isinstance(tool_response, dict):
+        return False
+    if tool_response.get("error") or tool_response.get("status") in ERROR_STATUSES:
+        return True
+    return any(isinstance(result, dict) and result.get("status") in ERROR_STATUSES
+               for result in tool_response.get("results") or [])
+
+
+class ModelTierPolicy:
+    """
+    Runs agents on the cheapest model tier first and escalates only when needed.
+
+    Every model call starts on the current tier of its turn, initially `tiers[0]`.
+    A response is escalated to the next tier when the model failed (an exception, an
+    error, an unusable finish reason, an empty answer or a call to a tool that does not exist)
+    or when its confidence, the exponent of the average token log-probability, is
+    below `min_confidence`. The request is then re-sent to the next tier and its
+    answer replaces the cheap one in place. A failed tool call moves the rest of the turn to
+    the next tier, since the model has to recover from the failure.
+
+    Used through an agent's `before_model`, `after_model`, `on_model_error` and `after_tool` callbacks.
+    Token usage and latency are recorded per tier, so `stats()` gives a side-by-side
+    view of what each tier costs. With streaming, partial text of an escalated
+    response has already been sent; the final response is replaced.
+
+    Args:
+        tiers: Model names from cheapest to most capable.
+        min_confidence: Minimum confidence of a response; responses without log-probabilities are not checked.
+        llm_factory: Function returning the `BaseLlm` for a model name, used for escalated calls.
+    """
+
+    def __init__(self, tiers: list[str], min_confidence: float = 0.5, llm_factory=default_llm_factory):
+        if not tiers:
+            raise ValueError("At least one model tier is required.")
+        self.tiers = tiers
+        self.min_confidence = min_confidence
+        self.llm_factory = llm_factory
+        self._llms = {}
+        # (invocation_id, agent_name) -> tier index of the rest of the turn.
+        self._turn_tiers = LRUCache(1024)
+        # (invocation_id, agent_name) -> (tier index, request, start time) of the running model call.
+        self._calls = LRUCache(1024)
+        self._stats = {
+            model: {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "cached_tokens": 0,
+                    "latencies": deque(maxlen=1000)}
+            for model in tiers
+        }
+        self.escalations = {"low_confidence": 0, "model_failure": 0, "tool_failure": 0}
+
+    # --- Callbacks ---
+
+    def before_model(self, callback_context, llm_request):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        tier = self._turn_tiers.get(key, 0)
+        llm_request.model = self.tiers[tier]
+        self._calls.put(key, (tier, llm_request, time.perf_counter()))
+        return None
+
+    async def after_model(self, callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        call = self._calls.pop(key)
+        if call is None:
+            return None
+        tier, llm_request, start = call
+        self._record(self.tiers[tier], llm_response, time.perf_counter() - start)
+        await self._escalate(key, tier, llm_request, llm_response,
+                             self._escalation_reason(llm_request, llm_response))
+        return None
+
+    async def on_model_error(self, callback_context, llm_request, error):
+        """Answers a model call that raised with the next tier; returns None (re-raising) on the last tier."""
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        call = self._calls.pop(key)
+        if call is None:
+            return None
+        tier, llm_request, start = call
+        self._record(self.tiers[tier], None, time.perf_counter() - start)
+        llm_response = LlmResponse(error_code=type(error).__name__, error_message=str(error))
+        if await self._escalate(key, tier, llm_request, llm_response, "model_failure"):
+            return llm_response
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        if _tool_failed(tool_response):
+            key = (tool_context.invocation_id, tool_context.agent_name)
+            tier = self._turn_tiers.get(key, 0)
+            if tier + 1 < len(self.tiers):
+                self._turn_tiers.put(key, tier + 1)
+                self.escalations["tool_failure"] += 1
+        return None
+
+    def instrument(self, agent) -> None:
+        """
+        Adds the policy's callbacks to an agent. `before_model` goes last, so calls answered
+        by an earlier callback (e.g. the fast path) are not counted; `after_model` goes first,
+        so the other callbacks see the escalated response; `on_model_error` goes last, so
+        callbacks handling specific errors run before it.
+        """
+        agent.before_model_callback = [*_callbacks(agent.before_model_callback), self.before_model]
+        agent.after_model_callback = [self.after_model, *_callbacks(agent.after_model_callback)]
+        agent.on_model_error_callback = [*_callbacks(agent.on_model_error_callback), self.on_model_error]
+        agent.after_tool_callback = [*_callbacks(agent.after_tool_callback), self.after_tool]
+
+    # --- Internals ---
+
+    async def _escalate(self, key, tier: int, llm_request, llm_response, reason: str | None) -> bool:
+        """
+        Re-sends the request to the next tiers while `reason` is set, and replaces `llm_response`
+        in place with their answer. Returns whether it was replaced.
+        """
+        replaced = False
+        while reason is not None and tier + 1 < len(self.tiers):
+            self.escalations[reason] += 1
+            tier += 1
+            self._turn_tiers.put(key, tier)
+            # The model may modify the contents and config it is given; keep the original intact.
+            request = llm_request.model_copy(update={
+                "model": self.tiers[tier],
+                "contents": list(llm_request.contents),
+                "config": llm_request.config.model_copy(deep=True) if llm_request.config else None,
+            })
+            start = time.perf_counter()
+            try:
+                escalated = await self._generate(request)
+            except Exception as e:
+                print(f"Escalation to '{self.tiers[tier]}' failed: {e}")
+                break
+            if escalated is None:
+                break
+            self._record(self.tiers[tier], escalated, time.perf_counter() - start)
+            # Update the response in place rather than returning it, so the after_model
+            # callbacks that follow (e.g. the response cache) see the escalated answer.
+            for field in type(llm_response).model_fields:
+                setattr(llm_response, field, getattr(escalated, field))
+            replaced = True
+            reason = self._escalation_reason(llm_request, llm_response)
+        return replaced
+
+    def _escalation_reason(self, llm_request, llm_response) -> str | None:
+        if llm_response.error_code or llm_response.finish_reason in FAILED_FINISH_REASONS:
+            return "model_failure"
+        parts = llm_response.content.parts if llm_response.content else None
+        if not parts or not any(part.text or part.function_call for part in parts):
+            return "model_failure"
+        if any(part.function_call and part.function_call.name not in llm_request.tools_dict for part in parts):
+            return "model_failure"
+        if llm_response.avg_logprobs is not None and math.exp(llm_response.avg_logprobs) < self.min_confidence:
+            return "low_confidence"
+        return None
+
+    @traced("model_tier_escalation")
+    async def _generate(self, llm_request):
+        if llm_request.model not in self._llms:
+            self._llms[llm_request.model] = self.llm_factory(llm_request.model)
+        response = None
+        async for response in self._llms[llm_request.model].generate_content_async(llm_request, stream=False):
+            pass
+        return response
+
+    def _record(self, model: str, llm_response, seconds: float) -> None:
+        stats = self._stats[model]
+        stats["calls"] += 1
+        stats["latencies"].append(seconds)
+        usage = llm_response.usage_metadata if llm_response is not None else None
+        if usage is not None:
+            stats["prompt_tokens"] += usage.prompt_token_count or 0
+            stats["output_tokens"] += usage.candidates_token_count or 0
+            stats["cached_tokens"] += usage.cached_content_token_count or 0
+
+    def stats(self) -> dict:
+        """Returns calls, token usage and latency per tier, and the escalation counts."""
+        tiers = {}
+        for model, stats in self._stats.items():
+            latencies = sorted(stats["latencies"])
+            tiers[model] = {
+                "calls": stats["calls"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "output_tokens": stats["output_tokens"],
+                "cached_tokens": stats["cached_tokens"],
+                "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+                "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+            }
+        return {"tiers": tiers, "escalations": dict(self.escalations)}
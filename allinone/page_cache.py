@@ -0,0 +1,393 @@
+import asyncio
+import re
+import time
+import urllib.error
+import urllib.request
+import urllib.robotparser
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from .cache import ContentStore, LRUCache
+from .tracing import traced
+
+# Query parameters that only track the visitor and never change the page.
+TRACKING_PARAMETERS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "ref_src"}
+
+# Elements whose content is never part of the readable page.
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "form", "button"}
+
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "header", "aside", "blockquote", "table",
+              "ul", "ol", "dl", "dt", "dd", "figure", "figcaption", "br", "hr"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL into a cache key: lowercase scheme and host, no default port,
+    fragment or tracking parameters, sorted query parameters and at least a '/' path.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80 or scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMETERS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class _MarkdownConverter(HTMLParser):
+    """Converts the readable parts of an HTML page into markdown."""
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.title = ""
+        self._out = []
+        self._skip = 0
+        self._in_title = False
+        self._pre = 0
+        self._lists = []
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+        if tag == "title":
+            self._in_title = not self.title
+            return
+        attrs = dict(attrs)
+        if re.fullmatch(r"h[1-6]", tag):
+            self._block("#" * int(tag[1]) + " ")
+        elif tag in ("ul", "ol"):
+            self._lists.append([tag, 0])
+        elif tag == "li":
+            indent = "  " * max(0, len(self._lists) - 1)
+            if self._lists and self._lists[-1][0] == "ol":
+                self._lists[-1][1] += 1
+                self._line(f"{indent}{self._lists[-1][1]}. ")
+            else:
+                self._line(f"{indent}- ")
+        elif tag == "pre":
+            self._pre += 1
+            self._block("```\n")
+        elif tag == "code" and not self._pre:
+            self._out.append("`")
+        elif tag in ("strong", "b"):
+            self._out.append("**")
+        elif tag in ("em", "i"):
+            self._out.append("*")
+        elif tag == "a" and attrs.get("href") and not attrs["href"].startswith(("javascript:", "#")):
+            self._link = urljoin(self.base_url, attrs["href"])
+            self._out.append("[")
+        elif tag == "img" and attrs.get("alt"):
+            self._out.append(f"![{attrs['alt']}]")
+        elif tag == "tr":
+            self._line("")
+        elif tag in ("td", "th"):
+            self._out.append(" | ")
+        elif tag in BLOCK_TAGS:
+            self._block("")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip = max(0, self._skip - 1)
+            return
+        if self._skip:
+            return
+        if tag == "title":
+            self._in_title = False
+            return
+        if tag == "tr":
+            self._out.append(" |")
+        elif tag in ("ul", "ol"):
+            if self._lists:
+                self._lists.pop()
+            if not self._lists:
+                self._block("")
+        elif re.fullmatch(r"h[1-6]", tag) or tag in BLOCK_TAGS:
+            self._block("")
+        elif tag == "pre" and self._pre:
+            self._pre -= 1
+            self._line("```")
+            self._block("")
+        elif tag == "code" and not self._pre:
+            self._out.append("`")
+        elif tag in ("strong", "b"):
+            self._out.append("**")
+        elif tag in ("em", "i"):
+            self._out.append("*")
+        elif tag == "a" and self._link:
+            self._out.append(f"]({self._link})")
+            self._link = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._in_title:
+            self.title += data.strip()
+            return
+        self._out.append(data if self._pre else re.sub(r"\s+", " ", data))
+
+    def _line(self, prefix):
+        self._out.append("\n" + prefix)
+
+    def _block(self, prefix):
+        self._out.append("\n\n" + prefix)
+
+    def markdown(self) -> str:
+        text = "".join(self._out)
+        lines = [line.rstrip() for line in text.split("\n")]
+        text = "\n".join(line if line.startswith(("  ", "```")) else line.strip() for line in lines)
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        if self.title and not text.startswith("# "):
+            text = f"# {self.title}\n\n{text}"
+        return text
+
+
+def html_to_markdown(html: str, base_url: str = "") -> str:
+    """Extracts the readable text of an HTML page as markdown, resolving links against `base_url`."""
+    converter = _MarkdownConverter(base_url)
+    converter.feed(html)
+    converter.close()
+    return converter.markdown()
+
+
+class RobotsDisallowed(PermissionError):
+    """Raised when the robots.txt of a site disallows fetching a page."""
+
+
+def _decode(body: bytes, content_type: str) -> str:
+    match = re.search(r"charset=([\w-]+)", content_type or "")
+    try:
+        return body.decode(match.group(1) if match else "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+class PageCache:
+    """
+    Fetches web pages as markdown, cached by normalized URL.
+
+    The markdown conversion of every page is stored with the page's ETag and
+    Last-Modified headers. Within `max_age` seconds an entry is served without any
+    request; after that it is revalidated with a conditional GET, and a 304 answer
+    renews the entry without downloading or converting the page again. If the server
+    cannot be reached, or answers with a 5xx or 429 error, a stale entry is served and
+    marked as such. Concurrent requests for the same URL share one download.
+
+    Like the `fetch` MCP server it replaces, pages are only downloaded when the site's
+    robots.txt allows it for `robots_agent`. A robots.txt answered with 401 or 403
+    disallows the whole site, and any other 4xx allows it. Each site's rules are
+    cached for `robots_ttl` seconds.
+
+    Callers receive one page of at most `max_length` characters at a time and can ask
+    for the next with `start_index`, so a large page never becomes one huge tool payload.
+
+    Args:
+        store: Store holding the markdown of the fetched pages.
+        max_age: Seconds an entry is served without revalidation.
+        timeout: Seconds to wait for the server.
+        max_download_bytes: Pages are cut off after this many bytes, and marked as truncated.
+        user_agent: User-Agent header sent with every request.
+        respect_robots: Whether to check robots.txt before downloading a page.
+        robots_agent: Product token matched against the User-agent lines of robots.txt.
+        robots_ttl: Seconds the robots.txt rules of a site are cached.
+    """
+
+    def __init__(self, store: ContentStore, max_age: float = 300, timeout: float = 15.0,
+                 max_download_bytes: int = 5 * 1024 * 1024, user_agent: str = "Mozilla/5.0 (compatible; GemAgent)",
+                 respect_robots: bool = True, robots_agent: str = "GemAgent", robots_ttl: float = 60 * 60):
+        self.store = store
+        self.max_age = max_age
+        self.timeout = timeout
+        self.max_download_bytes = max_download_bytes
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.robots_agent = robots_agent
+        self.robots_ttl = robots_ttl
+        self._robots = LRUCache(max_entries=256)
+        self._in_flight = {}
+        self.counts = {"hits": 0, "revalidated": 0, "misses": 0, "stale": 0, "errors": 0}
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+        self.seconds_saved = 0.0
+
+    async def fetch(self, url: str, start_index: int = 0, max_length: int = 5000) -> dict:
+        """Returns one page of the markdown of `url`; see `make_tool()` for the result."""
+        key = normalize_url(url)
+        if urlsplit(key).scheme not in ("http", "https"):
+            return {"url": url, "error": "Only http and https URLs can be fetched."}
+
+        # Identical requests running at the same time share one download.
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(asyncio.to_thread(self._load, key))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        try:
+            markdown, metadata, cache = await asyncio.shield(task)
+        except Exception as e:
+            self.counts["errors"] += 1
+            return {"url": url, "error": f"{type(e).__name__}: {e}"}
+
+        start_index = max(0, start_index)
+        end = start_index + max(1, max_length)
+        result = {
+            "url": metadata.get("url", key),
+            "title": metadata.get("title", ""),
+            "content": markdown[start_index:end],
+            "start_index": start_index,
+            "next_start_index": end if end < len(markdown) else None,
+            "total_length": len(markdown),
+            "cache": cache,
+            "truncated": metadata.get("truncated", False),
+        }
+        notes = []
+        if cache == "stale":
+            notes.append(f"The page could not be fetched ({metadata['stale_reason']}); this is the last cached copy.")
+        if result["truncated"]:
+            notes.append(f"The page was cut off after {self.max_download_bytes} bytes; its end is missing.")
+        if notes:
+            result["note"] = " ".join(notes)
+        return result
+
+    @traced("page_cache.load")
+    def _load(self, key: str) -> tuple[str, dict, str]:
+        """Returns (markdown, metadata, cache status) for a normalized URL. Blocking."""
+        entry = self.store.get_entry(key)
+        if entry is not None:
+            data, metadata = entry
+            if time.time() - metadata.get("fetched_at", 0) < self.max_age:
+                self._saved(metadata)
+                self.counts["hits"] += 1
+                return data.decode("utf-8"), metadata, "hit"
+
+        headers = {"User-Agent": self.user_agent, "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.5"}
+        if entry is not None:
+            if entry[1].get("etag"):
+                headers["If-None-Match"] = entry[1]["etag"]
+            if entry[1].get("last_modified"):
+                headers["If-Modified-Since"] = entry[1]["last_modified"]
+
+        start = time.perf_counter()
+        try:
+            if self.respect_robots and not self._allowed(key):
+                raise RobotsDisallowed(f"robots.txt of {urlsplit(key).netloc} disallows fetching {key}")
+            with urllib.request.urlopen(urllib.request.Request(key, headers=headers), timeout=self.timeout) as response:
+                # One byte past the limit tells a cut-off page from one of exactly that size.
+                body = response.read(self.max_download_bytes + 1)
+                final_url = response.geturl()
+                response_headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry is not None:
+                data, metadata = entry
+                metadata = {**metadata, "fetched_at": time.time()}
+                self.store.touch(key, metadata)
+                self._saved(metadata, time.perf_counter() - start)
+                self.counts["revalidated"] += 1
+                return data.decode("utf-8"), metadata, "revalidated"
+            # Server errors and rate limits are temporary; the last copy beats no page at all.
+            if entry is None or not (e.code == 429 or e.code >= 500):
+                raise
+            return self._stale(entry, f"HTTP {e.code}")
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            if entry is None:
+                raise
+            return self._stale(entry, getattr(e, "reason", None) or type(e).__name__)
+
+        truncated = len(body) > self.max_download_bytes
+        body = body[:self.max_download_bytes]
+        self.bytes_downloaded += len(body)
+        content_type = response_headers.get("Content-Type", "")
+        text = _decode(body, content_type)
+        converter = None
+        if "html" in content_type or not content_type and text.lstrip()[:1] == "<":
+            converter = _MarkdownConverter(final_url)
+            converter.feed(text)
+            converter.close()
+            text = converter.markdown()
+
+        metadata = {
+            "url": final_url,
+            "title": converter.title if converter else "",
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "download_bytes": len(body),
+            "truncated": truncated,
+            # Time a fresh fetch takes, credited as saved on every cache hit.
+            "seconds": time.perf_counter() - start,
+        }
+        if "no-store" not in response_headers.get("Cache-Control", ""):
+            self.store.put(key, text.encode("utf-8"), metadata)
+        self.counts["misses"] += 1
+        return text, metadata, "miss"
+
+    def _stale(self, entry: tuple[bytes, dict], reason) -> tuple[str, dict, str]:
+        self.counts["stale"] += 1
+        return entry[0].decode("utf-8"), {**entry[1], "stale_reason": str(reason)}, "stale"
+
+    def _allowed(self, url: str) -> bool:
+        """Returns whether robots.txt allows fetching `url`. Blocking; raises if robots.txt is unreachable."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        cached = self._robots.get(origin)
+        if cached is None or time.time() - cached[0] >= self.robots_ttl:
+            parser = urllib.robotparser.RobotFileParser(origin + "/robots.txt")
+            request = urllib.request.Request(origin + "/robots.txt", headers={"User-Agent": self.user_agent})
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    parser.parse(_decode(response.read(512 * 1024), response.headers.get("Content-Type", "")).splitlines())
+            except urllib.error.HTTPError as e:
+                if e.code >= 500:
+                    raise
+                if e.code in (401, 403):
+                    parser.disallow_all = True
+                else:
+                    parser.allow_all = True
+            cached = (time.time(), parser)
+            self._robots.put(origin, cached)
+        return cached[1].can_fetch(self.robots_agent, url)
+
+    def _saved(self, metadata: dict, seconds_spent: float = 0.0) -> None:
+        self.bytes_saved += metadata.get("download_bytes", 0)
+        self.seconds_saved += max(0.0, metadata.get("seconds", 0.0) - seconds_spent)
+
+    def make_tool(self):
+        """Returns the function tool that exposes `fetch` to an agent."""
+
+        async def fetch_url(url: str, start_index: int = 0, max_length: int = 5000) -> dict:
+            """
+            Fetches a web page and returns its readable content as markdown. Pages are cached
+            and revalidated, so fetching the same URL again is fast. Long pages are returned
+            in parts; call again with 'next_start_index' as start_index to read further.
+
+            Args:
+                url: The URL of the page.
+                start_index: Character offset to start reading from.
+                max_length: Maximum number of characters to return.
+
+            Returns:
+                A dict with the final 'url', the page 'title', the 'content', the 'total_length'
+                of the markdown, the 'next_start_index' of the remaining content (None at the end)
+                whether it came from the 'cache' ('hit', 'revalidated', 'miss' or 'stale'), and
+                whether the download was 'truncated', or an 'error'. A 'note' explains stale or
+                truncated content.
+            """
+            return await self.fetch(url, start_index, max_length)
+
+        return fetch_url
+
+    def stats(self) -> dict:
+        """Returns the hit, revalidation and miss counts, and the bytes and seconds saved."""
+        lookups = self.counts["hits"] + self.counts["revalidated"] + self.counts["misses"]
+        return {
+            **self.counts,
+            "hit_rate": (self.counts["hits"] + self.counts["revalidated"]) / lookups if lookups else 0.0,
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_saved": self.bytes_saved,
+            "seconds_saved": self.seconds_saved,
+        }
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from google.adk.tools.tool_context import ToolContext
+from .resilience import is_error_result
+
+
+class ParallelAgentRunner:
+    """
+    Runs independent sub-agent calls concurrently.
+
+    The root agent calls the tool returned by `make_tool()` with the agents and requests
+    of every independent sub-task; the calls run concurrently on the event loop, bounded
+    by `max_concurrency` and a per-call timeout, and their results are merged into one
+    response for the final answer.
+
+    Args:
+        agent_tools: The `AgentTool`s that may be run in parallel, looked up by name.
+        max_concurrency: Maximum number of sub-agent calls running at the same time.
+        timeout: Seconds after which a single sub-agent call is cancelled.
+    """
+
+    def __init__(self, agent_tools: list, max_concurrency: int = 4, timeout: float = 60.0):
+        self.agent_tools = {tool.name: tool for tool in agent_tools}
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    async def run(self, agent_names: list[str], requests: list[str], tool_context) -> dict:
+        """Runs each (agent, request) pair concurrently and returns the merged results."""
+        if len(agent_names) != len(requests):
+            return {"error": "agent_names and requests must have the same length."}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            self._run_one(name, request, tool_context, semaphore)
+            for name, request in zip(agent_names, requests)
+        ))
+        return {"results": results, "seconds": round(time.perf_counter() - start, 3)}
+
+    async def _run_one(self, name: str, request: str, tool_context, semaphore: asyncio.Semaphore) -> dict:
+        result = {"agent": name, "request": request}
+        tool = self.agent_tools.get(name)
+        if tool is None:
+            result["status"] = "error"
+            result["error"] = f"Unknown agent '{name}'. Available agents: {', '.join(self.agent_tools)}."
+            return result
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                output = await asyncio.wait_for(
+                    tool.run_async(args={"request": request}, tool_context=tool_context),
+                    self.timeout,
+                )
+                if is_error_result(output):
+                    # A guarded agent that timed out, failed or is unavailable.
+                    result["status"] = output["status"]
+                    result["error"] = output["error"]
+                else:
+                    result["status"] = "ok"
+                    result["result"] = output
+            except asyncio.TimeoutError:
+                result["status"] = "timeout"
+                result["error"] = f"No response within {self.timeout} seconds."
+            except Exception as e:
+                result["status"] = "error"
+                result["error"] = f"{type(e).__name__}: {e}"
+            result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def make_tool(self):
+        """Returns the function tool that exposes `run` to the root agent."""
+
+        async def run_agents_in_parallel(agent_names: list[str], requests: list[str], tool_context: ToolContext) -> dict:
+            """
+            Runs several independent sub-agent requests at the same time and returns all results.
+            Use it when a request needs multiple agents whose tasks do not depend on each other's
+            output (e.g. a web search, fetching a URL and the current time).
+
+            Args:
+                agent_names: The agent to call for each task (e.g. ["SearchAgent", "fetch", "DateTimeAgent"]).
+                requests: The request for each task, in the same order as agent_names.
+
+            Returns:
+                A dict with a 'results' list holding, per task, the 'agent', 'request', 'status'
+                ('ok', 'timeout', 'unavailable' or 'error') and either the 'result' or the 'error'.
+            """
+            return await self.run(agent_names, requests, tool_context)
+
+        return run_agents_in_parallel
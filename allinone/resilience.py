@@ -0,0 +1,404 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import random
+import time
+import urllib.error
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from .lazy import LazyAgentTool
+
+# HTTP status codes worth retrying.
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Exception classes of HTTP client libraries (requests, httpx) that mean the request
+# did not get through, matched by name so the libraries need not be imported.
+TRANSIENT_ERROR_NAMES = {"ConnectionError", "Timeout", "TransportError", "TimeoutException"}
+
+# Statuses of the error results returned by guarded tools.
+ERROR_STATUSES = ("error", "timeout", "unavailable")
+
+
+def parse_timeouts(value: str) -> dict:
+    """Parses 'ToolName=seconds,...' into a dict of per-tool timeouts."""
+    timeouts = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Returns True for errors worth retrying: timeouts, connection failures and
+    408/429/5xx answers. Invalid arguments and missing resources are not retried.
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    response = getattr(error, "response", None)
+    for code in (getattr(error, "code", None), getattr(error, "status_code", None),
+                 getattr(response, "status_code", None)):
+        if isinstance(code, int):
+            return code in TRANSIENT_STATUS_CODES
+    if isinstance(error, urllib.error.URLError):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def is_idempotent(tool) -> bool:
+    """
+    Returns True if an MCP tool declares itself read-only or idempotent in its annotations,
+    so calling it again after a timeout cannot repeat a side effect.
+    """
+    mcp_tool = getattr(tool, "raw_mcp_tool", None)
+    annotations = getattr(mcp_tool, "annotations", None)
+    if annotations is None:
+        return False
+    return bool(getattr(annotations, "read_only_hint", None) or getattr(annotations, "readOnlyHint", None)
+                or getattr(annotations, "idempotent_hint", None) or getattr(annotations, "idempotentHint", None))
+
+
+def is_error_result(result) -> bool:
+    """Returns True if a tool result is an error result of a guarded tool."""
+    return isinstance(result, dict) and result.get("status") in ERROR_STATUSES and "error" in result
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend that keeps failing.
+
+    Closed, calls go through. After `failure_threshold` consecutive failures the
+    breaker opens and calls are rejected right away. Once `reset_timeout` seconds
+    have passed it is half-open: a single probe call goes through, and its outcome
+    closes the breaker again or reopens it for another `reset_timeout`.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker.
+        reset_timeout: Seconds the breaker stays open before a probe is let through.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self.transitions = []
+
+    def allow(self) -> bool:
+        """Returns True if a call may go through; in the half-open state, only the probe may."""
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self._move(self.HALF_OPEN)
+            self.probe_started = now
+            return True
+        # A probe that never reported back (e.g. it was cancelled) is replaced.
+        if self.state == self.HALF_OPEN and now - self.probe_started >= self.reset_timeout:
+            self.probe_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        # Calls that started before the breaker opened don't close it; only the probe does.
+        if self.state == self.OPEN:
+            return
+        self.failures = 0
+        if self.state == self.HALF_OPEN:
+            self._move(self.CLOSED)
+
+    def record_failure(self) -> None:
+        if self.state == self.OPEN:
+            return
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._move(self.OPEN)
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe may go through."""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def _move(self, state: str) -> None:
+        self.state = state
+        self.transitions.append((time.monotonic(), state))
+        del self.transitions[:-100]
+
+
+class ToolGuard:
+    """
+    Adaptive timeout, retries and circuit breaker of one tool.
+
+    The timeout of an attempt is the `percentile` of the tool's recent successful
+    latencies times `multiplier`, clamped to [`min_timeout`, `max_timeout`]; until
+    `min_samples` latencies are known it is `max_timeout`. All attempts of a call
+    share a budget of `max_timeout` seconds, so a call never takes longer than that.
+    Transient failures of idempotent tools are retried with full-jitter exponential
+    backoff while the budget lasts. Other tools are never retried, since a call that
+    timed out may still have gone through (a file written, a sub-agent run paid for).
+    Failures that are not transient (e.g. invalid arguments) are returned at once and
+    don't count against the circuit breaker, since the backend did answer.
+
+    Args:
+        name: Name of the tool, used in error results.
+        min_timeout: Lower bound of the adaptive timeout in seconds.
+        max_timeout: Upper bound of the adaptive timeout and budget of a call in seconds.
+        percentile: Latency percentile the timeout is based on (0-1).
+        multiplier: Factor applied to the percentile.
+        min_samples: Successful calls needed before the timeout adapts.
+        max_retries: Retries of transient failures per call of an idempotent tool.
+        idempotent: Whether the tool can safely be called again after a failed attempt.
+        backoff: Base delay in seconds of the retry backoff.
+        max_backoff: Upper bound of a retry delay in seconds.
+        breaker: The tool's circuit breaker.
+    """
+
+    def __init__(self, name: str, min_timeout: float = 5.0, max_timeout: float = 120.0, percentile: float = 0.99,
+                 multiplier: float = 2.0, min_samples: int = 20, max_retries: int = 2, idempotent: bool = False,
+                 backoff: float = 0.5, max_backoff: float = 5.0, breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.max_retries = max_retries
+        self.idempotent = idempotent
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = deque(maxlen=200)
+        self.counts = {"calls": 0, "succeeded": 0, "failed": 0, "timeouts": 0, "retries": 0, "rejected": 0}
+
+    def latency_percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+    def timeout(self) -> float:
+        """The timeout of the next attempt in seconds."""
+        if len(self.latencies) < self.min_samples:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.latency_percentile(self.percentile) * self.multiplier))
+
+    async def call(self, run):
+        """
+        Calls `run()`, a function returning a new awaitable per attempt, with the guard's
+        timeout, retries and circuit breaker.
+
+        Returns:
+            The result of `run()`, or an error result: a dict with 'status' ('timeout',
+            'unavailable' or 'error'), a readable 'error', whether the call is worth
+            'retryable' later, and 'retry_after' seconds when the breaker is open.
+        """
+        self.counts["calls"] += 1
+        if not self.breaker.allow():
+            self.counts["rejected"] += 1
+            retry_after = round(self.breaker.retry_after(), 1)
+            return self._error_result(
+                "unavailable",
+                f"{self.name} is temporarily unavailable after repeated failures. Retry in {retry_after} seconds, "
+                f"use another tool, or answer without it.",
+                retryable=True, attempts=0, retry_after=retry_after,
+            )
+
+        deadline = time.monotonic() + self.max_timeout
+        attempt = 0
+        while True:
+            attempt += 1
+            timeout = max(0.0, min(self.timeout(), deadline - time.monotonic()))
+            start = time.monotonic()
+            try:
+                result = await asyncio.wait_for(run(), timeout)
+            except asyncio.TimeoutError as e:
+                self.counts["timeouts"] += 1
+                error, timed_out = e, True
+            except Exception as e:
+                error, timed_out = e, False
+            else:
+                self.latencies.append(time.monotonic() - start)
+                self.breaker.record_success()
+                self.counts["succeeded"] += 1
+                return result
+
+            if not is_transient(error):
+                self.breaker.record_success()
+                self.counts["failed"] += 1
+                return self._error_result("error", f"{type(error).__name__}: {error}", retryable=False,
+                                          attempts=attempt)
+
+            self.breaker.record_failure()
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+            if (self.idempotent and attempt <= self.max_retries and self.breaker.state == CircuitBreaker.CLOSED
+                    and time.monotonic() + delay + self.min_timeout <= deadline):
+                self.counts["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.counts["failed"] += 1
+            if timed_out:
+                message = f"{self.name} did not answer within {timeout:.1f} seconds."
+                if not self.idempotent:
+                    message += " It may still have completed; check its effect before calling it again."
+                return self._error_result("timeout", message, retryable=self.idempotent, attempts=attempt)
+            return self._error_result("error", f"{type(error).__name__}: {error}", retryable=True, attempts=attempt)
+
+    def _error_result(self, status: str, error: str, retryable: bool, attempts: int, retry_after: float | None = None):
+        result = {"status": status, "error": error, "tool": self.name, "retryable": retryable, "attempts": attempts}
+        if retry_after is not None:
+            result["retry_after"] = retry_after
+        return result
+
+    def stats(self) -> dict:
+        p50, p99 = self.latency_percentile(0.5), self.latency_percentile(0.99)
+        return {
+            **self.counts,
+            "state": self.breaker.state,
+            "timeout": round(self.timeout(), 3),
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p99": round(p99, 3) if p99 is not None else None,
+        }
+
+
+def _is_agent_tool(tool: BaseTool) -> bool:
+    from google.adk.tools.agent_tool import AgentTool
+    return isinstance(tool, (AgentTool, LazyAgentTool))
+
+
+class ResilientTool(BaseTool):
+    """
+    Runs a tool through its `ToolGuard`. The model sees the wrapped tool's declaration;
+    failures come back as error results it can react to instead of exceptions or hangs.
+    """
+
+    def __init__(self, tool: BaseTool, guard: ToolGuard):
+        super().__init__(name=tool.name, description=tool.description, is_long_running=tool.is_long_running)
+        self.tool = tool
+        self.guard = guard
+
+    def _get_declaration(self):
+        return self.tool._get_declaration()
+
+    async def process_llm_request(self, *, tool_context, llm_request) -> None:
+        # The wrapped tool adds its declaration (MCP tools also fence their descriptions);
+        # calls are then routed through the wrapper.
+        await self.tool.process_llm_request(tool_context=tool_context, llm_request=llm_request)
+        if self.name in llm_request.tools_dict:
+            llm_request.tools_dict[self.name] = self
+
+    async def run_async(self, *, args, tool_context):
+        return await self.guard.call(lambda: self.tool.run_async(args=args, tool_context=tool_context))
+
+
+class ResilientToolset(BaseToolset):
+    """
+    Wraps every tool of a toolset (e.g. an MCP server pool) in a `ResilientTool`.
+    Listing the tools is guarded as well, so a hung server leaves the agent without
+    its tools instead of blocking the turn. Only tools whose MCP annotations mark them
+    read-only or idempotent are retried.
+    """
+
+    def __init__(self, toolset: BaseToolset, layer: "ResilienceLayer"):
+        super().__init__()
+        self.toolset = toolset
+        self.layer = layer
+        self.name = getattr(toolset, "name", type(toolset).__name__)
+
+    async def get_tools(self, readonly_context=None):
+        guard = self.layer.guard(f"{self.name}.get_tools", idempotent=True)
+        tools = await guard.call(lambda: self.toolset.get_tools(readonly_context))
+        if is_error_result(tools):
+            print(f"Tools of '{self.name}' are not available: {tools['error']}")
+            return []
+        return [self.layer.wrap(tool, key=f"{self.name}.{tool.name}", idempotent=is_idempotent(tool)) for tool in tools]
+
+    async def close(self) -> None:
+        await self.toolset.close()
+
+
+class ResilienceLayer:
+    """
+    Wraps sub-agents, tool functions and toolsets with per-tool adaptive timeouts,
+    jittered retries of transient errors and circuit breakers (see `ToolGuard`).
+
+    Blocking tool functions run on the layer's own thread pool, so a timeout can stop
+    waiting for them without blocking the event loop; a hung call keeps its thread
+    until it returns, and `max_threads` bounds how many can pile up.
+
+    Args:
+        max_timeouts: Per-tool overrides of `max_timeout`, keyed by tool name.
+        max_threads: Threads for blocking tool functions.
+        failure_threshold: Consecutive failures that open a tool's circuit breaker.
+        reset_timeout: Seconds a breaker stays open before a probe call.
+        **guard_options: Defaults of every `ToolGuard` (min_timeout, max_timeout, percentile, ...).
+    """
+
+    def __init__(self, max_timeouts: dict | None = None, max_threads: int = 32, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, **guard_options):
+        self.max_timeouts = max_timeouts or {}
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.guard_options = guard_options
+        self._guards = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="tool")
+
+    def guard(self, key: str, idempotent: bool = False) -> ToolGuard:
+        """Returns the guard of a tool, created on first use; only idempotent tools are retried."""
+        if key not in self._guards:
+            options = {**self.guard_options, "idempotent": idempotent}
+            name = key.rsplit(".", 1)[-1]
+            for override in (name, key):
+                if override in self.max_timeouts:
+                    options["max_timeout"] = self.max_timeouts[override]
+            self._guards[key] = ToolGuard(
+                key, breaker=CircuitBreaker(self.failure_threshold, self.reset_timeout), **options
+            )
+        return self._guards[key]
+
+    def wrap(self, tool, key: str | None = None, idempotent: bool = False):
+        """
+        Returns a guarded version of a tool: a `BaseTool` (e.g. an agent tool), a
+        toolset, or a tool function, which is turned into a `FunctionTool`.
+
+        Args:
+            tool: The tool, toolset or function.
+            key: Name of the tool's guard; defaults to the tool name.
+            idempotent: Whether failed calls may be retried. Pass True only for tools
+                without side effects. Agent tools are never retried, since a second run
+                repeats the sub-agent's model calls and tool calls. Toolsets decide per
+                tool from its MCP annotations.
+        """
+        if isinstance(tool, BaseToolset):
+            return ResilientToolset(tool, self)
+        if not isinstance(tool, BaseTool):
+            from google.adk.tools.function_tool import FunctionTool
+            tool = FunctionTool(tool if inspect.iscoroutinefunction(tool) else self._in_thread(tool))
+        return ResilientTool(tool, self.guard(key or tool.name, idempotent=idempotent and not _is_agent_tool(tool)))
+
+    def wrap_all(self, tools: list, idempotent: bool = False) -> list:
+        return [self.wrap(tool, idempotent=idempotent) for tool in tools]
+
+    def _in_thread(self, func):
+        """Returns an async version of a blocking function that runs it on the layer's threads."""
+
+        @functools.wraps(func)
+        async def run_in_thread(*args, **kwargs):
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(context.run, func, *args, **kwargs)
+            )
+
+        return run_in_thread
+
+    def stats(self) -> dict:
+        """Counters, breaker state, current timeout and latency percentiles per tool."""
+        return {key: guard.stats() for key, guard in self._guards.items()}
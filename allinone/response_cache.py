@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import math
+import re
+import time
+import urllib.request
+from typing import Awaitable, Callable
+from google.genai import types
+from .cache import LRUCache
+from .resilience import is_error_result
+
+# Default lifetime in seconds of a cached answer, by the sub-agent that produced it.
+# An answer lives as long as the shortest lifetime of the agents it used; 0 disables caching.
+DEFAULT_AGENT_TTLS = {
+    "DateTimeAgent": 0,
+    "DiceRoller": 0,
+    "SearchAgent": 10 * 60,
+    "FileSystemAgent": 10 * 60,
+    "fetch": 60 * 60,
+    "YouTubeAgent": 24 * 60 * 60,
+    "SummaryAgent": 24 * 60 * 60,
+}
+
+# Session state key counting the turns the cache has seen in a session.
+TURNS_STATE_KEY = "response_cache_turns"
+
+# Session state key holding a hash of the session's earlier messages and answers.
+CONTEXT_STATE_KEY = "response_cache_context"
+
+# Follow-up messages shorter than this (e.g. "and the second one?") depend on the
+# conversation, so they are neither served from nor stored in the cache.
+MIN_FOLLOW_UP_WORDS = 6
+
+
+def parse_ttls(value: str) -> dict:
+    """Parses 'AgentName=seconds,...' into a dict of TTLs."""
+    ttls = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+def gemini_embed(model: str) -> Callable[[str], Awaitable[list[float]]]:
+    """Returns a function that embeds a text with the given Gemini embedding model."""
+    client = None
+
+    async def embed(text: str) -> list[float]:
+        nonlocal client
+        if client is None:
+            from google import genai
+            client = genai.Client()
+        response = await client.aio.models.embed_content(model=model, contents=text)
+        return list(response.embeddings[0].values)
+
+    return embed
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower()).rstrip(" .!?")
+
+
+def _extend_context(context: str, text: str, response: str | None) -> str:
+    """Returns the hash of a session's turns after one more message and answer."""
+    return hashlib.sha256("\x1f".join((context, text, response or "")).encode("utf-8")).hexdigest()
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _url_validator(url: str) -> str | None:
+    """Returns the ETag or Last-Modified header of a URL, or None if it has neither."""
+    request = urllib.request.Request(url, method="HEAD", headers={"User-Agent": "Mozilla/5.0"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.headers.get("ETag") or response.headers.get("Last-Modified")
+    except Exception:
+        return None
+
+
+class ResponseCache:
+    """
+    Caches the root agent's answers to repeated and near-duplicate questions.
+
+    Lookups try an exact match on the normalized message first, then the most similar
+    cached question by embedding, if it scores at least `similarity_threshold`. Entries
+    are scoped to the app, the user and a hash of the session's earlier turns, so a
+    follow-up such as "translate that into Korean" only matches after the same
+    conversation. Follow-ups answered without any sub-agent are not stored. An entry
+    expires after the shortest TTL of the sub-agents used to produce it. Answers that
+    read files are invalidated when the file index's background refresh sees a change
+    (so a write made by the turn itself invalidates it too), and answers about URLs
+    when the URL's ETag or Last-Modified header changes.
+
+    Used through the root agent's callbacks: `before_agent` serves hits, `after_tool` and
+    `after_model` record what a turn used and answered, and `after_agent` stores the entry.
+
+    Args:
+        agent_ttls: TTL in seconds per sub-agent name.
+        default_ttl: TTL for first-turn answers that used no sub-agent, and for agents without a TTL.
+        embed: Async function returning the embedding of a text. None disables the similarity tier.
+        similarity_threshold: Minimum cosine similarity for a near-duplicate hit.
+        max_entries: Maximum number of cached answers, evicted least recently used first.
+        file_index: The `FileIndex` whose changes invalidate answers from the FileSystemAgent.
+    """
+
+    def __init__(self, agent_ttls: dict | None = None, default_ttl: float = 10 * 60,
+                 embed: Callable[[str], Awaitable[list[float]]] | None = None,
+                 similarity_threshold: float = 0.92, max_entries: int = 512, file_index=None):
+        self.agent_ttls = {**DEFAULT_AGENT_TTLS, **(agent_ttls or {})}
+        self.default_ttl = default_ttl
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.file_index = file_index
+        self._entries = LRUCache(max_entries)
+        # invocation_id -> what the running turn used and answered. Bounded, since a failed
+        # turn never reaches `after_agent`.
+        self._turns = LRUCache(1024)
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.seconds_saved = 0.0
+
+    # --- Callbacks ---
+
+    async def before_agent(self, callback_context):
+        text = "".join(part.text or "" for part in (callback_context.user_content.parts or [])) \
+            if callback_context.user_content else ""
+        turns = callback_context.state.get(TURNS_STATE_KEY, 0)
+        callback_context.state[TURNS_STATE_KEY] = turns + 1
+        context = callback_context.state.get(CONTEXT_STATE_KEY, "")
+        scope = (callback_context.session.app_name, callback_context.user_id, context)
+        turn = {"key": (*scope, _normalize(text)), "scope": scope, "text": text, "follow_up": bool(turns),
+                "started": time.perf_counter(), "agents": set(), "response": None,
+                "cacheable": bool(text.strip()) and not (turns and len(text.split()) < MIN_FOLLOW_UP_WORDS)}
+        # Every turn is tracked, so the context hash covers the whole conversation.
+        self._turns.put(callback_context.invocation_id, turn)
+        if not turn["cacheable"]:
+            return None
+
+        key = turn["key"]
+        entry = self._entries.get(key)
+        if entry is not None and await self._is_valid(key, entry):
+            self.exact_hits += 1
+            return self._serve(callback_context, turn, entry)
+
+        if self.embed is not None:
+            try:
+                turn["embedding"] = await self.embed(text)
+            except Exception as e:
+                print(f"Response cache could not embed the message: {e}")
+            else:
+                match = self._most_similar(scope, turn["embedding"])
+                if match is not None and await self._is_valid(*match):
+                    self.semantic_hits += 1
+                    return self._serve(callback_context, turn, match[1])
+
+        self.misses += 1
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        turn = self._turns.get(tool_context.invocation_id)
+        if turn is not None:
+            turn["agents"].add(tool.name)
+            turn["agents"].update(args.get("agent_names") or [])
+            # An answer written around a failed or unavailable agent is not worth repeating.
+            results = (tool_response.get("results") or []) if isinstance(tool_response, dict) else []
+            if is_error_result(tool_response) or any(is_error_result(result) for result in results):
+                turn["tool_failed"] = True
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        turn = self._turns.get(callback_context.invocation_id)
+        if turn is None or llm_response.partial or not llm_response.content:
+            return None
+        parts = llm_response.content.parts or []
+        if any(part.function_call for part in parts):
+            return None
+        text = "".join(part.text or "" for part in parts).strip()
+        if text:
+            turn["response"] = text
+        return None
+
+    async def after_agent(self, callback_context):
+        turn = self._turns.pop(callback_context.invocation_id, None)
+        if turn is None:
+            return None
+        callback_context.state[CONTEXT_STATE_KEY] = _extend_context(turn["scope"][2], turn["text"], turn["response"])
+        if not turn["cacheable"] or not turn["response"] or turn.get("tool_failed"):
+            return None
+
+        ttls = [self.agent_ttls[agent] for agent in turn["agents"] if agent in self.agent_ttls]
+        if not ttls and turn["follow_up"]:
+            # Answered from the conversation alone; nothing outside the session to reuse.
+            return None
+        ttl = min(ttls) if ttls else self.default_ttl
+        if ttl <= 0:
+            return None
+
+        entry = {
+            "scope": turn["scope"],
+            "response": turn["response"],
+            "embedding": turn.get("embedding"),
+            "expires_at": time.time() + ttl,
+            "seconds": time.perf_counter() - turn["started"],
+        }
+        if "FileSystemAgent" in turn["agents"] and self.file_index is not None:
+            entry["file_generation"] = self.file_index.generation
+        urls = re.findall(r"https?://[^\s\"'<>]+", turn["text"])
+        if urls:
+            validators = await asyncio.gather(*(asyncio.to_thread(_url_validator, url) for url in urls))
+            entry["urls"] = dict(zip(urls, validators))
+
+        self._entries.put(turn["key"], entry)
+        return None
+
+    # --- Lookup ---
+
+    def _serve(self, callback_context, turn: dict, entry: dict):
+        # The agent run ends here, so `after_agent` won't extend the context hash.
+        self._turns.pop(callback_context.invocation_id, None)
+        callback_context.state[CONTEXT_STATE_KEY] = _extend_context(turn["scope"][2], turn["text"], entry["response"])
+        self.seconds_saved += entry["seconds"]
+        return types.Content(role="model", parts=[types.Part(text=entry["response"])])
+
+    def _most_similar(self, scope: tuple, embedding: list[float]):
+        best, best_score = None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if entry["scope"] != scope or entry.get("embedding") is None:
+                continue
+            score = _cosine(embedding, entry["embedding"])
+            if score >= best_score:
+                best, best_score = (key, entry), score
+        return best
+
+    async def _is_valid(self, key: tuple, entry: dict) -> bool:
+        valid = time.time() < entry["expires_at"]
+        if valid and "file_generation" in entry and self.file_index is not None:
+            valid = self.file_index.generation == entry["file_generation"]
+        if valid and entry.get("urls"):
+            urls = [url for url, validator in entry["urls"].items() if validator is not None]
+            current = await asyncio.gather(*(asyncio.to_thread(_url_validator, url) for url in urls))
+            valid = all(entry["urls"][url] == validator for url, validator in zip(urls, current))
+        if not valid:
+            self._entries.pop(key)
+            self.invalidations += 1
+        return valid
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "seconds_saved": self.seconds_saved,
+        }
@@ -0,0 +1,367 @@
+import asyncio
+import re
+import time
+from typing import Callable, NamedTuple
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from .youtube import get_youtube_id
+
+# --- Routes ---
+
+class Route(NamedTuple):
+    """
+    Result of routing a user message.
+
+    Attributes:
+        intent: 'datetime', 'dice', 'youtube', or None when no fast path applies.
+        confidence: Confidence of the routing decision between 0 and 1.
+        args: Arguments for the intent handler (e.g. the number of dice or the URL).
+        language: 'ko' for Korean messages, 'en' otherwise.
+    """
+    intent: str | None
+    confidence: float
+    args: dict
+    language: str
+
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "한": 1, "하나": 1, "두": 2, "둘": 2, "세": 3, "셋": 3, "네": 4, "넷": 4, "다섯": 5,
+    "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10,
+}
+
+# Largest number of dice answered without the model.
+MAX_FAST_PATH_DICE = 100
+
+# --- Rules ---
+# Rules match the whole message, so anything beyond the trivial request falls through.
+
+# Korean endings of a question or request about the date or time (e.g. "가 뭐야", "알려줘").
+KO_ASK = (r"(?:\s*(?:이|가|은|는)?\s*(?:뭐야|뭐예요|뭐에요|뭐니|어떻게 돼|어떻게 되나요|야|이야|예요|이에요|인가요|니|지"
+          r"|(?:좀\s*)?(?:알려|말해)\s*(?:줘|주세요|줄래)))?")
+
+DATETIME_RULES = [
+    re.compile(r"^what(?:'s| is) the (?:current )?(?:date and time|time and date|time|date)(?: now| today| right now)?$"),
+    re.compile(r"^what(?:'s| is) (?:today's date|the date today|the time now)$"),
+    re.compile(r"^what time is it(?: now| right now)?$"),
+    re.compile(r"^what day is (?:it|today)$"),
+    re.compile(r"^(?:current )?(?:date and time|time and date|time|date)(?: now)?(?: please)?$"),
+    re.compile(r"^(?:please )?(?:tell|show|give) me the (?:current )?(?:date and time|time and date|time|date)(?: now)?$"),
+    re.compile(r"^(?:지금|현재)\s*(?:몇\s*시|시간|날짜와 시간|날짜)" + KO_ASK + "$"),
+    re.compile(r"^오늘\s*(?:며칠|날짜|무슨\s*요일)" + KO_ASK + "$"),
+    re.compile(r"^몇\s*시(?:야|예요|에요|인가요|니|지)?$"),
+]
+
+DICE_RULES = [
+    re.compile(r"^(?:please )?roll (?P<n>\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten)"
+               r" (?:six-sided |6-sided )?(?:dice|die|d6)(?: for me)?(?: please)?$"),
+    re.compile(r"^(?:please )?roll (?:the |some )?dice(?: for me)?(?: please)?$"),
+    re.compile(r"^주사위\s*(?P<n>\d+|한|하나|두|둘|세|셋|네|넷|다섯|여섯|일곱|여덟|아홉|열)?\s*(?:개|번)?\s*(?:를|을|만)?\s*"
+               r"(?:굴려|던져)(?:\s*(?:줘|주세요|봐|줄래))?$"),
+]
+
+TRANSCRIPT_KEYWORDS = ("transcript", "script", "자막", "스크립트", "대본")
+
+# --- Classifier ---
+# Keyword weights for messages that no rule matches. Negative cues point to requests the
+# tool cannot answer on its own (other time zones, date arithmetic, questions about dice).
+
+KEYWORD_WEIGHTS = {
+    "datetime": {
+        "time": 0.45, "date": 0.45, "today": 0.3, "now": 0.2, "clock": 0.3, "current": 0.15,
+        "day": 0.2, "시간": 0.45, "날짜": 0.45, "몇 시": 0.5, "오늘": 0.3, "지금": 0.2, "요일": 0.3,
+    },
+    "dice": {
+        "roll": 0.4, "dice": 0.55, "die": 0.45, "d6": 0.55, "주사위": 0.6, "굴려": 0.3, "던져": 0.3,
+    },
+}
+
+NEGATIVE_CUES = {
+    "in", "timezone", "zone", "until", "since", "ago", "convert", "between", "when", "why", "how",
+    "history", "meaning", "probability", "odds", "game", "sunset", "sunrise", "flight", "weather",
+    "after", "before", "later", "from", "days", "weeks", "and", "then", "have", "free", "joke", "jokes",
+    "시차", "까지", "전에", "후에", "확률", "왜", "어떻게",
+    "후", "뒤", "기준", "남았", "걸려", "걸리", "있어", "있니", "있나", "있으", "만큼", "농담", "그리고",
+}
+
+# Words that carry no request of their own. Any other word that holds no keyword means the
+# message asks for more than the tool does (e.g. "roll a die and tell that many jokes").
+FILLER_WORDS = {
+    "what", "what's", "is", "it", "the", "a", "an", "me", "please", "tell", "show", "give", "for",
+    "some", "right", "i", "need", "can", "you", "my", "of", "us",
+    "좀", "줘", "주세요", "줄래", "알려줘", "알려주세요", "뭐야", "뭐예요", "개", "번", "야", "요",
+}
+
+# Messages longer than this many words are never classified as trivial.
+MAX_CLASSIFIED_WORDS = 8
+
+
+def _is_korean(text: str) -> bool:
+    return re.search(r"[가-힣]", text) is not None
+
+
+def _normalize(text: str) -> str:
+    text = text.strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" .!?")
+
+
+def _dice_count(value: str | None) -> int:
+    if value is None:
+        return 1
+    if value.isdigit():
+        return int(value)
+    return NUMBER_WORDS.get(value, 1)
+
+
+def classify(text: str) -> tuple[str | None, float]:
+    """
+    Scores the message against the keyword weights of each intent.
+
+    Returns:
+        A tuple of (intent, confidence), with intent None if nothing scored.
+    """
+    normalized = _normalize(text)
+    words = re.findall(r"[\w']+", normalized)
+    scores = {}
+    for intent, weights in KEYWORD_WEIGHTS.items():
+        score = 0.0
+        for keyword, weight in weights.items():
+            # Korean particles attach to words, so Korean keywords match as substrings.
+            if (keyword in words) if keyword.isascii() else (keyword in normalized):
+                score += weight
+        scores[intent] = min(score, 1.0)
+
+    intent, best = max(scores.items(), key=lambda item: item[1])
+    if best == 0.0:
+        return None, 0.0
+
+    runner_up = max(score for other, score in scores.items() if other != intent)
+    confidence = best - runner_up / 2
+    if any(cue in words if cue.isascii() else cue in normalized for cue in NEGATIVE_CUES):
+        confidence *= 0.4
+    keywords = [keyword for weights in KEYWORD_WEIGHTS.values() for keyword in weights]
+    unexplained = [
+        word for word in words
+        if word not in FILLER_WORDS and word not in NUMBER_WORDS and not word.isdigit()
+        and not any(keyword == word if keyword.isascii() else keyword in word for keyword in keywords)
+    ]
+    if unexplained:
+        confidence *= 0.5
+    if len(words) > MAX_CLASSIFIED_WORDS:
+        confidence *= 0.5
+    return intent, confidence
+
+
+def route_message(text: str) -> Route:
+    """
+    Routes a user message with the rules first and the keyword classifier second.
+
+    Args:
+        text: The user's message.
+
+    Returns:
+        The chosen route. Its intent is None when the message needs the model.
+    """
+    language = "ko" if _is_korean(text) else "en"
+    normalized = _normalize(text)
+
+    # A YouTube URL with a request for its transcript. A bare URL goes to the model, which
+    # decides what the user wants from the video instead of returning the raw transcript.
+    urls = re.findall(r"https?://\S+", text)
+    if len(urls) == 1 and get_youtube_id(urls[0]):
+        rest = _normalize(text.replace(urls[0], ""))
+        if any(keyword in rest for keyword in TRANSCRIPT_KEYWORDS) and len(rest.split()) <= 4:
+            return Route("youtube", 0.9, {"url": urls[0]}, language)
+        return Route(None, 0.0, {}, language)
+    if urls:
+        return Route(None, 0.0, {}, language)
+
+    for rule in DATETIME_RULES:
+        if rule.search(normalized):
+            return Route("datetime", 1.0, {}, language)
+
+    for rule in DICE_RULES:
+        match = rule.search(normalized)
+        if match:
+            n_dice = _dice_count(match.groupdict().get("n"))
+            if 1 <= n_dice <= MAX_FAST_PATH_DICE:
+                return Route("dice", 1.0, {"n_dice": n_dice}, language)
+            return Route(None, 0.0, {}, language)
+
+    intent, confidence = classify(text)
+    args = {}
+    if intent == "dice":
+        numbers = [word for word in re.findall(r"[\w']+", normalized) if word.isdigit() or word in NUMBER_WORDS]
+        args["n_dice"] = _dice_count(numbers[0]) if numbers else 1
+        if not 1 <= args["n_dice"] <= MAX_FAST_PATH_DICE:
+            return Route(None, 0.0, {}, language)
+    return Route(intent, confidence, args, language)
+
+
+# --- Fast Path ---
+
+class FastPathRouter:
+    """
+    Answers trivial requests directly with a tool and skips the model round trips.
+
+    Used as the root agent's `before_model_callback`: when the latest user message routes
+    to a handler with enough confidence, the handler's answer is returned as the model
+    response. Otherwise, or when the handler fails, the request goes to the model as usual.
+    Handlers run in a worker thread, since they may block on network calls or imports.
+
+    Args:
+        handlers: Maps an intent to a function that takes the `Route` and returns the answer,
+            or None to fall back to the model.
+        min_confidence: Minimum routing confidence for answering without the model.
+    """
+
+    def __init__(self, handlers: dict[str, Callable[[Route], str | None]], min_confidence: float = 0.8):
+        self.handlers = handlers
+        self.min_confidence = min_confidence
+        self.routed = {}
+        self.fallbacks = 0
+        self.handler_seconds = 0.0
+
+    async def before_model(self, callback_context, llm_request):
+        contents = llm_request.contents
+        if not contents or contents[-1].role != "user":
+            return None
+        parts = contents[-1].parts or []
+        # Only the first model call of a turn is routed, never a call following a tool response.
+        if any(part.function_response for part in parts):
+            return None
+        text = "".join(part.text or "" for part in parts).strip()
+        if not text:
+            return None
+
+        route = route_message(text)
+        if route.intent not in self.handlers or route.confidence < self.min_confidence:
+            self.fallbacks += 1
+            return None
+
+        start = time.perf_counter()
+        try:
+            answer = await asyncio.to_thread(self.handlers[route.intent], route)
+        except Exception as e:
+            print(f"Fast path for '{route.intent}' failed, falling back to the model: {e}")
+            answer = None
+        self.handler_seconds += time.perf_counter() - start
+
+        if not answer:
+            self.fallbacks += 1
+            return None
+
+        self.routed[route.intent] = self.routed.get(route.intent, 0) + 1
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)]))
+
+    def stats(self) -> dict:
+        return {
+            "routed": dict(self.routed),
+            "fallbacks": self.fallbacks,
+            "handler_seconds": self.handler_seconds,
+        }
+
+
+# --- Evaluation ---
+# Labelled messages for measuring routing accuracy. None means the model must handle it.
+
+EVALUATION_CORPUS = [
+    ("What time is it?", "datetime"),
+    ("what's the current time", "datetime"),
+    ("What's the current date and time?", "datetime"),
+    ("What is the date today?", "datetime"),
+    ("what day is it", "datetime"),
+    ("time now please", "datetime"),
+    ("Tell me the current time", "datetime"),
+    ("지금 몇 시야?", "datetime"),
+    ("현재 시간 알려줘", "datetime"),
+    ("오늘 날짜가 뭐야?", "datetime"),
+    ("오늘 며칠이야?", "datetime"),
+    ("오늘 무슨 요일이야?", "datetime"),
+    ("현재 시간 좀 알려줘", "datetime"),
+    ("지금 날짜와 시간", "datetime"),
+    ("What time is it in Tokyo?", None),
+    ("How many days until Christmas?", None),
+    ("What was the date of the moon landing?", None),
+    ("Is it a good time to buy a house?", None),
+    ("오늘 날짜 기준으로 3일 후는?", None),
+    ("지금 시간 있어?", None),
+    ("현재 시간으로부터 두 시간 뒤는 몇 시야?", None),
+    ("오늘 날짜를 영어로 써줘", None),
+    ("What's the date in three days?", None),
+    ("Do you have time now?", None),
+    ("Roll 3 dice.", "dice"),
+    ("roll a die", "dice"),
+    ("Please roll two six-sided dice", "dice"),
+    ("roll the dice", "dice"),
+    ("Roll 5 d6 for me", "dice"),
+    ("주사위 3개 굴려줘", "dice"),
+    ("주사위 던져", "dice"),
+    ("roll dice 4", "dice"),
+    ("주사위 두 개 굴려 줘", "dice"),
+    ("What is the probability of rolling two sixes?", None),
+    ("주사위 굴려서 나온 숫자만큼 농담해줘", None),
+    ("Roll a die and tell me that many jokes", None),
+    ("roll 2 dice and add 5", None),
+    ("주사위 게임 규칙 알려줘", None),
+    ("Roll 100000 dice", None),
+    ("Who invented dice?", None),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", None),
+    ("https://youtu.be/dQw4w9WgXcQ", None),
+    ("transcript https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube"),
+    ("https://youtu.be/dQw4w9WgXcQ 자막", "youtube"),
+    ("Summarize this video https://youtu.be/dQw4w9WgXcQ and compare it with the article", None),
+    ("Get me the content from this URL: https://example.com", None),
+    ("What is the capital of France?", None),
+    ("List the files in my downloads folder.", None),
+    ("Summarize this text for me.", None),
+    ("Tell me about the latest news.", None),
+    ("파일 목록 보여줘", None),
+]
+
+
+def evaluate(corpus=EVALUATION_CORPUS, min_confidence: float = 0.8, model_latency: float = 1.5) -> dict:
+    """
+    Measures routing accuracy on a labelled corpus and estimates the latency saved.
+
+    Args:
+        corpus: A list of (message, expected intent or None) pairs.
+        min_confidence: Minimum confidence for taking the fast path.
+        model_latency: Assumed seconds per model call; each fast-pathed request skips
+            the root model call and the sub-agent model call.
+
+    Returns:
+        A dict with accuracy, fast-path precision and coverage, routing time and the estimated savings.
+    """
+    correct = routed = routed_correct = expected_routes = 0
+    errors = []
+    start = time.perf_counter()
+    for text, expected in corpus:
+        route = route_message(text)
+        predicted = route.intent if route.confidence >= min_confidence else None
+        correct += predicted == expected
+        expected_routes += expected is not None
+        if predicted is not None:
+            routed += 1
+            routed_correct += predicted == expected
+        if predicted != expected:
+            errors.append({"message": text, "expected": expected, "predicted": predicted,
+                           "confidence": round(route.confidence, 2)})
+    routing_seconds = time.perf_counter() - start
+
+    return {
+        "messages": len(corpus),
+        "accuracy": correct / len(corpus),
+        "fast_path_precision": routed_correct / routed if routed else 0.0,
+        "fast_path_coverage": routed_correct / expected_routes if expected_routes else 0.0,
+        "avg_routing_ms": routing_seconds / len(corpus) * 1000,
+        "estimated_seconds_saved": routed_correct * 2 * model_latency,
+        "errors": errors,
+    }
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(evaluate(), indent=2, ensure_ascii=False))
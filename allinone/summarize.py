@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import re
+from typing import Awaitable, Callable
+from google.genai import types
+from .cache import ContentStore
+from .tracing import traced
+
+MAP_PROMPT = """
+Summarize the following section of a longer document.
+Keep the key points, names, numbers and conclusions. Write in the same language as the section.
+
+{text}
+"""
+
+REDUCE_PROMPT = """
+The following are summaries of consecutive sections of one document.
+Combine them into a single coherent summary that keeps the key points in order.
+Write in the same language as the summaries.
+
+{text}
+"""
+
+CONDENSED_HEADER = (
+    "The text the user provided was too long to process at once. "
+    "Below are summaries of its consecutive sections; summarize the whole document from them, "
+    "following the user's instructions.\n\n"
+)
+
+# A first or last line of a long message up to this many estimated tokens is treated as
+# the user's instructions (e.g. "Summarize this in 3 bullets in Korean:") and kept verbatim.
+INSTRUCTION_MAX_TOKENS = 200
+
+# A unit ends a chunk with probability 1 / BOUNDARY_MODULUS once the chunk is a quarter full.
+# Boundaries depend only on the content of the unit, so an edit moves at most the boundaries
+# around it and the other chunks keep their cached summaries.
+BOUNDARY_MODULUS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimates the number of tokens in `text` (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _split_units(text: str, max_tokens: int) -> list[str]:
+    """Splits text into paragraphs, then sentences, then word windows, each within `max_tokens`."""
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?。])\s+", paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append(sentence)
+                continue
+            # Transcripts often have no punctuation at all; fall back to word windows.
+            words = sentence.split()
+            window = []
+            for word in words:
+                window.append(word)
+                if estimate_tokens(" ".join(window)) >= max_tokens:
+                    units.append(" ".join(window))
+                    window = []
+            if window:
+                units.append(" ".join(window))
+    return units
+
+
+def split_instructions(text: str) -> tuple[str, str, str]:
+    """
+    Splits a message into a short leading line, the body, and a short trailing line.
+
+    Args:
+        text: The user message.
+
+    Returns:
+        (head, body, tail); head and tail are empty unless the first or last line of the
+        message is at most `INSTRUCTION_MAX_TOKENS` long.
+    """
+    text = text.strip()
+    head = tail = ""
+    first, sep, rest = text.partition("\n")
+    if sep and estimate_tokens(first) <= INSTRUCTION_MAX_TOKENS:
+        head, text = first.strip(), rest.strip()
+    rest, sep, last = text.rpartition("\n")
+    if sep and estimate_tokens(last) <= INSTRUCTION_MAX_TOKENS:
+        text, tail = rest.strip(), last.strip()
+    return head, text, tail
+
+
+def chunk_text(text: str, max_tokens: int = 2000) -> list[str]:
+    """
+    Splits text into chunks of at most `max_tokens` with content-defined boundaries.
+
+    Args:
+        text: The text to split.
+        max_tokens: Upper bound for the estimated token count of a chunk.
+
+    Returns:
+        The list of chunks in document order.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in _split_units(text, max_tokens):
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+        digest = hashlib.sha256(unit.encode("utf-8")).digest()
+        if current_tokens >= max_tokens // 4 and digest[0] % BOUNDARY_MODULUS == 0:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def gemini_generate(model: str) -> Callable[[str], Awaitable[str]]:
+    """Returns a function that generates text for a prompt with the given Gemini model."""
+    client = None
+
+    @traced("summarize_generate")
+    async def generate(prompt: str) -> str:
+        nonlocal client
+        if client is None:
+            from google import genai
+            client = genai.Client()
+        response = await client.aio.models.generate_content(model=model, contents=prompt)
+        return response.text or ""
+
+    return generate
+
+
+class MapReduceSummarizer:
+    """
+    Summarizes texts that are too long for a single prompt.
+
+    The text is split into token-bounded chunks which are summarized concurrently,
+    then the partial summaries are combined in groups of `fan_in` until the result
+    fits into one chunk. Every model call is cached by the hash of the model name and
+    its prompt, so re-summarizing a slightly edited document only redoes the changed
+    chunks and the reduce steps above them, and a new model doesn't serve the old
+    model's summaries.
+
+    Args:
+        generate: Async function that returns the model output for a prompt.
+        store: Optional store for caching the summaries across processes.
+        model: Name of the model behind `generate`, part of every cache key.
+        max_chunk_tokens: Upper bound for the estimated tokens of a chunk.
+        threshold_tokens: Inputs longer than this are condensed before reaching the model.
+        max_concurrency: Maximum number of concurrent model calls.
+        fan_in: Number of partial summaries combined by one reduce call.
+    """
+
+    def __init__(self, generate: Callable[[str], Awaitable[str]], store: ContentStore | None = None,
+                 model: str = "", max_chunk_tokens: int = 2000, threshold_tokens: int = 8000,
+                 max_concurrency: int = 4, fan_in: int = 8):
+        self.generate = generate
+        self.store = store
+        self.model = model
+        self.max_chunk_tokens = max_chunk_tokens
+        self.threshold_tokens = threshold_tokens
+        self.max_concurrency = max_concurrency
+        self.fan_in = max(2, fan_in)
+        self.model_calls = 0
+        self.cache_hits = 0
+
+    async def summarize(self, text: str) -> str:
+        """Returns a single summary of `text`."""
+        condensed = await self.condense(text)
+        if condensed == text.strip():
+            return await self._cached_generate(MAP_PROMPT, text, asyncio.Semaphore(1))
+        return await self._cached_generate(REDUCE_PROMPT, condensed, asyncio.Semaphore(1))
+
+    async def condense(self, text: str) -> str:
+        """
+        Reduces `text` to partial summaries that fit into one chunk.
+        Texts that already fit are returned unchanged.
+        """
+        text = text.strip()
+        if estimate_tokens(text) <= self.max_chunk_tokens:
+            return text
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        chunks = chunk_text(text, self.max_chunk_tokens)
+        partials = await asyncio.gather(*(self._cached_generate(MAP_PROMPT, chunk, semaphore) for chunk in chunks))
+
+        # Combine the partial summaries level by level until they fit into one chunk.
+        while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > self.max_chunk_tokens:
+            groups = [partials[i:i + self.fan_in] for i in range(0, len(partials), self.fan_in)]
+            partials = await asyncio.gather(
+                *(self._cached_generate(REDUCE_PROMPT, "\n\n".join(group), semaphore) for group in groups)
+            )
+        return "\n\n".join(partials)
+
+    async def before_model(self, callback_context, llm_request):
+        """
+        `before_model_callback` that replaces the long body of an overly long user message
+        with the partial summaries of its sections, so the agent's model writes the final
+        summary. A short first or last line, which usually holds the user's instructions,
+        is kept as it is.
+        """
+        contents = llm_request.contents
+        if not contents or contents[-1].role != "user":
+            return None
+        text = "".join(part.text or "" for part in contents[-1].parts or [])
+        if estimate_tokens(text) <= self.threshold_tokens:
+            return None
+
+        head, body, tail = split_instructions(text)
+        condensed = await self.condense(body)
+        texts = [head, CONDENSED_HEADER + condensed, tail]
+        contents[-1] = types.Content(role="user", parts=[types.Part(text=text) for text in texts if text])
+        return None
+
+    def stats(self) -> dict:
+        return {"model_calls": self.model_calls, "cache_hits": self.cache_hits}
+
+    async def _cached_generate(self, template: str, text: str, semaphore: asyncio.Semaphore) -> str:
+        prompt = template.format(text=text)
+        key = hashlib.sha256(f"{self.model}\0{prompt}".encode("utf-8")).hexdigest()
+        # The store reads and writes files, so it runs off the event loop.
+        if self.store is not None:
+            cached = await asyncio.to_thread(self.store.get, key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached.decode("utf-8")
+
+        async with semaphore:
+            self.model_calls += 1
+            summary = (await self.generate(prompt)).strip()
+
+        if self.store is not None and summary:
+            await asyncio.to_thread(self.store.put, key, summary.encode("utf-8"))
+        return summary
@@ -0,0 +1,320 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from .cache import LRUCache
+
+# The span that new spans are attached to. Sub-agents run inside the tool call of their
+# AgentTool, so their spans nest under it even though they get a new invocation ID.
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed operation within a trace: an agent run, a model call, a tool call or a function.
+
+    Attributes:
+        name: What ran, e.g. the agent, model or tool name.
+        kind: 'agent', 'model', 'tool' or 'function'.
+        trace_id: ID shared by all spans of one turn (the root invocation ID).
+        span_id: ID of this span.
+        parent_id: ID of the enclosing span, or None for the root span.
+        start: Start time in seconds since the epoch.
+        end: End time in seconds since the epoch, or None while running.
+        attributes: Token counts, byte sizes and other details.
+    """
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent=None, attributes: dict | None = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.end = None
+        self.attributes = attributes or {}
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round((self.end - self.start) * 1000, 3) if self.end else None,
+            "attributes": self.attributes,
+        }
+
+
+# --- Exporters ---
+
+class JsonlExporter:
+    """
+    Appends finished spans to a JSONL file, one span per line.
+    The file is rotated to `<path>.1` once it grows beyond `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 20 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class OtlpExporter:
+    """
+    Exports spans to an OTLP/HTTP collector through the OpenTelemetry SDK.
+    Requires the `opentelemetry-sdk` and `opentelemetry-exporter-otlp-proto-http` packages.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "gemagent"):
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry import trace
+
+        self._trace = trace
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        self._tracer = provider.get_tracer("gemagent")
+        self._spans = LRUCache(4096)
+
+    def on_start(self, span: Span) -> None:
+        parent = self._spans.get(span.parent_id) if span.parent_id else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self._tracer.start_span(f"{span.kind} {span.name}", context=context,
+                                            start_time=int(span.start * 1e9))
+        otel_span.set_attribute("gemagent.trace_id", span.trace_id)
+        self._spans.put(span.span_id, otel_span)
+
+    def on_end(self, span: Span) -> None:
+        otel_span = self._spans.pop(span.span_id)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        otel_span.end(end_time=int(span.end * 1e9))
+
+
+# --- Helpers ---
+
+def _callbacks(value) -> list:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, list) else [value]
+
+
+def _size(value) -> int:
+    """Returns the size in bytes of a value serialized as JSON."""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except Exception:
+        return len(str(value).encode("utf-8"))
+
+
+def _contents_size(contents) -> int:
+    size = 0
+    for content in contents or []:
+        for part in content.parts or []:
+            if part.text:
+                size += len(part.text.encode("utf-8"))
+            elif part.function_call:
+                size += _size(part.function_call.args)
+            elif part.function_response:
+                size += _size(part.function_response.response)
+    return size
+
+
+class Tracer:
+    """
+    Records spans for agent runs, model calls and tool calls through ADK callbacks.
+
+    `instrument(agent)` adds the tracing callbacks to an agent; model spans carry token
+    counts from the usage metadata, and model and tool spans carry request and response
+    sizes in bytes. Finished spans are passed to every exporter.
+
+    Args:
+        exporters: Objects with `on_start(span)` and `on_end(span)` methods.
+    """
+
+    def __init__(self, exporters: list):
+        self.exporters = exporters
+        # Spans waiting for their "after" callback. Bounded, since a short-circuited
+        # agent run never reaches its "after" callbacks.
+        self._open = LRUCache(4096)
+
+    # --- Spans ---
+
+    def start_span(self, name: str, kind: str, key=None, trace_id: str | None = None, attributes: dict | None = None) -> Span:
+        parent = _current_span.get()
+        span = Span(name, kind, parent.trace_id if parent else (trace_id or uuid.uuid4().hex),
+                    parent=parent, attributes=attributes)
+        _current_span.set(span)
+        if key is not None:
+            self._open.put(key, span)
+        for exporter in self.exporters:
+            try:
+                exporter.on_start(span)
+            except Exception as e:
+                print(f"Failed to export span '{span.name}': {e}")
+        return span
+
+    def end_span(self, span: Span, attributes: dict | None = None) -> None:
+        if span.end is not None:
+            return
+        span.end = time.time()
+        span.attributes.update(attributes or {})
+        # Make the parent current again if this span or one of its descendants is current.
+        current = _current_span.get()
+        while current is not None and current is not span:
+            current = current.parent
+        if current is span:
+            _current_span.set(span.parent)
+        for exporter in self.exporters:
+            try:
+                exporter.on_end(span)
+            except Exception as e:
+                print(f"Failed to export span '{span.name}': {e}")
+
+    def _end_key(self, key, attributes: dict | None = None) -> None:
+        span = self._open.pop(key)
+        if span is not None:
+            self.end_span(span, attributes)
+
+    # --- Callbacks ---
+
+    def before_agent(self, callback_context):
+        self.start_span(callback_context.agent_name, "agent",
+                        key=("agent", callback_context.invocation_id, callback_context.agent_name),
+                        trace_id=callback_context.invocation_id)
+        return None
+
+    def after_agent(self, callback_context):
+        # A model call answered by a "before" callback (e.g. the fast path) has no "after" callback.
+        self._end_key(("model", callback_context.invocation_id, callback_context.agent_name), {"short_circuited": True})
+        self._end_key(("agent", callback_context.invocation_id, callback_context.agent_name))
+        return None
+
+    def before_model(self, callback_context, llm_request):
+        self._end_key(("model", callback_context.invocation_id, callback_context.agent_name), {"short_circuited": True})
+        self.start_span(llm_request.model or "model", "model",
+                        key=("model", callback_context.invocation_id, callback_context.agent_name),
+                        attributes={"agent": callback_context.agent_name,
+                                    "request_bytes": _contents_size(llm_request.contents)})
+        return None
+
+    def after_model(self, callback_context, llm_response):
+        # Streaming calls report partial chunks first; the span ends with the final response.
+        if llm_response.partial:
+            return None
+        attributes = {"response_bytes": _contents_size([llm_response.content] if llm_response.content else [])}
+        if llm_response.model_version:
+            attributes["model_version"] = llm_response.model_version
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            attributes["prompt_tokens"] = usage.prompt_token_count
+            attributes["output_tokens"] = usage.candidates_token_count
+            attributes["total_tokens"] = usage.total_token_count
+        self._end_key(("model", callback_context.invocation_id, callback_context.agent_name), attributes)
+        return None
+
+    def before_tool(self, tool, args, tool_context):
+        self.start_span(tool.name, "tool", key=("tool", tool_context.function_call_id),
+                        attributes={"agent": tool_context.agent_name, "args_bytes": _size(args)})
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        self._end_key(("tool", tool_context.function_call_id), {"response_bytes": _size(tool_response)})
+        return None
+
+    def instrument(self, agent) -> None:
+        """
+        Adds the tracing callbacks to an agent. "Before" callbacks go first, so a span starts
+        even when a later callback short-circuits the call; "after" callbacks go first too,
+        since a callback that replaces the result skips the ones after it.
+        """
+        agent.before_agent_callback = [self.before_agent, *_callbacks(agent.before_agent_callback)]
+        agent.after_agent_callback = [self.after_agent, *_callbacks(agent.after_agent_callback)]
+        agent.before_model_callback = [self.before_model, *_callbacks(agent.before_model_callback)]
+        agent.after_model_callback = [self.after_model, *_callbacks(agent.after_model_callback)]
+        agent.before_tool_callback = [self.before_tool, *_callbacks(agent.before_tool_callback)]
+        agent.after_tool_callback = [self.after_tool, *_callbacks(agent.after_tool_callback)]
+
+
+# --- Process-wide tracer ---
+
+tracer = Tracer([])
+
+
+def configure(jsonl_path: str | None = None, otlp_endpoint: str | None = None) -> Tracer:
+    """Sets the exporters of the process-wide tracer."""
+    exporters = []
+    if jsonl_path:
+        exporters.append(JsonlExporter(jsonl_path))
+    if otlp_endpoint:
+        try:
+            exporters.append(OtlpExporter(otlp_endpoint))
+        except ImportError:
+            print("OTLP export requires the opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http packages.")
+    tracer.exporters = exporters
+    return tracer
+
+
+def traced(name: str | None = None):
+    """
+    Decorator that records a 'function' span for every call of a sync or async function.
+    The span carries the size in bytes of the result.
+    """
+
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                span = tracer.start_span(span_name, "function")
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    tracer.end_span(span, {"error": f"{type(e).__name__}: {e}"})
+                    raise
+                tracer.end_span(span, {"response_bytes": _size(result)})
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            span = tracer.start_span(span_name, "function")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                tracer.end_span(span, {"error": f"{type(e).__name__}: {e}"})
+                raise
+            tracer.end_span(span, {"response_bytes": _size(result)})
+            return result
+        return wrapper
+
+    return decorator
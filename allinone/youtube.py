@@ -1,6 +1,45 @@
+import os
 import re
+import urllib.request
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Iterator
 from urllib.parse import urlparse, parse_qs
-from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
+from .cache import ContentStore, TranscriptCache, default_cache_dir
+from .tracing import traced
+
+# Cache key for the transcript picked by the default language preference.
+DEFAULT_LANGUAGE = "*"
+
+# youtube_transcript_api is imported on the first transcript request rather than at
+# startup; see `get_transcript_api()`.
+YouTubeTranscriptApi = None
+
+def get_transcript_api():
+    """Returns the YouTubeTranscriptApi class (youtube-transcript-api 1.x), importing it on first use."""
+    global YouTubeTranscriptApi
+    if YouTubeTranscriptApi is None:
+        from youtube_transcript_api import YouTubeTranscriptApi as api
+        YouTubeTranscriptApi = api
+    return YouTubeTranscriptApi
+
+@cache
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Returns the process-wide transcript cache, created on first use so that
+    the settings from the .env file are already loaded.
+    """
+    store = ContentStore(
+        os.getenv("TRANSCRIPT_CACHE_DIR", default_cache_dir("transcripts")),
+        ttl=float(os.getenv("TRANSCRIPT_CACHE_TTL", 7 * 24 * 60 * 60)),
+        max_bytes=int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", 256)) * 1024 * 1024,
+        memory_entries=int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ENTRIES", 64)),
+    )
+    return TranscriptCache(store)
+
+class TranscriptUnavailable(LookupError):
+    """Raised when a video has no transcript in any language."""
 
 def get_youtube_id(url: str) -> str | None:
     """
@@ -33,6 +72,141 @@ def get_youtube_id(url: str) -> str | None:
 
     return None
 
+@traced()
+def get_transcript_timeline(video_id: str) -> tuple[list[dict], list[float]] | None:
+    """
+    Returns the transcript segments of a video with their start times, served from the
+    transcript cache when possible. Prioritizes a list of languages and falls back to
+    the first available.
+
+    Args:
+        video_id: The YouTube video ID.
+
+    Returns:
+        A tuple of the segments, with 'text', 'start' and 'duration' keys, and the list
+        of their 'start' values, or None if the video has no transcript in any language.
+    """
+    transcript_cache = get_transcript_cache()
+    timeline = transcript_cache.get_timeline(video_id, DEFAULT_LANGUAGE)
+    if timeline is not None:
+        return timeline
+
+    from youtube_transcript_api import NoTranscriptFound
+    transcript_list = get_transcript_api()().list(video_id)
+
+    # Preferred languages in order; manually created transcripts win over generated ones
+    # of the same language.
+    preferred_languages = ['ko', 'en']
+    try:
+        selected_transcript = transcript_list.find_transcript(preferred_languages)
+    except NoTranscriptFound:
+        # Fall back to the first available transcript in any language.
+        selected_transcript = next(iter(transcript_list), None)
+        if selected_transcript is None:
+            print(f"Error: No transcript found for video ID: {video_id} in any language.")
+            return None
+
+    # Fetch the transcript data and keep the timing of each segment.
+    segments = [
+        {"text": entry.text, "start": entry.start, "duration": entry.duration}
+        for entry in selected_transcript.fetch()
+    ]
+
+    return transcript_cache.put(video_id, DEFAULT_LANGUAGE, segments)
+
+def get_transcript_segments(video_id: str) -> list[dict] | None:
+    """
+    Returns the transcript segments of a video, served from the transcript cache when possible.
+
+    Args:
+        video_id: The YouTube video ID.
+
+    Returns:
+        A list of segments with 'text', 'start' and 'duration' keys,
+        or None if the video has no transcript in any language.
+    """
+    timeline = get_transcript_timeline(video_id)
+    return timeline[0] if timeline else None
+
+def _require_video_id(youtube_url: str) -> str:
+    """Returns the video ID of a URL and checks that the video has a transcript."""
+    video_id = get_youtube_id(youtube_url)
+    if not video_id:
+        raise ValueError(f"Could not extract a video ID from the YouTube URL: {youtube_url}")
+    if get_transcript_timeline(video_id) is None:
+        raise TranscriptUnavailable(f"No transcript is available for {youtube_url} in any language.")
+    return video_id
+
+def iter_transcript_segments(video_id: str, start_seconds: float | None = None,
+                             end_seconds: float | None = None, max_chars: int | None = None) -> Iterator[dict]:
+    """
+    Lazily yields transcript segments with their timing, optionally limited to a time window.
+
+    Args:
+        video_id: The YouTube video ID.
+        start_seconds: Skip segments that end before this time.
+        end_seconds: Stop at the first segment starting at or after this time.
+        max_chars: Stop before the total text length would exceed this many characters.
+
+    Yields:
+        Segments with 'text', 'start' and 'duration' keys, in order.
+    """
+    timeline = get_transcript_timeline(video_id)
+    if not timeline:
+        return
+    segments, starts = timeline
+
+    # Segments are sorted by start time, so jump straight to the window.
+    first = 0
+    if start_seconds:
+        first = max(0, bisect_right(starts, start_seconds) - 1)
+
+    chars = 0
+    for segment in segments[first:]:
+        if start_seconds and segment["start"] + segment["duration"] <= start_seconds:
+            continue
+        if end_seconds is not None and segment["start"] >= end_seconds:
+            break
+        chars += len(segment["text"]) + 1
+        if max_chars is not None and chars > max_chars:
+            break
+        yield segment
+
+def format_timestamp(seconds: float) -> str:
+    """Formats seconds as 'MM:SS', or 'H:MM:SS' for times past the first hour."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+def get_youtube_transcript_window(youtube_url: str, start_minute: float = 0.0,
+                                  end_minute: float = 0.0, max_chars: int = 20000) -> str:
+    """
+    Retrieves part of a YouTube video transcript with a timestamp on every line.
+    Use this instead of the full transcript when only a time range is needed (e.g. "minutes 10-20").
+
+    Args:
+        youtube_url: The URL of the YouTube video (e.g., "https://www.youtube.com/watch?v=dQw4w9WgXcQ").
+        start_minute: Start of the time window in minutes. 0 starts at the beginning.
+        end_minute: End of the time window in minutes. 0 reads until the end of the video.
+        max_chars: Maximum number of transcript characters to return.
+
+    Returns:
+        Lines formatted as "[MM:SS] text".
+
+    Raises:
+        ValueError: The URL is not a YouTube video URL.
+        TranscriptUnavailable: The video has no transcript.
+        Network errors of the transcript API are raised as they are.
+    """
+    video_id = _require_video_id(youtube_url)
+    segments = iter_transcript_segments(
+        video_id,
+        start_seconds=start_minute * 60 if start_minute > 0 else None,
+        end_seconds=end_minute * 60 if end_minute > 0 else None,
+        max_chars=max_chars,
+    )
+    return "\n".join(f"[{format_timestamp(segment['start'])}] {segment['text']}" for segment in segments)
+
 def get_youtube_transcript(youtube_url: str) -> str:
     """
     Retrieves YouTube video transcript as plain text from a given URL.
@@ -43,54 +217,112 @@ def get_youtube_transcript(youtube_url: str) -> str:
 
     Returns:
         The transcript text without time information.
-        Returns an empty string if the transcript cannot be found or an error occurs.
+
+    Raises:
+        ValueError: The URL is not a YouTube video URL.
+        TranscriptUnavailable: The video has no transcript.
+        Network errors of the transcript API are raised as they are.
+    """
+    video_id = _require_video_id(youtube_url)
+    transcript_text = " ".join(segment["text"] for segment in iter_transcript_segments(video_id))
+    return transcript_text.strip()
+
+def get_playlist_video_ids(playlist_id: str) -> tuple[list[str], bool]:
     """
+    Retrieves the video IDs of a YouTube playlist from its public page.
+    The page lists only the first videos (about 100) of a long playlist.
+
+    Args:
+        playlist_id: The playlist ID, or a playlist URL containing a 'list' parameter.
+
+    Returns:
+        The video IDs in playlist order, without duplicates, and whether the playlist
+        has more videos than the page listed.
+    """
+    query_params = parse_qs(urlparse(playlist_id).query)
+    if "list" in query_params:
+        playlist_id = query_params["list"][0]
+
+    request = urllib.request.Request(
+        f"https://www.youtube.com/playlist?list={playlist_id}",
+        headers={"User-Agent": "Mozilla/5.0", "Accept-Language": "en-US,en;q=0.9"},
+    )
+    with urllib.request.urlopen(request, timeout=15) as response:
+        html = response.read().decode("utf-8", errors="replace")
+
+    video_ids = re.findall(r'"playlistVideoRenderer":\{"videoId":"([\w-]{11})"', html)
+    # The remaining videos would be loaded by a continuation item at the end of the list.
+    truncated = '"continuationItemRenderer"' in html
+    return list(dict.fromkeys(video_ids)), truncated
+
+def _fetch_transcript_result(video_id: str, max_chars: int) -> dict:
+    result = {"video_id": video_id, "url": f"https://www.youtube.com/watch?v={video_id}"}
     try:
-        video_id = get_youtube_id(youtube_url)
-
-        if not video_id:
-            print(f"Error: Could not extract video ID from YouTube URL: {youtube_url}")
-            return ""
-
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-
-        # Define preferred language order
-        preferred_languages = ['ko', 'en']
-        selected_transcript = None
-        selected_language_code = None
-
-        # Iterate through preferred languages to find an available transcript.
-        for lang_code in preferred_languages:
-            try:
-                selected_transcript = transcript_list.find_transcript([lang_code])
-                selected_language_code = lang_code
-                # Once a transcript in a preferred language is found, exit the loop.
-                break
-            except NoTranscriptFound:
-                # If a transcript for the current language is not found, try the next one.
-                continue
-
-        # If no transcript was found in the preferred languages, fall back to the first available one.
-        if selected_transcript is None:
-            try:
-                # find_transcript() without arguments finds the first transcript in the list.
-                selected_transcript = transcript_list.find_transcript()
-                selected_language_code = selected_transcript.language_code
-            except NoTranscriptFound:
-                print(f"Error: No transcript found for video ID: {video_id} in any language.")
-                return ""
-
-        # Fetch the transcript data and join the text segments into a single string.
-        # A list comprehension and join is an efficient way to build the string.
-        transcript_entries = selected_transcript.fetch()
-        transcript_text = " ".join([entry.text for entry in transcript_entries])
-
-        return transcript_text.strip()
-
-    except NoTranscriptFound as e:
-        print(f"Error: No transcript available for video: {youtube_url}. Details: {e}")
-        return ""
+        segments = get_transcript_segments(video_id)
     except Exception as e:
-        # Catch other potential errors like network issues, invalid video IDs, etc.
-        print(f"An unexpected error occurred while fetching the transcript for {youtube_url}: {e}")
-        return ""
\ No newline at end of file
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    if segments is None:
+        result["error"] = "No transcript available in any language."
+        return result
+
+    transcript_text = " ".join(segment["text"] for segment in segments).strip()
+    result["truncated"] = len(transcript_text) > max_chars
+    result["transcript"] = transcript_text[:max_chars]
+    return result
+
+def get_youtube_transcripts(youtube_urls: list[str], playlist_id: str = "", max_chars_per_video: int = 20000) -> dict:
+    """
+    Retrieves the transcripts of many YouTube videos in one call.
+    Use this instead of calling get_youtube_transcript repeatedly when the user gives several URLs or a playlist.
+
+    Args:
+        youtube_urls: The URLs of the YouTube videos. May be empty when a playlist is given.
+        playlist_id: Optional playlist ID or playlist URL whose videos are added to the batch.
+        max_chars_per_video: Maximum number of transcript characters returned per video.
+
+    Returns:
+        A dict with a 'videos' list holding one entry per URL, in the given order, followed
+        by the playlist's videos that were not among the URLs. Each entry has the
+        'video_id', 'url' and either the 'transcript' or an 'error'; a playlist that could
+        not be loaded is an entry with the 'playlist_id' and an 'error'. The dict also has
+        'succeeded' and 'failed' counts and, for a playlist, a 'playlist' entry whose
+        'truncated' flag tells that only its first videos were included.
+    """
+    # Each slot is a video ID to fetch, or the finished result of an input that failed.
+    slots = []
+    for url in youtube_urls:
+        video_id = get_youtube_id(url)
+        slots.append(video_id or {"url": url, "error": "Could not extract a video ID from the URL."})
+
+    playlist = None
+    if playlist_id:
+        try:
+            playlist_video_ids, truncated = get_playlist_video_ids(playlist_id)
+        except Exception as e:
+            slots.append({"playlist_id": playlist_id, "error": f"Could not load the playlist: {e}"})
+        else:
+            playlist = {"playlist_id": playlist_id, "videos": len(playlist_video_ids), "truncated": truncated}
+            if truncated:
+                playlist["note"] = "Only the first videos of the playlist were included."
+            requested = set(slot for slot in slots if isinstance(slot, str))
+            slots.extend(video_id for video_id in playlist_video_ids if video_id not in requested)
+
+    # Each video is fetched once, even if it was requested more than once.
+    video_ids = list(dict.fromkeys(slot for slot in slots if isinstance(slot, str)))
+    fetched = {}
+    if video_ids:
+        # Create the shared cache before the worker threads start using it.
+        get_transcript_cache()
+        max_workers = min(int(os.getenv("YOUTUBE_BATCH_WORKERS", 8)), len(video_ids))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = dict(zip(video_ids, executor.map(
+                lambda video_id: _fetch_transcript_result(video_id, max_chars_per_video), video_ids)))
+
+    results = [fetched[slot] if isinstance(slot, str) else slot for slot in slots]
+    failed = sum(1 for result in results if "error" in result)
+    batch = {"videos": results, "succeeded": len(results) - failed, "failed": failed}
+    if playlist is not None:
+        batch["playlist"] = playlist
+    return batch
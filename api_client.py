@@ -0,0 +1,198 @@
+# api_client.py
+import json
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ApiError(Exception):
+    """
+    Raised when the ADK API server answers with an unexpected status code.
+    `retry_after` holds the seconds from a Retry-After header (e.g. a rate-limited
+    or overloaded gateway), or None.
+    """
+
+    def __init__(self, status_code, text, retry_after=None):
+        super().__init__(f"{status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_response(cls, res):
+        return cls(res.status_code, res.text, retry_after_seconds(res))
+
+
+def retry_after_seconds(res):
+    """Returns the seconds of a response's Retry-After header, or None."""
+    value = res.headers.get("Retry-After", "")
+    return int(value) if value.isdigit() else None
+
+
+def forwarded_headers(address):
+    """Returns the X-Forwarded-For header naming the end user's address, if known."""
+    return {"X-Forwarded-For": address} if address else None
+
+
+class ApiClient:
+    """
+    Pooled HTTP client for the ADK API server.
+
+    A single keep-alive session is shared by all reruns and users, so requests reuse
+    pooled TCP connections instead of opening a new one each time. Every request has
+    connect/read timeouts, session create/delete are retried with exponential backoff,
+    and the latency of each request is recorded per endpoint. Each method accepts the
+    address of the end user as `forwarded_for`, sent as X-Forwarded-For so a gateway
+    rate-limits end users rather than the frontend that shares this client.
+
+    Args:
+        api_url: Base URL of the ADK API server.
+        connect_timeout: Seconds to wait for a connection to be established.
+        read_timeout: Seconds to wait between bytes received from the server.
+        max_retries: Number of retries for session create/delete.
+        backoff: Base delay in seconds, doubled after each retry.
+        max_retry_sleep: Longest wait in seconds before a retry, even if the server's
+            Retry-After asks for more.
+        pool_size: Maximum number of pooled connections.
+    """
+
+    # Status codes worth retrying for idempotent session operations.
+    RETRY_STATUS_CODES = {429, 502, 503, 504}
+    # Methods that may have taken effect when the response timed out, so are not sent again.
+    NON_IDEMPOTENT_METHODS = {"POST"}
+
+    def __init__(self, api_url, connect_timeout=3.0, read_timeout=300.0,
+                 max_retries=3, backoff=0.5, pool_size=20, max_retry_sleep=10.0):
+        self.api_url = api_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_retry_sleep = max_retry_sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    # --- Sessions ---
+
+    def session_url(self, agent_name, user_id, session_id):
+        return f"{self.api_url}/apps/{agent_name}/users/{user_id}/sessions/{session_id}"
+
+    def create_session(self, agent_name, user_id, session_id, forwarded_for=None):
+        """Creates a session on the server, retrying transient failures."""
+        res = self._request_with_retry("create_session", "POST", self.session_url(agent_name, user_id, session_id),
+                                       headers=forwarded_headers(forwarded_for))
+        if res.status_code != 200:
+            raise ApiError.from_response(res)
+
+    def get_session(self, agent_name, user_id, session_id, forwarded_for=None):
+        """Returns a session from the server, or None if it does not exist."""
+        res = self._request_with_retry("get_session", "GET", self.session_url(agent_name, user_id, session_id),
+                                       headers=forwarded_headers(forwarded_for))
+        if res.status_code == 404:
+            return None
+        if res.status_code != 200:
+            raise ApiError.from_response(res)
+        return res.json()
+
+    def delete_session(self, agent_name, user_id, session_id, forwarded_for=None):
+        """Deletes a session on the server, retrying transient failures."""
+        res = self._request_with_retry("delete_session", "DELETE", self.session_url(agent_name, user_id, session_id),
+                                       headers=forwarded_headers(forwarded_for))
+        # Accept both 200 and 204 as successful deletion
+        if res.status_code not in [200, 204]:
+            raise ApiError.from_response(res)
+
+    # --- Agent runs ---
+
+    def run(self, payload, forwarded_for=None):
+        """Sends a message to /run and returns the full list of events."""
+        res = self._timed("run", "POST", f"{self.api_url}/run", json=payload,
+                          headers=forwarded_headers(forwarded_for))
+        if res.status_code != 200:
+            raise ApiError.from_response(res)
+        return res.json()
+
+    def run_sse(self, payload, forwarded_for=None):
+        """
+        Sends a message to /run_sse and returns an iterator over the streamed events.
+        The time to the first event and the total stream time are recorded as metrics.
+        """
+        start = time.perf_counter()
+        res = self.session.post(f"{self.api_url}/run_sse", json={**payload, "streaming": True},
+                                headers=forwarded_headers(forwarded_for), stream=True, timeout=self.timeout)
+        if res.status_code != 200:
+            error = ApiError.from_response(res)
+            res.close()
+            raise error
+        return self._iter_sse_events(res, start)
+
+    def _iter_sse_events(self, res, start):
+        first = True
+        try:
+            for line in res.iter_lines(decode_unicode=True):
+                if line and line.startswith("data:"):
+                    if first:
+                        self._record("run_sse.first_event", time.perf_counter() - start)
+                        first = False
+                    yield json.loads(line[len("data:"):].strip())
+        finally:
+            res.close()
+            self._record("run_sse", time.perf_counter() - start)
+
+    # --- Metrics ---
+
+    def metrics(self):
+        """Returns count, average, p50, p95 and last latency in seconds for each endpoint."""
+        with self._lock:
+            samples = {name: list(values) for name, values in self._latencies.items()}
+        result = {}
+        for name, recorded in samples.items():
+            values = sorted(recorded)
+            result[name] = {
+                "count": len(values),
+                "avg": sum(values) / len(values),
+                "p50": values[len(values) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "last": recorded[-1],
+            }
+        return result
+
+    def _record(self, name, seconds):
+        with self._lock:
+            self._latencies.setdefault(name, deque(maxlen=500)).append(seconds)
+
+    # --- Requests ---
+
+    def _timed(self, name, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.session.request(method, url, timeout=self.timeout, **kwargs)
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+    def _request_with_retry(self, name, method, url, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            delay = self.backoff * (2 ** attempt)
+            try:
+                res = self._timed(name, method, url, **kwargs)
+            except requests.ReadTimeout:
+                # The server got the request and may have acted on it, e.g. created the
+                # session, so sending it again could fail with a conflict.
+                if last_attempt or method in self.NON_IDEMPOTENT_METHODS:
+                    raise
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+            else:
+                if res.status_code not in self.RETRY_STATUS_CODES or last_attempt:
+                    return res
+                # Honor the server's Retry-After when it asks for a longer wait.
+                delay = max(retry_after_seconds(res) or 0, delay)
+            time.sleep(min(delay, self.max_retry_sleep))
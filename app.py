@@ -1,82 +1,162 @@
 # app.py
+import os
+import altair as alt
 import streamlit as st
 import requests
-import json
 import uuid
+from api_client import ApiClient, ApiError
+from chat_store import ChatStore, default_chat_store_path
+from event_view import final_text_from_events, stream_text
+from trace_view import default_trace_path, load_trace, trace_id_from_events, waterfall_rows
 
 # Set Streamlit page configuration
 st.set_page_config(page_title="ADK API Frontend", layout="wide")
 
 # Sidebar: Agent settings
 st.sidebar.header("Agent Settings")
-api_url = st.sidebar.text_input("API Server URL", "http://localhost:8000")  # API endpoint input
+api_url = st.sidebar.text_input("API Server URL", os.getenv("ADK_API_URL", "http://localhost:8000"))  # API endpoint input
 agent_name = st.sidebar.text_input("Agent Name", "allinone")  # Agent name input
-user_id = "user"  # Fixed user ID
+
+@st.cache_resource
+def get_chat_store(path):
+    """
+    Returns the SQLite chat history store shared across reruns, tabs and users.
+    """
+    return ChatStore(path)
+
+chat_store = get_chat_store(default_chat_store_path())
+
+# Restore the session in the URL (?session=...) after a page refresh, with its user ID.
+# There is no login, so a session link works like a bearer token: anyone who has it can
+# read and continue the conversation. Session IDs are random 128-bit values, so links
+# can't be guessed, but they should only be shared with people allowed to see the chat.
+if "session_id" not in st.session_state and "session" in st.query_params:
+    saved_session = chat_store.get_session(st.query_params["session"])
+    if saved_session:
+        st.session_state.session_id = saved_session["session_id"]
+        st.session_state.user_id = saved_session["user_id"]
+        st.session_state.restored_session = True
+# Each browser tab gets its own user ID and session history
+if "user_id" not in st.session_state:
+    st.session_state.user_id = f"user-{uuid.uuid4().hex[:8]}"
+user_id = st.sidebar.text_input("User ID", key="user_id")  # User ID input
 
 # Sidebar: Session and response control buttons
 create_session_button = st.sidebar.button("Create New Session", width="stretch")  # Button to create a new session
 show_full_response = st.sidebar.button("Show Full Response", width="stretch")  # Button to show full API response
+show_trace = st.sidebar.button("Show Trace", width="stretch")  # Button to show the latency waterfall of the last turn
+streaming = st.sidebar.toggle("Stream Responses", value=True)  # Render partial text via /run_sse
+
+# Sidebar: Connection settings for the pooled API client
+with st.sidebar.expander("Connection Settings"):
+    connect_timeout = st.number_input("Connect Timeout (s)", min_value=0.5, value=3.0, step=0.5)
+    read_timeout = st.number_input("Read Timeout (s)", min_value=1.0, value=300.0, step=10.0)
+    max_retries = st.number_input("Session Retries", min_value=0, max_value=10, value=3)
+    trace_path = st.text_input("Trace File", default_trace_path())  # JSONL file written by the agent's tracer
+
+# Sidebar: Number of chat messages rendered per page; older pages are loaded on demand
+page_size = int(st.sidebar.number_input("Messages per Page", min_value=10, value=50, step=10))
+
+@st.cache_resource
+def get_api_client(api_url, connect_timeout, read_timeout, max_retries):
+    """
+    Returns a pooled API client shared across reruns, tabs and users.
+    A new client is created only when the connection settings change.
+    """
+    return ApiClient(api_url, connect_timeout=connect_timeout, read_timeout=read_timeout, max_retries=max_retries)
+
+client = get_api_client(api_url, connect_timeout, read_timeout, int(max_retries))
+# The browser's address is forwarded, so a gateway rate-limits each visitor rather than this frontend
+caller = st.context.ip_address if isinstance(st.context.ip_address, str) else None
 
 # Session state: Track if a session is created
 if "session_created" not in st.session_state:
     st.session_state.session_created = False
 
-def create_new_session(api_url, agent_name, user_id):
+def create_new_session(client, agent_name, user_id):
     """
-    Create a new session and handle the deletion of existing session.
+    Create a new session and handle the deletion of existing session and its history.
     Returns tuple of (success, session_id, error_message)
     """
     try:
         # Delete previous session if it exists
         if "session_id" in st.session_state:
-            old_session_id = st.session_state.session_id
-            delete_url = f"{api_url}/apps/{agent_name}/users/{user_id}/sessions/{old_session_id}"
-            delete_res = requests.delete(delete_url)
-            # Changed to accept both 200 and 204 as successful deletion
-            if delete_res.status_code not in [200, 204]:
-                return False, None, f"Failed to delete existing session: {delete_res.status_code}"
+            try:
+                client.delete_session(agent_name, user_id, st.session_state.session_id, forwarded_for=caller)
+            except ApiError as e:
+                return False, None, f"Failed to delete existing session: {e.status_code}"
+            chat_store.delete_session(st.session_state.session_id)
 
         # Create a new session with a new session ID
         session_id = uuid.uuid4().hex
-        url = f"{api_url}/apps/{agent_name}/users/{user_id}/sessions/{session_id}"
-        res = requests.post(url)
-        
-        if res.status_code == 200:
-            return True, session_id, None
-        else:
-            return False, None, f"Session creation failed: {res.status_code}\n{res.text}"
+        try:
+            client.create_session(agent_name, user_id, session_id, forwarded_for=caller)
+        except ApiError as e:
+            return False, None, f"Session creation failed: {e.status_code}\n{e.text}"
+        chat_store.create_session(session_id, agent_name, user_id)
+        return True, session_id, None
     except Exception as e:
         return False, None, f"Error during session creation: {e}"
 
-# Automatically create a session if not already created
+def restore_session(client, agent_name, user_id, session_id):
+    """
+    Reattach to a session restored from the URL. If the server no longer has it
+    (e.g. after a restart), it is created again under the same ID; the stored chat
+    history is kept either way.
+    Returns tuple of (success, session_id, error_message)
+    """
+    try:
+        if client.get_session(agent_name, user_id, session_id, forwarded_for=caller) is None:
+            client.create_session(agent_name, user_id, session_id, forwarded_for=caller)
+        return True, session_id, None
+    except ApiError as e:
+        return False, None, f"Session restore failed: {e.status_code}\n{e.text}"
+    except Exception as e:
+        return False, None, f"Error during session restore: {e}"
+
+# Automatically create a session (or reattach to the restored one) if not already created
 if not st.session_state.session_created:
-    success, session_id, error = create_new_session(api_url, agent_name, user_id)
+    if st.session_state.get("restored_session"):
+        success, session_id, error = restore_session(client, agent_name, user_id, st.session_state.session_id)
+    else:
+        success, session_id, error = create_new_session(client, agent_name, user_id)
     if success:
         st.session_state.session_created = True
         st.session_state.session_id = session_id
+        st.query_params["session"] = session_id  # Keep the session across page refreshes
     else:
         st.error(error)
 
 # When "Create New Session" button is pressed
 if create_session_button:
-    success, session_id, error = create_new_session(api_url, agent_name, user_id)
+    success, session_id, error = create_new_session(client, agent_name, user_id)
     if success:
         st.session_state.session_created = True
         st.session_state.session_id = session_id
-        st.session_state.chat_history = []  # Clear chat history
-        if "last_response" in st.session_state:
-            del st.session_state.last_response  # Clear last response
+        st.session_state.restored_session = False
+        st.session_state.history_pages = 1  # Start the new history at its first page
+        st.query_params["session"] = session_id
         st.rerun()  # Refresh the Streamlit app
     else:
         st.error(error)
 
-# Initialize chat history in session state if not present
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+# Number of history pages rendered; "Load Older Messages" adds one
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1
+
+def load_older_messages():
+    st.session_state.history_pages += 1
 
-# Display all previous chat messages from chat history
-for msg in st.session_state.chat_history:
-    st.chat_message(msg["role"]).write(msg["content"])
+# Display the most recent window of the chat history, with a button for older pages
+if "session_id" in st.session_state:
+    window = st.session_state.history_pages * page_size
+    # One extra message tells whether older ones exist without counting them all
+    messages = chat_store.recent(st.session_state.session_id, limit=window + 1)
+    if len(messages) > window:
+        messages = messages[1:]
+        st.button("Load Older Messages", on_click=load_older_messages)
+    for msg in messages:
+        st.chat_message(msg["role"]).write(msg["content"])
 
 # Input box for user to enter a new question
 query_text = st.chat_input("Enter your question")
@@ -86,11 +166,11 @@ if query_text:
     if not st.session_state.session_created:
         st.warning("Please create a session first.")
     else:
+        session_id = st.session_state.session_id
         # Add user message to chat history and display it
-        st.session_state.chat_history.append({"role": "user", "content": query_text})
+        chat_store.append(session_id, "user", query_text)
         st.chat_message("user").write(query_text)
 
-        session_id = st.session_state.session_id
         # Prepare payload for API request
         payload = {
             "app_name": agent_name,
@@ -101,29 +181,82 @@ if query_text:
                 "parts": [{"text": query_text}]
             }
         }
-        # Send user message to backend API
-        res = requests.post(f"{api_url}/run", json=payload)
-        if res.status_code == 200:
-            data = res.json()
-            st.session_state.last_response = data  # Save full response for later viewing
-            if len(data) >= 1:
-                # Get the last message from the response array
-                final_text = data[-1]["content"]["parts"][0].get("text", "")
-                # Add assistant's reply to chat history and display it
-                st.session_state.chat_history.append({"role": "assistant", "content": final_text})
-                st.chat_message("assistant").write(final_text)
-        else:
-            st.error(f"Query failed: {res.status_code}")
-            st.text(res.text)
+        try:
+            if streaming:
+                # Stream events from the backend and render text as it arrives
+                event_stream = client.run_sse(payload, forwarded_for=caller)
+                events = []
+                with st.chat_message("assistant"):
+                    st.write_stream(stream_text(event_stream, events))
+                chat_store.save_response(session_id, events)  # Save full event list for later viewing
+                if events:
+                    final_text = final_text_from_events(events)
+                    chat_store.append(session_id, "assistant", final_text)
+            else:
+                # Send user message to backend API
+                data = client.run(payload, forwarded_for=caller)
+                chat_store.save_response(session_id, data)  # Save full response for later viewing
+                if len(data) >= 1:
+                    # Get the last message from the response array
+                    final_text = final_text_from_events(data)
+                    # Add assistant's reply to chat history and display it
+                    chat_store.append(session_id, "assistant", final_text)
+                    st.chat_message("assistant").write(final_text)
+        except ApiError as e:
+            if e.status_code in (429, 503) and e.retry_after:
+                # Rate limited or overloaded gateway: ask the user to retry later
+                st.warning(f"The server is busy ({e.status_code}). Please retry in {e.retry_after} seconds.")
+            else:
+                st.error(f"Query failed: {e.status_code}")
+                st.text(e.text)
+        except requests.RequestException as e:
+            st.error(f"Query failed: {e}")
 
 # Dialog to show the full JSON response from the backend
 @st.dialog("📜 Full Response JSON", width="large")
 def show_json_dialog():
-    if "last_response" in st.session_state:
-        st.json(st.session_state.last_response)
+    last_response = chat_store.last_response(st.session_state.get("session_id"))
+    if last_response is not None:
+        st.json(last_response)
     else:
         st.write("No response data available.")
 
 # Show the full response dialog when the button is pressed
 if show_full_response:
-    show_json_dialog()
\ No newline at end of file
+    show_json_dialog()
+
+# Dialog to show the trace of the last turn as a waterfall
+@st.dialog("⏱️ Trace of the Last Turn", width="large")
+def show_trace_dialog():
+    trace_id = trace_id_from_events(chat_store.last_response(st.session_state.get("session_id")))
+    if trace_id is None:
+        st.write("No response data available.")
+        return
+    rows = waterfall_rows(load_trace(trace_path, trace_id))
+    if not rows:
+        st.write(f"No spans found for trace {trace_id} in {trace_path}.")
+        return
+    chart = alt.Chart(alt.Data(values=rows)).mark_bar().encode(
+        x=alt.X("start_ms:Q", title="Time (ms)"),
+        x2="end_ms:Q",
+        y=alt.Y("span:N", sort=None, title=None),
+        color="kind:N",
+        tooltip=["span:N", "duration_ms:Q", "tokens:Q", "request_bytes:Q", "response_bytes:Q"],
+    )
+    st.altair_chart(chart, use_container_width=True)
+    st.dataframe(rows, hide_index=True)
+
+# Show the trace dialog when the button is pressed
+if show_trace:
+    show_trace_dialog()
+
+# Sidebar: Per-endpoint request latency recorded by the API client
+with st.sidebar.expander("Request Metrics"):
+    metrics = client.metrics()
+    if metrics:
+        st.dataframe(
+            [{"endpoint": name, **{k: round(v, 3) for k, v in values.items()}} for name, values in metrics.items()],
+            hide_index=True,
+        )
+    else:
+        st.write("No requests yet.")
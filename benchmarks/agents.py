@@ -0,0 +1,368 @@
+"""
+Runs the full agent graph offline against a deterministic fake LLM and local stand-ins
+for the fetch, filesystem and dice MCP servers, replays a recorded query corpus at a
+configurable concurrency and reports throughput, latency percentiles, peak RSS and
+startup times.
+
+Every corpus entry holds the user query, the calls the root model made for it, which
+the fake root model replays, and the expected route ('fast_path' or the sub-agents
+called). Sub-agent models call their agent's tool and answer from its result, so
+routing, callbacks, tool plumbing and MCP round trips run for real while no request
+leaves the machine.
+
+Usage:
+    python -m benchmarks.agents --concurrency 8 --repeat 5 --output agents.json
+    python -m benchmarks.agents --baseline agents.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Importing any `allinone` module builds the agent graph, which reads its configuration
+# from the environment. Those imports therefore happen after `setup_environment()`.
+
+MCP_STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_stubs.py")
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.json")
+
+FILES = {
+    "notes/budget.txt": "Quarterly budget review: travel spending is over plan, hiring is on track.",
+    "notes/deploy.md": "# Deployment checklist\n\n- run the migrations\n- tag the release\n- notify the team",
+    "notes/meeting.txt": "Meeting notes: discussed the roadmap, the budget and the launch date.",
+}
+
+# Model calls per agent, counted by the fake models.
+model_calls = Counter()
+
+
+def _first_url(text):
+    match = re.search(r"https?://\S+", text)
+    return match.group() if match else text
+
+
+def _first_int(text, default=1):
+    match = re.search(r"\d+", text)
+    return int(match.group()) if match else default
+
+
+# The tool call each sub-agent's fake model makes for a request. Agents without an
+# entry (SearchAgent, SummaryAgent) answer directly.
+SUB_AGENT_CALLS = {
+    "DateTimeAgent": lambda request: ("get_current_datetime", {}),
+    "FileSystemAgent": lambda request: ("search_file_contents", {"query": request}),
+    "fetch": lambda request: ("fetch", {"url": _first_url(request)}),
+    "YouTubeAgent": lambda request: ("get_youtube_transcript", {"youtube_url": _first_url(request)}),
+    "DiceRoller": lambda request: ("roll_dice", {"n_dice": _first_int(request)}),
+}
+
+
+def make_fake_llm(agent_name, model, latency, plans):
+    """Returns a deterministic `BaseLlm` standing in for the model of `agent_name`."""
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+    from allinone.summarize import estimate_tokens
+
+    class FakeLlm(BaseLlm):
+        async def generate_content_async(self, llm_request, stream=False):
+            model_calls[agent_name] += 1
+            if latency:
+                await asyncio.sleep(latency)
+
+            last = llm_request.contents[-1]
+            results = [part.function_response for part in last.parts or [] if part.function_response]
+            if results:
+                text = f"{agent_name}: " + " ".join(
+                    f"{result.name} returned {json.dumps(result.response, ensure_ascii=False, default=str)[:200]}"
+                    for result in results
+                )
+                part = types.Part(text=text)
+            else:
+                request = "".join(part.text or "" for part in last.parts or [])
+                part = self.plan(request, llm_request.tools_dict)
+
+            instruction = llm_request.config.system_instruction if llm_request.config else None
+            prompt = (instruction if isinstance(instruction, str) else "") + "".join(
+                part.text or "" for content in llm_request.contents for part in content.parts or []
+            )
+            output = part.text or json.dumps(part.function_call.args)
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[part]),
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=estimate_tokens(prompt),
+                    candidates_token_count=estimate_tokens(output),
+                    total_token_count=estimate_tokens(prompt) + estimate_tokens(output),
+                ),
+            )
+
+        def plan(self, request, tools):
+            if agent_name == "RootAgent":
+                calls = plans.get(request)
+                if not calls:
+                    return types.Part(text=f"No recorded plan for: {request}")
+                if len(calls) == 1:
+                    return types.Part(function_call=types.FunctionCall(
+                        name=calls[0]["agent"], args={"request": calls[0]["request"]}))
+                return types.Part(function_call=types.FunctionCall(
+                    name="run_agents_in_parallel",
+                    args={"agent_names": [call["agent"] for call in calls],
+                          "requests": [call["request"] for call in calls]},
+                ))
+
+            if agent_name not in SUB_AGENT_CALLS:
+                return types.Part(text=f"{agent_name}: answer for '{request}'")
+            name, args = SUB_AGENT_CALLS[agent_name](request)
+            if name not in tools:
+                return types.Part(text=f"{agent_name}: tool '{name}' is not available")
+            return types.Part(function_call=types.FunctionCall(name=name, args=args))
+
+    return FakeLlm(model=model)
+
+
+def setup_environment(workdir):
+    """Points every cache, trace file and the filesystem agent at `workdir` before the agents are imported."""
+    target = os.path.join(workdir, "files")
+    for path, text in FILES.items():
+        os.makedirs(os.path.dirname(os.path.join(target, path)), exist_ok=True)
+        with open(os.path.join(target, path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    os.environ.update({
+        "GOOGLE_API_KEY": "offline",
+        "GEMAGENT_CACHE_DIR": os.path.join(workdir, "cache"),
+        "TRACE_JSONL_PATH": os.path.join(workdir, "traces.jsonl"),
+        "FILESYSTEM_TARGET_FOLDER_PATH": target,
+        "RESPONSE_CACHE_SIMILARITY": "0",
+        "MCP_HEALTH_CHECK_INTERVAL": "3600",
+    })
+    os.environ.pop("TRACE_OTLP_ENDPOINT", None)
+    return target
+
+
+def offline_llm_factory(model):
+    raise RuntimeError(f"Model '{model}' is not available offline.")
+
+
+def install_stubs(agent_module, corpus, model_latency, response_cache, fake_models=True):
+    """
+    Replaces MCP servers and network-bound helpers with offline stand-ins, and the
+    models with fake ones unless `fake_models` is False.
+    """
+    from allinone import response_cache as response_cache_module
+    from allinone.mcp_pool import stdio_server
+    from allinone import youtube
+    from benchmarks.youtube_batch import stub_api
+
+    if fake_models:
+        plans = {entry["query"]: entry["calls"] for entry in corpus}
+        def use_fake_llm(agent):
+            agent.model = make_fake_llm(agent.name, agent.model, model_latency, plans)
+
+        use_fake_llm(agent_module.root_agent)
+        # Sub-agents are built on their first call; they get the fake model when built.
+        for tool in agent_module.sub_agent_tools:
+            if tool.is_built:
+                use_fake_llm(tool.agent)
+            else:
+                tool.build_hooks.append(use_fake_llm)
+        for policy in (agent_module.root_model_tiers, agent_module.sub_agent_model_tiers):
+            policy.llm_factory = offline_llm_factory
+
+        async def generate(prompt):
+            model_calls["summarizer"] += 1
+            return f"Summary of {len(prompt)} characters."
+        agent_module.summarizer.generate = generate
+
+    for name, pool in agent_module.mcp_manager.pools.items():
+        args = [MCP_STUBS, name] + ([agent_module.TARGET_FOLDER_PATH] if name == "filesystem" else [])
+        pool.reconnect(stdio_server(sys.executable, args, timeout=30))
+
+    youtube.YouTubeTranscriptApi = stub_api(0.0)
+    response_cache_module._url_validator = lambda url: None
+
+    if not response_cache:
+        agent_module.response_cache.default_ttl = 0
+        agent_module.response_cache.agent_ttls = {name: 0 for name in agent_module.response_cache.agent_ttls}
+
+
+async def run_query(runner, entry, index):
+    """Runs one query in a new session and returns its latency, route and answer."""
+    from google.genai import types
+
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id=f"user{index}")
+    message = types.Content(role="user", parts=[types.Part(text=entry["query"])])
+    result = {"query": entry["query"], "route": "fast_path", "answer": None, "error": None}
+    agents = []
+
+    start = time.perf_counter()
+    try:
+        async for event in runner.run_async(user_id=session.user_id, session_id=session.id, new_message=message):
+            for call in event.get_function_calls():
+                agents += call.args.get("agent_names") or [call.name]
+            if event.is_final_response() and event.content and event.content.parts:
+                result["answer"] = "".join(part.text or "" for part in event.content.parts)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+
+    if agents:
+        result["route"] = agents
+    if result["answer"] is None and result["error"] is None:
+        result["error"] = "No final response"
+    return result
+
+
+async def replay(runner, entries, concurrency):
+    """Runs `entries` with `concurrency` workers and returns the results and the wall time."""
+    queue = asyncio.Queue()
+    for i, entry in enumerate(entries):
+        queue.put_nowait((i, entry))
+    results = [None] * len(entries)
+
+    async def worker():
+        while not queue.empty():
+            i, entry = queue.get_nowait()
+            results[i] = await run_query(runner, entry, i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def latency_ms(seconds):
+    from benchmarks.file_index import percentile
+    return {
+        "p50": percentile(seconds, 0.5) * 1000,
+        "p95": percentile(seconds, 0.95) * 1000,
+        "p99": percentile(seconds, 0.99) * 1000,
+        "mean": sum(seconds) / len(seconds) * 1000,
+        "max": max(seconds) * 1000,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux; children are the MCP server processes.
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {"process": self_rss, "largest_child": children_rss}
+
+
+async def run(args, corpus):
+    start = time.perf_counter()
+    import allinone.agent as agent_module
+    from google.adk.runners import InMemoryRunner
+    import_seconds = time.perf_counter() - start
+
+    install_stubs(agent_module, corpus, args.model_latency, args.response_cache)
+    runner = InMemoryRunner(agent=agent_module.root_agent, app_name="benchmark")
+
+    try:
+        # The first query starts the MCP servers in the background.
+        cold, _ = await replay(runner, corpus[:1], 1)
+        mcp_task = agent_module.mcp_manager._task
+        while any(pool.startup_latency is None for pool in agent_module.mcp_manager.pools.values()):
+            if mcp_task is None or mcp_task.done():
+                break
+            await asyncio.sleep(0.05)
+
+        results, wall_seconds = await replay(runner, corpus * args.repeat, args.concurrency)
+    finally:
+        await agent_module.mcp_manager.shutdown()
+        await runner.close()
+
+    seconds = [result["seconds"] for result in results]
+    by_route = {}
+    for result in results:
+        label = result["route"] if isinstance(result["route"], str) else "+".join(result["route"])
+        by_route.setdefault(label, []).append(result["seconds"])
+
+    mismatches = []
+    if not args.response_cache:
+        # Cached answers skip the routing, so routes are only checked without the cache.
+        for entry, result in zip(corpus * args.repeat, results):
+            if result["route"] != entry["route"]:
+                mismatches.append({"query": entry["query"], "expected": entry["route"], "actual": result["route"]})
+
+    return {
+        "queries": len(results),
+        "concurrency": args.concurrency,
+        "model_latency": args.model_latency,
+        "response_cache": args.response_cache,
+        "startup": {
+            "import_seconds": import_seconds,
+            "first_query_seconds": cold[0]["seconds"],
+            "mcp": agent_module.mcp_manager.metrics(),
+        },
+        "wall_seconds": wall_seconds,
+        "throughput_qps": len(results) / wall_seconds,
+        "latency_ms": latency_ms(seconds),
+        "latency_ms_by_route": {label: latency_ms(values) for label, values in sorted(by_route.items())},
+        "errors": [{"query": r["query"], "error": r["error"]} for r in results if r["error"]],
+        "route_mismatches": mismatches,
+        "model_calls": dict(model_calls),
+        "model_tiers": {
+            "root": agent_module.root_model_tiers.stats(),
+            "sub_agents": agent_module.sub_agent_model_tiers.stats(),
+        },
+        "resilience": agent_module.resilience.stats(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Returns the regressions of `results` against a baseline run."""
+    regressions = []
+    if results["throughput_qps"] < baseline["throughput_qps"] * (1 - tolerance):
+        regressions.append(f"throughput {results['throughput_qps']:.1f} < baseline {baseline['throughput_qps']:.1f} qps")
+    for key in ("p50", "p95", "p99"):
+        if results["latency_ms"][key] > baseline["latency_ms"][key] * (1 + tolerance):
+            regressions.append(f"{key} {results['latency_ms'][key]:.1f} > baseline {baseline['latency_ms'][key]:.1f} ms")
+    if results["peak_rss_mb"]["process"] > baseline["peak_rss_mb"]["process"] * (1 + tolerance):
+        regressions.append(f"peak RSS {results['peak_rss_mb']['process']:.0f} > baseline {baseline['peak_rss_mb']['process']:.0f} MB")
+    if results["startup"]["import_seconds"] > baseline["startup"]["import_seconds"] * (1 + tolerance):
+        regressions.append(f"import {results['startup']['import_seconds']:.2f} > baseline {baseline['startup']['import_seconds']:.2f} s")
+    if results["errors"]:
+        regressions.append(f"{len(results['errors'])} queries failed")
+    if results["route_mismatches"]:
+        regressions.append(f"{len(results['route_mismatches'])} queries took an unexpected route")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS, help="JSON file with the recorded queries.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of queries in flight.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of times the corpus is replayed.")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Seconds per fake model call.")
+    parser.add_argument("--response-cache", action="store_true", help="Keep the response cache enabled.")
+    parser.add_argument("--output", default="agents_benchmark.json", help="File the results are written to.")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown against the baseline.")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_environment(workdir)
+        results = asyncio.run(run(args, corpus))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["regressions"] = compare(results, json.load(f), args.tolerance)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if results.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
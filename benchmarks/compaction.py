@@ -0,0 +1,79 @@
+"""
+Measures the per-turn history sent to the root model over a long synthetic session,
+with and without history compaction.
+
+Every turn asks for a transcript or a web page, receives a large tool output and
+answers, so the uncompacted history grows linearly.
+
+Usage:
+    python -m benchmarks.compaction --turns 100 --output-chars 20000
+"""
+import argparse
+import json
+import tempfile
+import time
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from allinone.cache import ContentStore
+from allinone.compaction import HistoryCompactor, _contents_tokens
+
+
+def make_turn(i, output_chars):
+    """Returns the contents of one finished turn: request, tool call, tool output and answer."""
+    tool = "YouTubeAgent" if i % 2 else "fetch"
+    output = " ".join(f"turn{i} sentence {j} of the long tool output." for j in range(output_chars // 40))
+    return [
+        types.Content(role="user", parts=[types.Part(text=f"Request {i}: get the content of source number {i}.")]),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            id=f"call{i}", name=tool, args={"request": f"source {i}"}))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=f"call{i}", name=tool, response={"result": output[:output_chars]}))]),
+        types.Content(role="model", parts=[types.Part(text=f"Source {i} covers topic {i}. " * 20)]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100, help="Number of turns in the session.")
+    parser.add_argument("--output-chars", type=int, default=20000, help="Characters of every tool output.")
+    parser.add_argument("--budget", type=int, default=8000, help="History token budget.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        compactor = HistoryCompactor(ContentStore(store_dir), token_budget=args.budget)
+        context = SimpleNamespace(state={})
+        history = []
+        per_turn = []
+        for i in range(args.turns):
+            message = types.Content(role="user", parts=[types.Part(text=f"Question {i}: what did source {i - 1} say?")])
+            request = LlmRequest(contents=history + [message])
+            raw = _contents_tokens(request.contents)
+
+            start = time.perf_counter()
+            compactor.before_model(context, request)
+            seconds = time.perf_counter() - start
+
+            per_turn.append({"turn": i + 1, "raw_tokens": raw, "compacted_tokens": _contents_tokens(request.contents),
+                             "compaction_ms": seconds * 1000})
+            history += make_turn(i, args.output_chars)
+
+        compacted = [turn["compacted_tokens"] for turn in per_turn]
+        results = {
+            "turns": args.turns,
+            "budget": args.budget,
+            "sampled_turns": [turn for turn in per_turn if turn["turn"] % 10 == 0 or turn["turn"] == 1],
+            "max_compacted_tokens": max(compacted),
+            "compacted_tokens_last_turn": compacted[-1],
+            "raw_tokens_last_turn": per_turn[-1]["raw_tokens"],
+            "max_compaction_ms": max(turn["compaction_ms"] for turn in per_turn),
+            "folded_turns": context.state.get("history_folded_turns", 0),
+            "compactor": compactor.stats(),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares the NumPy dice engine with the previous per-die Python implementation.
+
+The previous `roll_dice` built a list with one `random.randint` call per die; the sum
+and the face histogram of the rolls then took another pass over the list. The engine
+generates the dice in fixed-size blocks and counts them with NumPy, so it neither
+loops in Python nor holds all dice in memory. Both are timed on the same numbers of
+dice, as one roll of `N`d6 and as `N` rolls of 1d6, with peak memory traced.
+
+Usage:
+    python -m benchmarks.dice --dice 10000000 --repeat 3
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+
+from allinone.mcp.dice_engine import dice_statistics
+
+
+def previous_roll(n_dice):
+    """The implementation this engine replaced."""
+    return [random.randint(1, 6) for _ in range(n_dice)]
+
+
+def previous_statistics(n_dice):
+    results = previous_roll(n_dice)
+    return {"sum": sum(results), "face_counts": Counter(results)}
+
+
+def measure(function, repeat):
+    """
+    Returns the median seconds of `function()` over `repeat` runs and its peak memory.
+
+    The peak is taken in one extra run with tracemalloc, which slows down allocation
+    heavy code too much to be on during the timed runs.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": statistics.median(seconds), "peak_mb": peak / 2**20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dice", type=int, default=10_000_000, help="Dice rolled per run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation; the median is reported.")
+    args = parser.parse_args()
+
+    results = {
+        "dice": args.dice,
+        "previous_list": measure(lambda: previous_roll(args.dice), args.repeat),
+        "previous_statistics": measure(lambda: previous_statistics(args.dice), args.repeat),
+        "engine_one_roll": measure(lambda: dice_statistics(f"{args.dice}d6", seed=0), args.repeat),
+        "engine_many_rolls": measure(lambda: dice_statistics("1d6", rolls=args.dice, seed=0), args.repeat),
+    }
+    results["dice_per_second"] = {
+        name: args.dice / result["seconds"] for name, result in results.items() if isinstance(result, dict)
+    }
+    results["speedup"] = {
+        "one_roll": results["previous_statistics"]["seconds"] / results["engine_one_roll"]["seconds"],
+        "many_rolls": results["previous_statistics"]["seconds"] / results["engine_many_rolls"]["seconds"],
+    }
+    # The same seed gives the same dice whichever way they are grouped.
+    one, many = dice_statistics(f"{args.dice}d6", seed=0), dice_statistics("1d6", rolls=args.dice, seed=0)
+    results["same_faces_for_same_seed"] = one["face_counts"] == many["face_counts"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
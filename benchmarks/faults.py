@@ -0,0 +1,177 @@
+"""
+Fault injection: tool latency with and without the resilience layer when one backend degrades.
+
+Three stubbed tool backends serve concurrent clients. `search` and `fetch` are async
+and stay healthy; `youtube` is a blocking function, like the transcript tools, and
+goes through four phases:
+
+    healthy    every backend answers after about `--latency` seconds
+    degraded   30% of youtube calls take `--slow-seconds`, 10% fail with a connection error
+    down       every youtube call hangs for `--hang-seconds`
+    recovered  youtube is healthy again
+
+The same load runs against the plain function tools, as they were called before (a
+blocking tool runs on the event loop), and against the tools wrapped by
+`ResilienceLayer`. Latency percentiles and result statuses are reported per phase and
+backend, with the circuit breaker transitions of the youtube tool.
+
+Usage:
+    python -m benchmarks.faults --clients 16 --phase-seconds 8
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+
+from google.adk.tools.function_tool import FunctionTool
+
+from allinone.resilience import ResilienceLayer, is_error_result
+
+PHASES = ("healthy", "degraded", "down", "recovered")
+
+
+class Backend:
+    """A stubbed tool backend whose behaviour depends on the current phase."""
+
+    def __init__(self, name, latency, blocking, faulty, args):
+        self.name = name
+        self.latency = latency
+        self.blocking = blocking
+        self.faulty = faulty
+        self.args = args
+        self.phase = "healthy"
+        self.rng = random.Random(name)
+
+    def behaviour(self):
+        """Returns the seconds the next call takes and whether it then fails."""
+        delay = self.rng.lognormvariate(0, 0.3) * self.latency
+        if not self.faulty or self.phase in ("healthy", "recovered"):
+            return delay, False
+        if self.phase == "down":
+            return self.args.hang_seconds, False
+        draw = self.rng.random()
+        if draw < 0.3:
+            return self.args.slow_seconds, False
+        return delay, draw < 0.4
+
+    def function(self):
+        """Returns the tool function of the backend, named after it."""
+        backend = self
+
+        if self.blocking:
+            def call(query: str) -> str:
+                delay, fail = backend.behaviour()
+                time.sleep(delay)
+                if fail:
+                    raise ConnectionError(f"{backend.name} reset the connection")
+                return f"{backend.name} result for {query}"
+        else:
+            async def call(query: str) -> str:
+                delay, fail = backend.behaviour()
+                await asyncio.sleep(delay)
+                if fail:
+                    raise ConnectionError(f"{backend.name} reset the connection")
+                return f"{backend.name} result for {query}"
+
+        call.__name__ = call.__qualname__ = self.name
+        call.__doc__ = f"Queries the {self.name} stub.\n\nArgs:\n    query: The query."
+        return call
+
+
+async def run_phase(phase, tools, backends, args, records):
+    for backend in backends:
+        backend.phase = phase
+    deadline = time.monotonic() + args.phase_seconds
+    rng = random.Random(phase)
+
+    async def client(index):
+        while time.monotonic() < deadline:
+            backend = rng.choice(backends)
+            start = time.monotonic()
+            try:
+                result = await tools[backend.name].run_async(args={"query": f"q{index}"}, tool_context=None)
+                status = result["status"] if is_error_result(result) else "ok"
+            except Exception as e:
+                status = f"exception:{type(e).__name__}"
+            records.append({"phase": phase, "backend": backend.name, "seconds": time.monotonic() - start,
+                            "status": status})
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 1) if values else None
+
+
+def summarize(records, wall_seconds):
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record["phase"], record["backend"])].append(record)
+    summary = {"wall_seconds": round(wall_seconds, 1)}
+    for phase in PHASES:
+        summary[phase] = {}
+        for (group_phase, backend), group in sorted(groups.items()):
+            if group_phase != phase:
+                continue
+            seconds = [r["seconds"] for r in group]
+            summary[phase][backend] = {
+                "calls": len(group),
+                "p50_ms": percentile(seconds, 0.5),
+                "p99_ms": percentile(seconds, 0.99),
+                "max_ms": percentile(seconds, 1.0),
+                "status": dict(Counter(r["status"] for r in group)),
+            }
+    return summary
+
+
+async def run(mode, args):
+    backends = [
+        Backend("search", args.latency, blocking=False, faulty=False, args=args),
+        Backend("fetch", args.latency, blocking=False, faulty=False, args=args),
+        Backend("youtube", args.latency, blocking=True, faulty=True, args=args),
+    ]
+    layer = None
+    if mode == "guarded":
+        layer = ResilienceLayer(min_timeout=args.min_timeout, max_timeout=args.max_timeout, min_samples=10,
+                                max_retries=2, backoff=0.05, failure_threshold=5, reset_timeout=args.reset_timeout)
+        # The stubs only read, so their transient failures may be retried.
+        tools = {backend.name: layer.wrap(backend.function(), idempotent=True) for backend in backends}
+    else:
+        tools = {backend.name: FunctionTool(backend.function()) for backend in backends}
+
+    records = []
+    start = time.monotonic()
+    for phase in PHASES:
+        await run_phase(phase, tools, backends, args, records)
+    summary = summarize(records, time.monotonic() - start)
+    if layer is not None:
+        guard = layer.guard("youtube")
+        summary["youtube_breaker"] = [(round(at - start, 1), state) for at, state in guard.breaker.transitions]
+        summary["resilience"] = layer.stats()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients calling random tools.")
+    parser.add_argument("--phase-seconds", type=float, default=8.0, help="Duration of every phase.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Median healthy latency of a call in seconds.")
+    parser.add_argument("--think-time", type=float, default=0.05, help="Average pause between two calls of a client.")
+    parser.add_argument("--slow-seconds", type=float, default=3.0, help="Latency of the slow calls while degraded.")
+    parser.add_argument("--hang-seconds", type=float, default=10.0, help="Latency of every youtube call while down.")
+    parser.add_argument("--min-timeout", type=float, default=0.2, help="Lower bound of the adaptive timeout.")
+    parser.add_argument("--max-timeout", type=float, default=2.0, help="Upper bound of the timeout and budget of a call.")
+    parser.add_argument("--reset-timeout", type=float, default=2.0, help="Seconds a circuit breaker stays open.")
+    parser.add_argument("--mode", choices=("unguarded", "guarded"), help="Run only one mode.")
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(run(mode, args)) for mode in ("unguarded", "guarded") if args.mode in (None, mode)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmarks the full-text file index on a synthetic directory tree.
+
+Measures the initial build, a no-change refresh, saving and loading the snapshot (and
+the refresh a restarted process makes after loading it), an incremental refresh after
+a few files change, the query latency, and the memory of the process before and after the
+build (current and peak resident set size).
+
+Usage:
+    python -m benchmarks.file_index --files 100000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+from allinone.file_index import FileIndex
+
+WORDS = [
+    "agent", "session", "transcript", "summary", "config", "request", "latency", "cache",
+    "invoice", "report", "meeting", "budget", "draft", "python", "server", "client",
+    "회의", "보고서", "예산", "일정",
+] + [f"term{i}" for i in range(2000)]
+
+
+def build_tree(root, n_files, files_per_dir=100, lines_per_file=20, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n_files):
+        directory = os.path.join(root, f"d{i // (files_per_dir * files_per_dir)}", f"d{i // files_per_dir}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"file{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(lines_per_file):
+                f.write(" ".join(rng.choice(WORDS) for _ in range(10)) + "\n")
+        paths.append(path)
+    return paths
+
+
+def memory_mb():
+    """Returns the current and peak resident set size of this process in MB (Linux)."""
+    with open("/proc/self/statm") as f:
+        current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return {"rss_mb": current / 2 ** 20,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100000, help="Number of files in the synthetic tree.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of timed queries.")
+    parser.add_argument("--changed", type=int, default=10, help="Files modified before the incremental refresh.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        paths = build_tree(root, args.files)
+        results = {"files": args.files, "tree_generation_seconds": time.perf_counter() - start}
+
+        results["memory_before_build"] = memory_mb()
+        index = FileIndex(root, snapshot_dir=os.path.join(root, ".snapshot"))
+        results["build"] = index.refresh()
+        results["memory_after_build"] = memory_mb()
+        results["noop_refresh"] = index.refresh()
+
+        start = time.perf_counter()
+        index.save()
+        results["snapshot"] = {"save_seconds": time.perf_counter() - start,
+                               "mb": os.path.getsize(index.snapshot_path) / 2 ** 20}
+        # What a restarted process does: load the snapshot, then refresh the changes.
+        restarted = FileIndex(root, snapshot_dir=os.path.join(root, ".snapshot"))
+        start = time.perf_counter()
+        restarted.load()
+        results["snapshot"]["load_seconds"] = time.perf_counter() - start
+        results["snapshot"]["refresh_after_load"] = restarted.refresh()
+        del restarted
+
+        rng = random.Random(1)
+        for path in rng.sample(paths, min(args.changed, len(paths))):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("needle appended line\n")
+        results["incremental_refresh"] = index.refresh()
+
+        latencies = []
+        for _ in range(args.queries):
+            query = " ".join(rng.sample(WORDS, 2))
+            start = time.perf_counter()
+            index.search(query)
+            latencies.append(time.perf_counter() - start)
+        results["query_ms"] = {
+            "p50": percentile(latencies, 0.5) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "max": max(latencies) * 1000,
+        }
+        results["needle_hits"] = len(index.search("needle", max_results=100))
+        results["index"] = index.stats()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Load-tests the gateway against a stub ADK API server.
+
+The stub answers /run and /run_sse after `--latency` seconds and records how many
+requests it served and how many ran at once. The gateway runs unchanged in its own
+process (`uvicorn gateway:app`) in front of it. Hundreds of concurrent sessions each
+send a series of queries with some think time; a fraction of the queries are double
+submits, which the gateway should coalesce, and a few abusive users send without
+pause, which it should rate limit.
+
+Usage:
+    python -m benchmarks.gateway_load --sessions 300 --queries 10 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def stub_backend(latency):
+    """Returns a FastAPI app standing in for the ADK API server."""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    stats = {"runs": 0, "active": 0, "max_active": 0, "sessions": 0}
+
+    def event(text, partial=False):
+        return {"author": "RootAgent", "partial": partial, "content": {"role": "model", "parts": [{"text": text}]}}
+
+    @app.post("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+    async def create_session(app_name: str, user_id: str, session_id: str):
+        stats["sessions"] += 1
+        return {"id": session_id, "appName": app_name, "userId": user_id, "state": {}, "events": []}
+
+    @app.delete("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+    async def delete_session(app_name: str, user_id: str, session_id: str):
+        return None
+
+    @app.post("/run")
+    async def run(request: Request):
+        payload = await request.json()
+        stats["runs"] += 1
+        stats["active"] += 1
+        stats["max_active"] = max(stats["max_active"], stats["active"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            stats["active"] -= 1
+        return [event(f"Answer to: {payload['new_message']['parts'][0]['text']}")]
+
+    @app.post("/run_sse")
+    async def run_sse(request: Request):
+        payload = await request.json()
+        stats["runs"] += 1
+
+        async def events():
+            stats["active"] += 1
+            stats["max_active"] = max(stats["max_active"], stats["active"])
+            try:
+                for i in range(3):
+                    await asyncio.sleep(latency / 3)
+                    yield f"data: {json.dumps(event(f'chunk {i}', partial=True))}\n\n"
+                yield f"data: {json.dumps(event('Answer to: ' + payload['new_message']['parts'][0]['text']))}\n\n"
+            finally:
+                stats["active"] -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def start_server(args, env, port):
+    process = subprocess.Popen(args, cwd=ROOT, env={**os.environ, **env},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Server on port {port} did not start: {' '.join(args)}")
+
+
+async def run_session(client, index, user_id, args, results, abusive=False):
+    session_id = f"session{index}"
+    await client.post(f"/apps/allinone/users/{user_id}/sessions/{session_id}")
+    rng = random.Random(index)
+
+    async def send(endpoint, payload):
+        start = time.perf_counter()
+        try:
+            if endpoint == "/run_sse":
+                async with client.stream("POST", endpoint, json=payload) as res:
+                    first = None
+                    async for line in res.aiter_lines():
+                        if line.startswith("data:") and first is None:
+                            first = time.perf_counter() - start
+                    status = res.status_code
+                    retry_after = res.headers.get("Retry-After")
+            else:
+                res = await client.post(endpoint, json=payload)
+                status, retry_after, first = res.status_code, res.headers.get("Retry-After"), None
+        except httpx.HTTPError as e:
+            status, retry_after, first = type(e).__name__, None, None
+        results.append({"status": status, "seconds": time.perf_counter() - start, "first_event": first,
+                        "abusive": abusive})
+        return status, retry_after
+
+    def message(q):
+        return {"app_name": "allinone", "user_id": user_id, "session_id": session_id,
+                "new_message": {"role": "user", "parts": [{"text": f"Question {q} of session {index}"}]}}
+
+    if abusive:
+        # Everything at once, ignoring Retry-After.
+        await asyncio.gather(*(send("/run", message(q)) for q in range(args.queries)))
+        return
+
+    for q in range(args.queries):
+        payload = message(q)
+        endpoint = "/run_sse" if q % 2 else "/run"
+        if rng.random() < args.duplicate_rate:
+            # A double submit: the same message sent twice at once.
+            statuses = await asyncio.gather(send(endpoint, payload), send(endpoint, payload))
+        else:
+            statuses = [await send(endpoint, payload)]
+        retry_after = max((float(r) for s, r in statuses if s in (429, 503) and r), default=0)
+        await asyncio.sleep(max(retry_after, rng.uniform(0.5, 1.5) * args.think_time))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else None
+
+
+async def load(args, gateway_url, backend_url):
+    results = []
+    # One small client per session, like separate browsers; a single client with
+    # hundreds of pooled connections would make the load generator the bottleneck.
+    # The gateway trusts the local load generator, which names each simulated
+    # browser's address in X-Forwarded-For like the Streamlit frontend does.
+    users = [(f"user{i}", False) for i in range(args.sessions)] + \
+            [(f"abuser{i}", True) for i in range(args.abusive_users)]
+    clients = [httpx.AsyncClient(base_url=gateway_url, timeout=120,
+                                 headers={"X-Forwarded-For": f"10.0.{i // 256}.{i % 256}"},
+                                 limits=httpx.Limits(max_connections=args.queries if abusive else 2))
+               for i, (_, abusive) in enumerate(users)]
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(client, i, user_id, args, results, abusive)
+                               for i, (client, (user_id, abusive)) in enumerate(zip(clients, users))))
+        wall_seconds = time.perf_counter() - start
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    async with httpx.AsyncClient() as client:
+        gateway_metrics = (await client.get(f"{gateway_url}/gateway/metrics")).json()
+        backend_stats = (await client.get(f"{backend_url}/stats")).json()
+
+    ok = [r for r in results if r["status"] == 200]
+    return {
+        "sessions": args.sessions,
+        "abusive_users": args.abusive_users,
+        "requests": len(results),
+        "wall_seconds": wall_seconds,
+        "throughput_rps": len(ok) / wall_seconds,
+        "status": dict(Counter(str(r["status"]) for r in results)),
+        "status_abusive": dict(Counter(str(r["status"]) for r in results if r["abusive"])),
+        "latency_ms": {
+            "p50": percentile([r["seconds"] for r in ok], 0.5),
+            "p95": percentile([r["seconds"] for r in ok], 0.95),
+            "p99": percentile([r["seconds"] for r in ok], 0.99),
+            "max": percentile([r["seconds"] for r in ok], 1.0),
+        },
+        "first_event_ms_p95": percentile([r["first_event"] for r in ok if r["first_event"] is not None], 0.95),
+        "gateway": gateway_metrics,
+        "backend": backend_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300, help="Concurrent well-behaved sessions, one user each.")
+    parser.add_argument("--queries", type=int, default=10, help="Queries per session.")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Average seconds between two queries of a session.")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1, help="Fraction of queries sent twice at once.")
+    parser.add_argument("--abusive-users", type=int, default=2, help="Users sending their queries without pause.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds the stub backend takes per run.")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="Gateway backend concurrency.")
+    parser.add_argument("--max-queue", type=int, default=256, help="Gateway queue length.")
+    parser.add_argument("--output", default="gateway_load.json", help="File the results are written to.")
+    parser.add_argument("--serve-backend", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_backend:
+        import uvicorn
+        uvicorn.run(stub_backend(args.latency), port=args.serve_backend, log_level="warning")
+        return
+
+    backend_port, gateway_port = free_port(), free_port()
+    backend = start_server([sys.executable, "-m", "benchmarks.gateway_load", "--serve-backend", str(backend_port),
+                            "--latency", str(args.latency)], {}, backend_port)
+    try:
+        gateway = start_server(
+            [sys.executable, "-m", "uvicorn", "gateway:app", "--port", str(gateway_port), "--log-level", "warning"],
+            {"GATEWAY_BACKEND_URL": f"http://127.0.0.1:{backend_port}",
+             "GATEWAY_MAX_CONCURRENCY": str(args.max_concurrency),
+             "GATEWAY_MAX_QUEUE": str(args.max_queue)},
+            gateway_port,
+        )
+        try:
+            results = asyncio.run(load(args, f"http://127.0.0.1:{gateway_port}", f"http://127.0.0.1:{backend_port}"))
+        finally:
+            gateway.terminate()
+            gateway.wait()
+    finally:
+        backend.terminate()
+        backend.wait()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Local stand-ins for the fetch, filesystem and dice MCP servers used by the agents.
+They expose the same tool names and arguments as the real servers but answer
+deterministically without network access.
+
+Usage:
+    python benchmarks/mcp_stubs.py fetch|filesystem|dice [root]
+"""
+import os
+import random
+import sys
+from fastmcp import FastMCP
+
+
+def fetch_server() -> FastMCP:
+    mcp = FastMCP(name="Fetch Stub")
+
+    @mcp.tool
+    def fetch(url: str, max_length: int = 5000, start_index: int = 0, raw: bool = False) -> str:
+        """Fetches a URL from the internet and extracts its contents as markdown."""
+        lines = [f"# {url}", ""]
+        lines += [f"Paragraph {i} of the page at {url}." for i in range(200)]
+        content = "\n".join(lines)
+        return f"Contents of {url}:\n{content[start_index:start_index + max_length]}"
+
+    return mcp
+
+
+def filesystem_server(root: str) -> FastMCP:
+    mcp = FastMCP(name="Filesystem Stub")
+    root = os.path.abspath(root)
+
+    def resolve(path: str) -> str:
+        full_path = os.path.abspath(os.path.join(root, path))
+        if os.path.commonpath([root, full_path]) != root:
+            raise ValueError(f"Access denied - path outside allowed directories: {path}")
+        return full_path
+
+    @mcp.tool
+    def list_allowed_directories() -> str:
+        """Returns the list of directories that this server is allowed to access."""
+        return f"Allowed directories:\n{root}"
+
+    @mcp.tool
+    def list_directory(path: str) -> str:
+        """Gets a detailed listing of all files and directories in a specified path."""
+        full_path = resolve(path)
+        return "\n".join(
+            f"[DIR] {name}" if os.path.isdir(os.path.join(full_path, name)) else f"[FILE] {name}"
+            for name in sorted(os.listdir(full_path))
+        )
+
+    @mcp.tool
+    def read_file(path: str) -> str:
+        """Reads the complete contents of a file from the file system."""
+        with open(resolve(path), encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    @mcp.tool
+    def search_files(path: str, pattern: str) -> str:
+        """Recursively searches for files and directories whose name contains the pattern."""
+        matches = []
+        for dirpath, dirnames, filenames in os.walk(resolve(path)):
+            matches += [os.path.join(dirpath, name) for name in dirnames + filenames if pattern.lower() in name.lower()]
+        return "\n".join(sorted(matches)) or "No matches found"
+
+    return mcp
+
+
+def dice_server() -> FastMCP:
+    mcp = FastMCP(name="Dice Roller Stub")
+    rng = random.Random(0)
+
+    @mcp.tool
+    def roll_dice(n_dice: int) -> dict:
+        """Roll `n_dice` 6-sided dice and return the results and the seed."""
+        return {"dice": [rng.randint(1, 6) for _ in range(n_dice)], "seed": 0}
+
+    return mcp
+
+
+if __name__ == "__main__":
+    kind = sys.argv[1]
+    if kind == "fetch":
+        server = fetch_server()
+    elif kind == "filesystem":
+        server = filesystem_server(sys.argv[2])
+    elif kind == "dice":
+        server = dice_server()
+    else:
+        sys.exit(f"Unknown server '{kind}'")
+    server.run(show_banner=False)
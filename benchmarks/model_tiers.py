@@ -0,0 +1,105 @@
+"""
+Compares the tiered model policy with the compact root instruction against a single
+fixed model with the full instruction, side by side on the recorded query corpus.
+
+Unlike the other benchmarks this one calls the real Gemini models, so it needs
+GOOGLE_API_KEY. MCP servers, YouTube and URL validation still use the offline
+stand-ins of `benchmarks.agents`, and the response cache is disabled. Each
+configuration runs in its own process, since the agents read it at import time.
+
+Usage:
+    python -m benchmarks.model_tiers --repeat 2 --output model_tiers.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.agents import CORPUS, setup_environment
+
+CONFIGURATIONS = {
+    "tiered": {
+        "ROOT_INSTRUCTION": "compact",
+        "ROOT_MODEL_TIERS": "gemini-2.5-flash-lite,gemini-2.5-flash",
+        "SUB_AGENT_MODEL_TIERS": "gemini-2.0-flash-lite,gemini-2.5-flash",
+    },
+    "fixed": {
+        "ROOT_INSTRUCTION": "full",
+        "ROOT_MODEL_TIERS": "gemini-2.5-flash",
+        "SUB_AGENT_MODEL_TIERS": "gemini-2.0-flash-lite",
+    },
+}
+
+
+async def run_configuration(corpus, repeat):
+    import allinone.agent as agent_module
+    from google.adk.runners import InMemoryRunner
+    from benchmarks.agents import install_stubs, latency_ms, replay
+
+    install_stubs(agent_module, corpus, 0.0, response_cache=False, fake_models=False)
+    runner = InMemoryRunner(agent=agent_module.root_agent, app_name="benchmark")
+    try:
+        results, wall_seconds = await replay(runner, corpus * repeat, 1)
+    finally:
+        await agent_module.mcp_manager.shutdown()
+        await runner.close()
+
+    return {
+        "wall_seconds": wall_seconds,
+        "latency_ms": latency_ms([result["seconds"] for result in results]),
+        "routes": [{"query": result["query"], "route": result["route"], "error": result["error"]}
+                   for result in results],
+        "model_tiers": {
+            "root": agent_module.root_model_tiers.stats(),
+            "sub_agents": agent_module.sub_agent_model_tiers.stats(),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS, help="JSON file with the recorded queries.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times the corpus is replayed.")
+    parser.add_argument("--output", default="model_tiers.json", help="File the results are written to.")
+    parser.add_argument("--configuration", choices=CONFIGURATIONS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        # Fast-path queries never reach a model.
+        corpus = [entry for entry in json.load(f) if entry["route"] != "fast_path"]
+
+    if args.configuration:
+        with tempfile.TemporaryDirectory() as workdir:
+            api_key = os.environ.get("GOOGLE_API_KEY")
+            setup_environment(workdir)
+            os.environ["GOOGLE_API_KEY"] = api_key or ""
+            os.environ.update(CONFIGURATIONS[args.configuration])
+            print(json.dumps(asyncio.run(run_configuration(corpus, args.repeat))))
+        return
+
+    if not os.environ.get("GOOGLE_API_KEY"):
+        sys.exit("GOOGLE_API_KEY is required for this benchmark.")
+
+    results = {}
+    for name in CONFIGURATIONS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.model_tiers", "--configuration", name,
+             "--corpus", args.corpus, "--repeat", str(args.repeat)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+
+    results["route_agreement"] = sum(
+        a["route"] == b["route"] for a, b in zip(results["tiered"]["routes"], results["fixed"]["routes"])
+    ) / len(results["tiered"]["routes"])
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
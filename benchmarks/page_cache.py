@@ -0,0 +1,173 @@
+"""
+Measures the fetched-page cache against a local HTTP stub server.
+
+The stub serves generated HTML pages of `--page-kb` kilobytes after `--latency`
+seconds, with ETag and Last-Modified headers, and answers conditional requests
+with 304 when a page is unchanged. It has no robots.txt, so every page may be
+fetched. Every page is read cold, then again while fresh, then again after `max_age`
+has passed (revalidated with a 304), and once more after part of the pages changed.
+Each read returns the first page of the markdown only.
+
+Usage:
+    python -m benchmarks.page_cache --pages 20 --page-kb 200 --latency 0.2
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import tempfile
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from allinone.cache import ContentStore
+from allinone.page_cache import PageCache
+
+
+def make_page(i, version, size):
+    paragraphs, length = [], 0
+    while length < size:
+        n = len(paragraphs)
+        paragraphs.append(f"<p>Paragraph {n} of page {i}, version {version}. "
+                          f"See <a href=\"/page/{(i + n) % 50}\">page {(i + n) % 50}</a> for more.</p>")
+        length += len(paragraphs[-1])
+    return (f"<html><head><title>Page {i}</title><script>var tracking = {i};</script></head>"
+            f"<body><nav>Home | About</nav><h1>Page {i}</h1>{''.join(paragraphs)}"
+            f"<footer>Footer</footer></body></html>").encode("utf-8")
+
+
+class StubSite:
+    """Serves /page/<i> with ETag/Last-Modified and 304 answers, and counts the bytes sent."""
+
+    def __init__(self, pages, size, latency):
+        self.size = size
+        self.latency = latency
+        self.versions = {i: (0, time.time()) for i in range(pages)}
+        self._pages = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def page(self, i):
+        """Returns the body, ETag and modification time of the current version of page `i`."""
+        version, modified = self.versions[i]
+        if (i, version) not in self._pages:
+            body = make_page(i, version, self.size)
+            self._pages[(i, version)] = (body, '"' + hashlib.sha256(body).hexdigest()[:16] + '"')
+        return *self._pages[(i, version)], modified
+
+    def change(self, i):
+        version, _ = self.versions[i]
+        self.versions[i] = (version + 1, time.time())
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/robots.txt":
+                    self.send_error(404)
+                    return
+                time.sleep(site.latency)
+                i = int(self.path.rsplit("/", 1)[-1])
+                body, etag, modified = site.page(i)
+                with site._lock:
+                    site.requests += 1
+                if self.headers.get("If-None-Match") == etag:
+                    with site._lock:
+                        site.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                with site._lock:
+                    site.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", formatdate(modified, usegmt=True))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+async def read_all(cache, urls, max_length):
+    """Reads the first page of every URL concurrently; returns per-read seconds and results."""
+
+    async def read(url):
+        start = time.perf_counter()
+        result = await cache.fetch(url, max_length=max_length)
+        return time.perf_counter() - start, result
+
+    return await asyncio.gather(*(read(url) for url in urls))
+
+
+def summary(reads):
+    seconds = sorted(s for s, _ in reads)
+    return {
+        "cache": dict(Counter(r.get("cache", "error") for _, r in reads)),
+        "latency_ms_p50": seconds[len(seconds) // 2] * 1000,
+        "latency_ms_max": seconds[-1] * 1000,
+        "errors": sum("error" in r for _, r in reads),
+    }
+
+
+async def run(args, base_url, site):
+    with tempfile.TemporaryDirectory() as store_dir:
+        cache = PageCache(ContentStore(store_dir), max_age=args.max_age)
+        # Tracking parameters and fragments normalize to the same key.
+        urls = [f"{base_url}/page/{i}" for i in range(args.pages)]
+        variants = [f"{url}?utm_source=newsletter#top" for url in urls]
+
+        phases = {}
+        phases["cold"] = summary(await read_all(cache, urls, args.max_length))
+        phases["fresh"] = summary(await read_all(cache, variants, args.max_length))
+        await asyncio.sleep(args.max_age)
+        phases["revalidated"] = summary(await read_all(cache, urls, args.max_length))
+        await asyncio.sleep(args.max_age)
+        for i in range(0, args.pages, 4):
+            site.change(i)
+        phases["quarter_changed"] = summary(await read_all(cache, urls, args.max_length))
+
+        first = await cache.fetch(urls[0], max_length=args.max_length)
+        return {
+            "pages": args.pages,
+            "page_bytes": len(make_page(0, 0, args.page_kb * 1024)),
+            "markdown_chars": first["total_length"],
+            "tool_payload_chars": len(json.dumps(first)),
+            "phases": phases,
+            "server": {"requests": site.requests, "not_modified": site.not_modified, "bytes_sent": site.bytes_sent},
+            "bytes_without_cache": 4 * args.pages * len(make_page(0, 0, args.page_kb * 1024)),
+            "page_cache": cache.stats(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="Number of distinct pages.")
+    parser.add_argument("--page-kb", type=int, default=200, help="Approximate size of every page in kilobytes.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the stub server takes per request.")
+    parser.add_argument("--max-age", type=float, default=10.0, help="Seconds an entry is served without revalidation.")
+    parser.add_argument("--max-length", type=int, default=5000, help="Characters returned per read.")
+    args = parser.parse_args()
+
+    site = StubSite(args.pages, args.page_kb * 1024, args.latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), site.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        results = asyncio.run(run(args, f"http://127.0.0.1:{server.server_port}", site))
+    finally:
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares sequential and parallel sub-agent calls on stubbed agents.
+
+Usage:
+    python -m benchmarks.parallel --agents 3 --latency 1.0
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from allinone.parallel import ParallelAgentRunner
+
+
+class StubAgentTool:
+    """Stands in for an AgentTool whose sub-agent takes `latency` seconds to answer."""
+
+    def __init__(self, name, latency):
+        self.name = name
+        self.latency = latency
+
+    async def run_async(self, *, args, tool_context):
+        await asyncio.sleep(self.latency)
+        return f"{self.name}: {args['request']}"
+
+
+async def run(args):
+    tools = [StubAgentTool(f"Agent{i}", args.latency) for i in range(args.agents)]
+    names = [tool.name for tool in tools]
+    requests = [f"task {i}" for i in range(args.agents)]
+
+    start = time.perf_counter()
+    for tool, request in zip(tools, requests):
+        await tool.run_async(args={"request": request}, tool_context=None)
+    sequential = time.perf_counter() - start
+
+    runner = ParallelAgentRunner(tools, max_concurrency=args.concurrency, timeout=args.latency * 10)
+    start = time.perf_counter()
+    merged = await runner.run(names, requests, tool_context=None)
+    parallel = time.perf_counter() - start
+
+    return {
+        "agents": args.agents,
+        "sequential_seconds": sequential,
+        "parallel_seconds": parallel,
+        "speedup": sequential / parallel,
+        "all_ok": all(result["status"] == "ok" for result in merged["results"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=3, help="Number of independent sub-tasks.")
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per stubbed sub-agent call.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrency cap of the parallel runner.")
+    print(json.dumps(asyncio.run(run(parser.parse_args())), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Measures Streamlit rerun time of the frontend for a long conversation.
+
+A session with `--messages` messages and a large last response is written to a
+temporary chat store, and `app.py` runs headless (streamlit.testing's AppTest)
+against a stub ADK API server with `?session=<id>` in the URL, as after a page
+refresh. Reruns are timed with the default page of messages and with a page large
+enough to render the whole history at once, which is what every rerun did when the
+history lived in the session state.
+
+Usage:
+    python -m benchmarks.rerun --messages 1000 --reruns 10
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub_backend(port):
+    """Serves the session endpoints of the ADK API server and counts session creations."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    app = FastAPI()
+    stats = {"created": 0, "fetched": 0}
+
+    @app.get("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+    async def get_session(app_name: str, user_id: str, session_id: str):
+        stats["fetched"] += 1
+        return {"id": session_id, "appName": app_name, "userId": user_id, "state": {}, "events": []}
+
+    @app.post("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+    async def create_session(app_name: str, user_id: str, session_id: str):
+        stats["created"] += 1
+        return {"id": session_id, "appName": app_name, "userId": user_id, "state": {}, "events": []}
+
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return server, stats
+
+
+def seed_session(store, session_id, messages, response_kb):
+    """Writes a conversation of `messages` alternating user and assistant messages."""
+    store.create_session(session_id, "allinone", "bench-user")
+    answer = ("Here is a detailed answer with **markdown**, a list and some `code`.\n\n"
+              "- first point\n- second point\n\n" + "More explanation. " * 30)
+    for i in range(messages):
+        if i % 2:
+            store.append(session_id, "assistant", f"Answer {i // 2}: {answer}")
+        else:
+            store.append(session_id, "user", f"Question {i // 2}: what about topic {i // 2}?")
+    event = {"author": "RootAgent", "content": {"role": "model", "parts": [{"text": "x" * 1024}]}}
+    store.save_response(session_id, [event] * response_kb)
+
+
+def page_size_input(app_test):
+    # Widgets have to be looked up again after every run.
+    return next(n for n in app_test.sidebar.number_input if n.label == "Messages per Page")
+
+
+def time_reruns(app_test, reruns):
+    seconds = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app_test.run()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000, help="Messages in the conversation.")
+    parser.add_argument("--reruns", type=int, default=10, help="Timed reruns per page size.")
+    parser.add_argument("--response-kb", type=int, default=200, help="Size of the stored last response in KB.")
+    args = parser.parse_args()
+
+    from streamlit.testing.v1 import AppTest
+
+    port = free_port()
+    server, backend_stats = start_stub_backend(port)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["GEMAGENT_CACHE_DIR"] = cache_dir
+        os.environ["ADK_API_URL"] = f"http://127.0.0.1:{port}"
+        from chat_store import ChatStore, default_chat_store_path
+        store = ChatStore(default_chat_store_path())
+        session_id = "benchmark-session"
+        seed_session(store, session_id, args.messages, args.response_kb)
+
+        app_test = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+        app_test.query_params["session"] = session_id
+        start = time.perf_counter()
+        app_test.run()
+        restore_seconds = time.perf_counter() - start
+        restored = {
+            "session_id": app_test.session_state["session_id"],
+            "user_id": app_test.session_state["user_id"],
+            "rendered_messages": len(app_test.chat_message),
+            "errors": [e.value for e in app_test.error],
+            "backend_sessions_created": backend_stats["created"],
+            "last_response_in_session_state": "last_response" in app_test.session_state,
+        }
+
+        results = {"messages": args.messages, "restore_seconds": restore_seconds, "restored": restored}
+        default_page_size = int(page_size_input(app_test).value)
+        for name, page_size in (("paginated", default_page_size), ("full_history", args.messages)):
+            page_size_input(app_test).set_value(page_size)
+            app_test.run()
+            seconds = time_reruns(app_test, args.reruns)
+            results[name] = {
+                "page_size": page_size,
+                "rendered_messages": len(app_test.chat_message),
+                "rerun_ms_median": statistics.median(seconds) * 1000,
+                "rerun_ms_max": max(seconds) * 1000,
+            }
+        results["speedup"] = results["full_history"]["rerun_ms_median"] / results["paginated"]["rerun_ms_median"]
+
+        # Loading an older page extends the window by one page.
+        page_size_input(app_test).set_value(default_page_size)
+        app_test.run()
+        load_older = next(b for b in app_test.button if b.label == "Load Older Messages")
+        load_older.click()
+        app_test.run()
+        results["after_load_older"] = {"rendered_messages": len(app_test.chat_message)}
+        store.close()
+    server.should_exit = True
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
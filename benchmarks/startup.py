@@ -0,0 +1,110 @@
+"""
+Measures process startup: the time to import the agent graph and the time from the
+start of the import to the first answer, with sub-agents and MCP toolsets built lazily
+and, for comparison, built eagerly at import as before.
+
+Each run happens in a fresh process with the offline fake models and MCP stand-ins
+of `benchmarks.agents`. The first query goes through DateTimeAgent, so it builds one
+sub-agent; the MCP servers are prestarted in the background meanwhile.
+
+Usage:
+    python -m benchmarks.startup --runs 5 --output startup.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.agents import setup_environment
+
+# Not answered by the fast path, so it goes through the root model and one sub-agent.
+QUERY = {"query": "What day of the week will it be in three days from today?", "route": ["DateTimeAgent"],
+         "calls": [{"agent": "DateTimeAgent", "request": "What is today's date?"}]}
+
+
+async def measure(mode):
+    start = time.perf_counter()
+    import allinone.agent as agent_module
+    from google.adk.runners import InMemoryRunner
+    import_seconds = time.perf_counter() - start
+
+    if mode == "eager":
+        # What importing the module used to do: build every sub-agent and MCP toolset.
+        for tool in agent_module.sub_agent_tools:
+            tool.agent
+        for pool in agent_module.mcp_manager.pools.values():
+            pool.prepare()
+    graph_seconds = time.perf_counter() - start
+
+    from benchmarks.agents import install_stubs, run_query
+    install_stubs(agent_module, [QUERY], 0.0, response_cache=False)
+    runner = InMemoryRunner(agent=agent_module.root_agent, app_name="benchmark")
+    try:
+        result = await run_query(runner, QUERY, 0)
+        first_response_seconds = time.perf_counter() - start
+    finally:
+        await agent_module.mcp_manager.shutdown()
+        await runner.close()
+
+    return {
+        "import_seconds": import_seconds,
+        "graph_seconds": graph_seconds,
+        "first_response_seconds": first_response_seconds,
+        "built_agents": [tool.name for tool in agent_module.sub_agent_tools if tool.is_built],
+        "route": result["route"],
+        "error": result["error"],
+    }
+
+
+def summarize(runs):
+    return {
+        key: {"median": statistics.median(run[key] for run in runs), "min": min(run[key] for run in runs)}
+        for key in ("import_seconds", "graph_seconds", "first_response_seconds")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode.")
+    parser.add_argument("--output", default="startup.json", help="File the results are written to.")
+    parser.add_argument("--mode", choices=("lazy", "eager"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        with tempfile.TemporaryDirectory() as workdir:
+            setup_environment(workdir)
+            print(json.dumps(asyncio.run(measure(args.mode))))
+        return
+
+    results = {}
+    for mode in ("eager", "lazy"):
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup", "--mode", mode],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        results[mode] = {
+            **summarize(runs),
+            "route": runs[-1]["route"],
+            "built_agents": runs[-1]["built_agents"],
+            "errors": [run["error"] for run in runs if run["error"]],
+        }
+
+    results["speedup"] = {
+        key: results["eager"][key]["median"] / results["lazy"][key]["median"]
+        for key in ("graph_seconds", "first_response_seconds")
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
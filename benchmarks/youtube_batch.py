@@ -0,0 +1,78 @@
+"""
+Compares serial transcript retrieval with the batch tool against a stubbed YouTube API.
+
+Usage:
+    python -m benchmarks.youtube_batch --videos 30 --latency 0.5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from allinone import youtube
+
+
+class StubTranscript:
+    def __init__(self, video_id, latency):
+        self.video_id = video_id
+        self.latency = latency
+        self.language_code = "en"
+
+    def fetch(self):
+        time.sleep(self.latency)
+        return [SimpleNamespace(text=f"{self.video_id} segment {i}", start=i * 5.0, duration=5.0) for i in range(200)]
+
+
+class StubTranscriptList:
+    def __init__(self, video_id, latency):
+        self.transcript = StubTranscript(video_id, latency)
+
+    def find_transcript(self, language_codes):
+        return self.transcript
+
+    def __iter__(self):
+        return iter([self.transcript])
+
+
+def stub_api(latency):
+    """Returns a stand-in for the YouTubeTranscriptApi class whose instances sleep `latency` per list."""
+    class StubTranscriptApi:
+        def list(self, video_id):
+            time.sleep(latency)
+            return StubTranscriptList(video_id, latency)
+    return StubTranscriptApi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=30, help="Number of distinct videos.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per stubbed API call.")
+    parser.add_argument("--workers", type=int, default=8, help="Batch thread pool size.")
+    args = parser.parse_args()
+
+    youtube.YouTubeTranscriptApi = stub_api(args.latency)
+    os.environ["YOUTUBE_BATCH_WORKERS"] = str(args.workers)
+    urls = [f"https://www.youtube.com/watch?v=vid{i:08d}" for i in range(args.videos)]
+
+    results = {}
+    for name in ("serial", "batch"):
+        # Every run starts with an empty cache so it measures the network path.
+        with tempfile.TemporaryDirectory() as cache_dir:
+            os.environ["TRANSCRIPT_CACHE_DIR"] = cache_dir
+            youtube.get_transcript_cache.cache_clear()
+            start = time.perf_counter()
+            if name == "serial":
+                succeeded = sum(1 for url in urls if youtube.get_youtube_transcript(url))
+            else:
+                succeeded = youtube.get_youtube_transcripts(urls)["succeeded"]
+            elapsed = time.perf_counter() - start
+        results[name] = {"seconds": elapsed, "videos_per_second": args.videos / elapsed, "succeeded": succeeded}
+
+    results["speedup"] = results["serial"]["seconds"] / results["batch"]["seconds"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
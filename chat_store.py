@@ -0,0 +1,135 @@
+# chat_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def default_chat_store_path():
+    """
+    Returns the SQLite file the frontend keeps its chat history in by default.
+    """
+    base = os.getenv("GEMAGENT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "gemagent"))
+    return os.getenv("CHAT_STORE_PATH", os.path.join(base, "chat_history.sqlite3"))
+
+
+class ChatStore:
+    """
+    SQLite-backed chat history, keyed by session ID.
+
+    Messages are read a page at a time, newest first, so the frontend renders only
+    the latest window of a long conversation and loads older pages on demand. The
+    full response of the last turn of each session is kept in its own table and
+    read only when it is displayed, instead of being held in the Streamlit session
+    state. A single connection in WAL mode is shared by all reruns and tabs.
+
+    Args:
+        path: The SQLite database file; created with its directory if missing.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            app_name TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS messages_by_session ON messages (session_id, id);
+        CREATE TABLE IF NOT EXISTS responses (
+            session_id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Sessions ---
+
+    def create_session(self, session_id, app_name, user_id):
+        """Records a new session, keeping the history of an existing one with the same ID."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, app_name, user_id, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, app_name, user_id, time.time()),
+            )
+
+    def get_session(self, session_id):
+        """Returns the app name and user ID of a session as a dict, or None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id, app_name, user_id, created_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def delete_session(self, session_id):
+        """Deletes a session with its messages and last response."""
+        with self._lock, self._conn:
+            for table in ("messages", "responses", "sessions"):
+                self._conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    # --- Messages ---
+
+    def append(self, session_id, role, content):
+        """Appends a message to a session and returns its ID."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, time.time()),
+            ).lastrowid
+
+    def recent(self, session_id, limit=50):
+        """
+        Returns up to `limit` messages of a session in chronological order.
+
+        Args:
+            session_id: The session to read.
+            limit: Maximum number of messages, counted from the newest one.
+
+        Returns:
+            A list of dicts with id, role and content.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    # --- Responses ---
+
+    def save_response(self, session_id, payload):
+        """Stores the full response (the list of events) of a session's last turn."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (session_id, payload, created_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+
+    def last_response(self, session_id):
+        """Returns the full response of a session's last turn, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM responses WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row["payload"]) if row else None
@@ -0,0 +1,41 @@
+# event_view.py
+
+
+def stream_text(event_stream, events):
+    """
+    Yields displayable text from a stream of /run_sse events as they arrive.
+    Partial text is yielded incrementally and tool calls are rendered as progress lines.
+    Every received event is appended to `events` for the full response dialog.
+    """
+    streamed_partial = False
+    for event in event_stream:
+        events.append(event)
+        if "error" in event:
+            yield f"\n\n**Error:** {event['error']}\n\n"
+            continue
+        for part in (event.get("content") or {}).get("parts", []):
+            if "functionCall" in part:
+                yield f"\n\n> 🔧 Calling `{part['functionCall'].get('name')}`...\n\n"
+            elif "functionResponse" in part:
+                yield f"\n\n> ✅ `{part['functionResponse'].get('name')}` finished\n\n"
+            elif part.get("text"):
+                # The final non-partial event repeats the text already streamed as partials.
+                if event.get("partial"):
+                    streamed_partial = True
+                    yield part["text"]
+                elif not streamed_partial:
+                    yield part["text"]
+        if not event.get("partial"):
+            streamed_partial = False
+
+
+def final_text_from_events(events):
+    """
+    Returns the text of the last complete event, which holds the agent's final answer.
+    """
+    for event in reversed(events):
+        if event.get("partial"):
+            continue
+        parts = (event.get("content") or {}).get("parts") or [{}]
+        return parts[0].get("text", "")
+    return ""
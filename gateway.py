@@ -0,0 +1,427 @@
+# gateway.py
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `burst` requests at once and `rate` requests per second on average.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Takes a token. Returns 0 if allowed, otherwise the seconds until a token is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be queued, or waited too long in the queue."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Flight:
+    """
+    One backend request and everyone waiting for its result.
+
+    The first caller starts the request; identical requests arriving while it runs
+    subscribe to the same flight instead of reaching the backend. Events are kept
+    as they arrive, so late subscribers replay the ones they missed.
+    """
+
+    def __init__(self):
+        self.status = None
+        self.body = b""
+        self.headers = {}
+        self.events = []
+        self.done = False
+        self.subscribers = 1
+        self.started = asyncio.Event()
+        self._changed = asyncio.Event()
+
+    def start(self, status, body=b"", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.started.set()
+
+    def append(self, event):
+        self.events.append(event)
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self.started.set()
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def stream(self):
+        """Yields every event of the flight, including the ones sent before subscribing."""
+        i = 0
+        while True:
+            while i < len(self.events):
+                yield self.events[i]
+                i += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class Gateway:
+    """
+    Asyncio gateway multiplexing many users and sessions onto one ADK API server.
+
+    Requests pass four stages before they reach the backend:
+
+    - A token bucket per caller limits the request rate; excess requests get a 429 with
+      a Retry-After header instead of queueing behind everyone else. The caller is the
+      client's address, not the user ID in the request, which any client can change.
+      Behind a trusted proxy, such as the Streamlit frontend, it is the address the
+      proxy reports in X-Forwarded-For.
+    - Identical /run or /run_sse requests (same app, user, session and message) that
+      are already in flight are coalesced: they share the running backend request, so
+      double submits and client retries cost nothing.
+    - At most `max_concurrency` requests run on the backend at once. Up to `max_queue`
+      more wait in FIFO order; beyond that, or after waiting `queue_timeout` seconds,
+      requests get a 503 with a Retry-After estimated from the queue length.
+    - The backend request runs in its own task, so a client disconnecting doesn't
+      cancel the result for the other subscribers.
+
+    Each backend slot owns one keep-alive connection. httpx scans its whole pool on
+    every request, which made a shared pool the gateway's main CPU cost under load.
+
+    Args:
+        backend_url: Base URL of the ADK API server.
+        rate: Requests per second allowed per caller, on average.
+        burst: Requests a caller may send at once.
+        max_concurrency: Maximum number of requests running on the backend.
+        max_queue: Maximum number of requests waiting for a backend slot.
+        queue_timeout: Seconds a request may wait for a backend slot.
+        read_timeout: Seconds to wait between bytes received from the backend.
+        max_callers: Number of callers whose rate limit state is kept.
+        trusted_proxies: Addresses whose X-Forwarded-For header is believed.
+    """
+
+    def __init__(self, backend_url, rate=2.0, burst=5, max_concurrency=32, max_queue=256,
+                 queue_timeout=30.0, read_timeout=300.0, max_callers=10000, trusted_proxies=("127.0.0.1", "::1")):
+        self.backend_url = backend_url.rstrip("/")
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.read_timeout = read_timeout
+        self.max_callers = max_callers
+        self.trusted_proxies = set(trusted_proxies)
+        self.client = None
+        self._slot_clients = []
+        self._buckets = OrderedDict()
+        self._flights = {}
+        self._free_slots = []
+        self._waiters = deque()
+        self._latencies = deque(maxlen=2000)
+        self._backend_latencies = deque(maxlen=200)
+        self.counters = {
+            "requests": 0,
+            "backend_requests": 0,
+            "coalesced": 0,
+            "rate_limited": 0,
+            "overloaded": 0,
+            "queue_timeouts": 0,
+            "backend_errors": 0,
+        }
+
+    def _new_client(self, connections):
+        return httpx.AsyncClient(
+            base_url=self.backend_url,
+            timeout=httpx.Timeout(connect=5.0, read=self.read_timeout, write=30.0, pool=None),
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+        )
+
+    async def start(self):
+        # Session requests are not queued, so they use a separate pool.
+        self.client = self._new_client(8)
+        self._slot_clients = [self._new_client(1) for _ in range(self.max_concurrency)]
+        self._free_slots = list(range(self.max_concurrency))
+
+    async def close(self):
+        for client in [self.client, *self._slot_clients]:
+            if client is not None:
+                await client.aclose()
+
+    # --- Rate limiting ---
+
+    def caller(self, peer, forwarded_for=None):
+        """
+        Returns the address a request is rate limited by: the connecting peer, or, when
+        the peer is a trusted proxy, the first untrusted address in its X-Forwarded-For.
+        """
+        if peer in self.trusted_proxies and forwarded_for:
+            for address in reversed([a.strip() for a in forwarded_for.split(",") if a.strip()]):
+                if address not in self.trusted_proxies:
+                    return address
+        return peer or ""
+
+    def _rate_limit(self, caller):
+        """Returns 0 if the caller may send a request, otherwise the seconds to wait."""
+        bucket = self._buckets.get(caller)
+        if bucket is None:
+            bucket = self._buckets[caller] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_callers:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(caller)
+        return bucket.take()
+
+    # --- Admission ---
+
+    def _retry_after(self):
+        """Estimates the seconds until a queued request would get a backend slot."""
+        latencies = self._backend_latencies
+        average = sum(latencies) / len(latencies) if latencies else 1.0
+        return max(1, math.ceil((len(self._waiters) + 1) / self.max_concurrency * average))
+
+    async def _acquire(self):
+        """Returns the index of a free backend slot, waiting in the queue if there is none."""
+        if self._free_slots and not self._waiters:
+            return self._free_slots.pop()
+        if len(self._waiters) >= self.max_queue:
+            self.counters["overloaded"] += 1
+            raise Overloaded("queue_full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["queue_timeouts"] += 1
+            raise Overloaded("queue_timeout", self._retry_after())
+        except BaseException:
+            # Cancelled after the slot was handed over: pass it on.
+            if waiter.done() and not waiter.cancelled():
+                self._release(waiter.result())
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self, slot):
+        # Hand the slot directly to the next waiter, so it can't be taken by a newcomer.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(slot)
+                return
+        self._free_slots.append(slot)
+
+    # --- Requests ---
+
+    def _flight(self, kind, payload, lead):
+        """Returns the in-flight request for `payload`, starting it with `lead` if there is none."""
+        key = kind + ":" + hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.subscribers += 1
+            self.counters["coalesced"] += 1
+            return flight
+
+        flight = self._flights[key] = Flight()
+
+        async def run():
+            try:
+                slot = await self._acquire()
+            except Overloaded as e:
+                flight.start(503, json.dumps({"error": "overloaded", "reason": e.reason,
+                                              "retry_after": e.retry_after}).encode("utf-8"),
+                             {"Retry-After": str(e.retry_after)})
+                flight.finish()
+                self._flights.pop(key, None)
+                return
+
+            start = time.perf_counter()
+            self.counters["backend_requests"] += 1
+            try:
+                await lead(self._slot_clients[slot], flight)
+            except Exception as e:
+                self.counters["backend_errors"] += 1
+                if not flight.started.is_set():
+                    flight.start(502, json.dumps({"error": "backend_unavailable", "detail": str(e)}).encode("utf-8"))
+                else:
+                    # The stream already started; report the failure the way the ADK server does.
+                    flight.append(json.dumps({"error": f"Backend stream failed: {e}"}))
+            finally:
+                self._backend_latencies.append(time.perf_counter() - start)
+                self._release(slot)
+                flight.finish()
+                self._flights.pop(key, None)
+
+        asyncio.get_running_loop().create_task(run())
+        return flight
+
+    async def _lead_run(self, client, flight, payload):
+        res = await client.post("/run", json=payload)
+        flight.start(res.status_code, res.content)
+
+    async def _lead_run_sse(self, client, flight, payload):
+        async with client.stream("POST", "/run_sse", json=payload) as res:
+            if res.status_code != 200:
+                flight.start(res.status_code, await res.aread())
+                return
+            flight.start(200)
+            async for line in res.aiter_lines():
+                if line.startswith("data:"):
+                    flight.append(line[len("data:"):].strip())
+
+    def _check_rate(self, caller):
+        self.counters["requests"] += 1
+        wait = self._rate_limit(caller)
+        if wait > 0:
+            self.counters["rate_limited"] += 1
+            retry_after = max(1, math.ceil(wait))
+            return JSONResponse({"error": "rate_limited", "retry_after": retry_after}, status_code=429,
+                                headers={"Retry-After": str(retry_after)})
+        return None
+
+    async def run(self, payload, caller):
+        """Handles /run: returns the backend's event list, shared by identical in-flight requests."""
+        start = time.perf_counter()
+        rejected = self._check_rate(caller)
+        if rejected is not None:
+            return rejected
+        flight = self._flight("run", payload, lambda client, flight: self._lead_run(client, flight, payload))
+        await flight.started.wait()
+        self._latencies.append(time.perf_counter() - start)
+        return Response(flight.body, status_code=flight.status, headers=flight.headers,
+                        media_type="application/json")
+
+    async def run_sse(self, payload, caller):
+        """Handles /run_sse: relays the backend's events, shared by identical in-flight requests."""
+        start = time.perf_counter()
+        rejected = self._check_rate(caller)
+        if rejected is not None:
+            return rejected
+        flight = self._flight("run_sse", payload, lambda client, flight: self._lead_run_sse(client, flight, payload))
+        await flight.started.wait()
+        if flight.status != 200:
+            self._latencies.append(time.perf_counter() - start)
+            return Response(flight.body, status_code=flight.status, headers=flight.headers,
+                            media_type="application/json")
+
+        async def relay():
+            try:
+                async for event in flight.stream():
+                    yield f"data: {event}\n\n"
+            finally:
+                self._latencies.append(time.perf_counter() - start)
+
+        return StreamingResponse(relay(), media_type="text/event-stream")
+
+    async def proxy(self, method, path, caller, body=b""):
+        """Forwards a session request to the backend; only rate limited, since it is cheap."""
+        rejected = self._check_rate(caller)
+        if rejected is not None:
+            return rejected
+        try:
+            res = await self.client.request(method, path, content=body or None,
+                                            headers={"Content-Type": "application/json"} if body else None)
+        except httpx.HTTPError as e:
+            self.counters["backend_errors"] += 1
+            return JSONResponse({"error": "backend_unavailable", "detail": str(e)}, status_code=502)
+        return Response(res.content, status_code=res.status_code,
+                        media_type=res.headers.get("content-type"))
+
+    # --- Metrics ---
+
+    def metrics(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else None
+
+        return {
+            **self.counters,
+            "active": self.max_concurrency - len(self._free_slots),
+            "queued": len(self._waiters),
+            "in_flight": len(self._flights),
+            "callers": len(self._buckets),
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_p99": percentile(0.99),
+        }
+
+
+def create_app(gateway):
+    """Returns the FastAPI app exposing the ADK endpoints used by the frontend through `gateway`."""
+    @asynccontextmanager
+    async def lifespan(app):
+        await gateway.start()
+        yield
+        await gateway.close()
+
+    app = FastAPI(title="GemAgent Gateway", lifespan=lifespan)
+
+    def caller(request):
+        return gateway.caller(request.client.host if request.client else None,
+                              request.headers.get("X-Forwarded-For"))
+
+    @app.post("/run")
+    async def run(request: Request):
+        return await gateway.run(await request.json(), caller(request))
+
+    @app.post("/run_sse")
+    async def run_sse(request: Request):
+        return await gateway.run_sse(await request.json(), caller(request))
+
+    @app.api_route("/apps/{app_name}/users/{user_id}/sessions/{session_id}", methods=["GET", "POST", "DELETE"])
+    async def session(app_name: str, user_id: str, session_id: str, request: Request):
+        return await gateway.proxy(request.method, request.url.path, caller(request), await request.body())
+
+    @app.get("/gateway/metrics")
+    async def metrics():
+        return gateway.metrics()
+
+    return app
+
+
+# Load environment variables from .env file
+load_dotenv()
+
+gateway = Gateway(
+    os.getenv("GATEWAY_BACKEND_URL", "http://localhost:8000"),
+    rate=float(os.getenv("GATEWAY_USER_RATE", 2)),
+    burst=int(os.getenv("GATEWAY_USER_BURST", 5)),
+    max_concurrency=int(os.getenv("GATEWAY_MAX_CONCURRENCY", 32)),
+    max_queue=int(os.getenv("GATEWAY_MAX_QUEUE", 256)),
+    queue_timeout=float(os.getenv("GATEWAY_QUEUE_TIMEOUT", 30)),
+    read_timeout=float(os.getenv("GATEWAY_READ_TIMEOUT", 300)),
+    trusted_proxies=[a.strip() for a in os.getenv("GATEWAY_TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if a.strip()],
+)
+app = create_app(gateway)
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import api_client
+from api_client import ApiClient
+
+
+def scripted(monkeypatch, outcomes):
+    """Returns a client whose requests yield `outcomes` in order, and the list of sleeps."""
+    client = ApiClient("http://backend", max_retries=3, backoff=0.5, max_retry_sleep=4.0)
+    calls, sleeps = [], []
+
+    def timed(name, method, url, **kwargs):
+        calls.append(method)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(client, "_timed", timed)
+    monkeypatch.setattr(api_client.time, "sleep", sleeps.append)
+    return client, calls, sleeps
+
+
+def response(status, retry_after=None):
+    return SimpleNamespace(status_code=status, text="", headers={"Retry-After": retry_after} if retry_after else {})
+
+
+def test_retry_after_is_capped(monkeypatch):
+    client, calls, sleeps = scripted(monkeypatch, [response(503, "3600"), response(200)])
+    client.delete_session("app", "user", "s1")
+    assert sleeps == [4.0]
+
+
+def test_create_session_is_not_resent_after_a_read_timeout(monkeypatch):
+    client, calls, sleeps = scripted(monkeypatch, [requests.ReadTimeout(), response(200)])
+    with pytest.raises(requests.ReadTimeout):
+        client.create_session("app", "user", "s1")
+    assert calls == ["POST"]
+
+
+def test_create_session_is_retried_when_it_never_reached_the_server(monkeypatch):
+    client, calls, sleeps = scripted(monkeypatch, [requests.ConnectTimeout(), response(200)])
+    client.create_session("app", "user", "s1")
+    assert calls == ["POST", "POST"]
+    assert sleeps == [0.5]
+
+
+def test_reads_are_retried_after_a_read_timeout(monkeypatch):
+    client, calls, sleeps = scripted(monkeypatch, [requests.ReadTimeout(), response(404)])
+    assert client.get_session("app", "user", "s1") is None
+    assert calls == ["GET", "GET"]
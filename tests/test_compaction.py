@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from google.adk.models.cache_metadata import CacheMetadata
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from allinone.cache import ContentStore
+from allinone.compaction import HistoryCompactor
+
+
+def turn(i, tool_calls=1):
+    """A user question, `tool_calls` large tool outputs and the answer."""
+    contents = [types.Content(role="user", parts=[types.Part(text=f"Question {i}")])]
+    for call in range(tool_calls):
+        contents += [
+            types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                id=f"call{i}.{call}", name="FetchAgent", args={}))]),
+            types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                id=f"call{i}.{call}", name="FetchAgent", response={"result": f"page {i}.{call} " * 500}))]),
+        ]
+    return contents + [types.Content(role="model", parts=[types.Part(text=f"Answer {i}")])]
+
+
+def referenced(contents):
+    return [part.function_response.response.get("reference_id") is not None
+            for content in contents for part in content.parts if part.function_response]
+
+
+def compact(compactor, context, contents, cached=None):
+    request = LlmRequest(contents=list(contents))
+    if cached is not None:
+        request.cache_metadata = CacheMetadata(fingerprint="0" * 16, contents_count=cached)
+    compactor.before_model(context, request)
+    return request.contents
+
+
+def test_evicted_outputs_are_stored_again(tmp_path):
+    store = ContentStore(str(tmp_path))
+    compactor = HistoryCompactor(store, token_budget=100000)
+    context = SimpleNamespace(state={})
+    history = turn(0) + [types.Content(role="user", parts=[types.Part(text="Question 1")])]
+
+    reference_id = compact(compactor, context, history)[2].parts[0].function_response.response["reference_id"]
+    store.delete(reference_id)
+    compact(compactor, context, history)
+    assert store.get(reference_id) is not None
+    assert compactor.references_created == 2
+
+
+def test_outputs_inside_the_cached_prefix_are_kept(tmp_path):
+    compactor = HistoryCompactor(ContentStore(str(tmp_path)), token_budget=100000)
+    context = SimpleNamespace(state={})
+    history = turn(0, tool_calls=2)
+    question = types.Content(role="user", parts=[types.Part(text="Question 1")])
+
+    # The last call of turn 0 cached everything up to its second output, including the first.
+    assert referenced(compact(compactor, context, history + [question], cached=4)) == [False, False]
+    # Without a cache, or once the cache starts after the outputs, they are replaced.
+    assert referenced(compact(compactor, context, history + [question])) == [True, True]
+    assert referenced(compact(compactor, context, history + [question], cached=4)) == [True, True]
+
+
+def test_outputs_past_the_cached_prefix_are_replaced(tmp_path):
+    compactor = HistoryCompactor(ContentStore(str(tmp_path)), token_budget=100000)
+    context = SimpleNamespace(state={})
+    question = types.Content(role="user", parts=[types.Part(text="Question 1")])
+
+    # With one tool call per turn, the cache ends before the output, so it can be replaced.
+    assert referenced(compact(compactor, context, turn(0) + [question], cached=2)) == [True]
+
+
+def test_cached_outputs_are_replaced_over_budget(tmp_path):
+    compactor = HistoryCompactor(ContentStore(str(tmp_path)), token_budget=1500, keep_turns=1)
+    context = SimpleNamespace(state={})
+    history = turn(0, tool_calls=2) + turn(1, tool_calls=2)
+    question = types.Content(role="user", parts=[types.Part(text="Question 2")])
+
+    assert referenced(compact(compactor, context, history + [question], cached=len(history) - 1)) == [True] * 4
@@ -0,0 +1,26 @@
+import asyncio
+
+from fastmcp import Client
+
+from allinone.mcp.dice_engine import roll
+from allinone.mcp.dice_roller import mcp
+
+
+def call(tool, arguments):
+    async def run():
+        async with Client(mcp) as client:
+            return (await client.call_tool(tool, arguments)).structured_content
+
+    return asyncio.run(run())
+
+
+def test_roll_returns_the_seed_that_repeats_it():
+    first = roll(5, 20)
+    assert len(first["dice"]) == 5 and all(1 <= face <= 20 for face in first["dice"])
+    assert roll(5, 20, seed=first["seed"]) == first
+
+
+def test_tools_report_their_seed():
+    dice = call("roll_dice", {"n_dice": 3, "seed": 7})
+    assert dice == {"dice": roll(3, seed=7)["dice"], "seed": 7}
+    assert call("roll_notation", {"notation": "3d6", "seed": 7})["seed"] == 7
@@ -0,0 +1,132 @@
+import time
+
+from allinone.file_index import FileIndex
+
+
+def write(root, name, text):
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def paths(results):
+    return [result["path"] for result in results]
+
+
+def counts(changes):
+    return changes["added"], changes["updated"], changes["removed"]
+
+
+def test_changes_are_reindexed_and_bump_the_generation(tmp_path):
+    notes = write(tmp_path, "notes.txt", "budget meeting on monday\n")
+    write(tmp_path, "other.txt", "nothing to see\n")
+    index = FileIndex(str(tmp_path))
+    assert not index.ready
+    assert index.refresh()["added"] == 2
+    assert index.ready
+    generation = index.generation
+
+    assert counts(index.refresh()) == (0, 0, 0)
+    assert index.generation == generation
+
+    write(tmp_path, "notes.txt", "invoice review on tuesday afternoon\n")
+    assert index.refresh()["updated"] == 1
+    assert index.generation == generation + 1
+    assert index.search("budget") == []
+    assert paths(index.search("invoice")) == [notes]
+
+    added = write(tmp_path, "sub/plan.md", "budget plan\n")
+    assert index.refresh()["added"] == 1
+    assert index.generation == generation + 2
+    assert paths(index.search("budget")) == [added]
+
+    (tmp_path / "sub" / "plan.md").unlink()
+    assert index.refresh()["removed"] == 1
+    assert index.generation == generation + 3
+    assert index.search("budget") == []
+    assert index.stats()["files"] == 2
+
+
+def test_skipped_directories_and_binary_files_are_not_searched(tmp_path):
+    write(tmp_path, "node_modules/lib.js", "needle\n")
+    write(tmp_path, ".hidden/notes.txt", "needle\n")
+    (tmp_path / "data.bin").write_bytes(b"\0needle")
+    index = FileIndex(str(tmp_path))
+    index.refresh()
+    assert index.search("needle") == []
+    # Binary files are still found by name.
+    assert paths(index.search("data")) == [str(tmp_path / "data.bin")]
+
+
+def test_results_are_ranked_by_bm25(tmp_path):
+    many = write(tmp_path, "many.txt", "cache cache cache\nlatency\n")
+    once = write(tmp_path, "once.txt", "cache\n" + "filler words " * 50)
+    both = write(tmp_path, "both.txt", "cache latency report\n")
+    for i in range(5):
+        write(tmp_path, f"filler{i}.txt", "unrelated text\n")
+    index = FileIndex(str(tmp_path))
+    index.refresh()
+
+    assert paths(index.search("cache")) == [many, both, once]
+    # Matching both terms beats repeating one of them.
+    assert paths(index.search("cache report"))[0] == both
+    assert paths(index.search("cache", max_results=2)) == [many, both]
+    scores = [result["score"] for result in index.search("cache")]
+    assert scores == sorted(scores, reverse=True)
+    # The file name counts too.
+    assert paths(index.search("once")) == [once]
+
+
+def test_snippets_hold_the_matching_lines(tmp_path):
+    path = write(tmp_path, "log.txt", "start\nThe Budget was approved.\nidle\nbudget review\nbudget again\n")
+    index = FileIndex(str(tmp_path))
+    index.refresh()
+
+    [result] = index.search("budget", max_snippets=2)
+    assert result["path"] == path
+    assert result["snippets"] == [{"line": 2, "text": "The Budget was approved."},
+                                  {"line": 4, "text": "budget review"}]
+
+
+def test_a_snapshot_only_reindexes_what_changed_meanwhile(tmp_path):
+    root, snapshots = tmp_path / "root", str(tmp_path / "snapshots")
+    kept = write(root, "kept.txt", "quarterly report\n")
+    write(root, "changed.txt", "draft agenda\n")
+    write(root, "removed.txt", "old notes\n")
+    index = FileIndex(str(root), snapshot_dir=snapshots)
+    index.refresh()
+    index.save()
+
+    write(root, "changed.txt", "final agenda with minutes\n")
+    (root / "removed.txt").unlink()
+    write(root, "new.txt", "fresh notes\n")
+
+    restarted = FileIndex(str(root), snapshot_dir=snapshots)
+    assert restarted.load()
+    assert paths(restarted.search("quarterly")) == [kept]
+    assert counts(restarted.refresh()) == (1, 1, 1)
+    assert restarted.search("old") == [] and restarted.search("minutes") and restarted.search("fresh")
+    # A snapshot of another root, or with another size limit, is ignored.
+    assert not FileIndex(str(tmp_path), snapshot_dir=snapshots).load()
+    assert not FileIndex(str(root), snapshot_dir=snapshots, max_file_bytes=10).load()
+
+
+def test_the_background_thread_builds_and_refreshes_the_index(tmp_path):
+    write(tmp_path, "a.txt", "alpha\n")
+    index = FileIndex(str(tmp_path), refresh_interval=0.05, snapshot_dir=str(tmp_path / ".snapshots"))
+    index.start()
+    try:
+        assert index.wait_ready(5)
+        assert len(index.search("alpha")) == 1
+        generation = index.generation
+        write(tmp_path, "b.txt", "beta\n")
+        for _ in range(100):
+            if index.search("beta"):
+                break
+            time.sleep(0.05)
+        assert index.generation > generation
+    finally:
+        index.stop()
+    # The background thread saved the index.
+    assert FileIndex(str(tmp_path), snapshot_dir=str(tmp_path / ".snapshots")).load()
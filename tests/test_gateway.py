@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+from gateway import Gateway, create_app
+
+SESSION = "/apps/allinone/users/{}/sessions/s1"
+
+
+def client(trusted_proxies=("testclient",)):
+    # Nothing listens on the discard port, so requests that pass the limit get a 502.
+    gateway = Gateway("http://127.0.0.1:9", rate=0.001, burst=2, trusted_proxies=trusted_proxies)
+    return TestClient(create_app(gateway))
+
+
+def statuses(test_client, users, headers=None):
+    return [test_client.get(SESSION.format(user), headers=headers).status_code for user in users]
+
+
+def test_changing_the_user_id_does_not_reset_the_limit():
+    with client(trusted_proxies=()) as test_client:
+        assert statuses(test_client, ["a", "b", "c", "d"]) == [502, 502, 429, 429]
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers():
+    with client(trusted_proxies=()) as test_client:
+        assert statuses(test_client, ["a", "a"], {"X-Forwarded-For": "10.0.0.1"}) == [502, 502]
+        assert statuses(test_client, ["a"], {"X-Forwarded-For": "10.0.0.2"}) == [429]
+
+
+def test_trusted_proxy_forwards_each_callers_address():
+    with client() as test_client:
+        assert statuses(test_client, ["a", "a", "a"], {"X-Forwarded-For": "10.0.0.1"}) == [502, 502, 429]
+        assert statuses(test_client, ["a"], {"X-Forwarded-For": "10.0.0.2"}) == [502]
+        # A spoofed entry prepended by the caller is skipped; the proxy appends the real one.
+        assert statuses(test_client, ["a"], {"X-Forwarded-For": "10.0.0.2, 10.0.0.1"}) == [429]
+        assert test_client.get("/gateway/metrics").json()["callers"] == 2
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from allinone.mcp_pool import MCPServerPool, stdio_server
+
+# A stdio MCP server whose `whoami` tool returns its process ID. Listing its tools hangs
+# once a file named after that process ID exists in the directory given as argument.
+STUB_SERVER = """
+import asyncio
+import os
+import sys
+
+from fastmcp import FastMCP
+from fastmcp.server.middleware import Middleware
+
+mcp = FastMCP(name="Stub")
+
+
+@mcp.tool
+def whoami() -> str:
+    \"\"\"Returns the process ID.\"\"\"
+    return str(os.getpid())
+
+
+class HangWhenAsked(Middleware):
+    async def on_list_tools(self, context, call_next):
+        if os.path.exists(os.path.join(sys.argv[1], f"hang-{os.getpid()}")):
+            await asyncio.sleep(3600)
+        return await call_next(context)
+
+
+mcp.add_middleware(HangWhenAsked())
+mcp.run(show_banner=False)
+"""
+
+
+@pytest.fixture
+def pool(tmp_path):
+    script = tmp_path / "stub_server.py"
+    script.write_text(STUB_SERVER, encoding="utf-8")
+    return MCPServerPool("stub", stdio_server(sys.executable, [str(script), str(tmp_path)]), size=2,
+                         health_check_timeout=3)
+
+
+async def whoami(pool) -> int:
+    [tool] = await pool.get_tools()
+    result = await tool.run_async(args={}, tool_context=None)
+    return int(result["content"][0]["text"])
+
+
+def alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_calls_are_spread_round_robin_over_the_replicas(pool):
+    async def run():
+        await pool.start()
+        try:
+            return [await whoami(pool) for _ in range(4)]
+        finally:
+            await pool.shutdown()
+
+    pids = asyncio.run(run())
+    assert pids[0] != pids[1]
+    assert pids == pids[:2] * 2
+    metrics = pool.metrics()
+    assert metrics["replicas"] == 2
+    assert metrics["startup_latency"] > 0 and metrics["first_call_latency"] > 0
+
+
+def test_tools_are_listed_without_an_explicit_start(pool):
+    async def run():
+        try:
+            return await whoami(pool)
+        finally:
+            await pool.shutdown()
+
+    assert asyncio.run(run()) > 0
+    assert pool.metrics()["startup_latency"] is None
+
+
+def test_hung_replicas_are_restarted_by_the_health_check(pool, tmp_path):
+    async def run():
+        await pool.start()
+        try:
+            hung, healthy = await whoami(pool), await whoami(pool)
+            (tmp_path / f"hang-{hung}").touch()
+            await pool.health_check()
+            return hung, healthy, [await whoami(pool) for _ in range(2)]
+        finally:
+            await pool.shutdown()
+
+    hung, healthy, pids = asyncio.run(run())
+    assert pool.restarts == 1
+    assert hung not in pids and healthy in pids
+    assert len(set(pids)) == 2
+
+
+def test_shutdown_stops_every_server(pool):
+    async def run():
+        await pool.start()
+        pids = {await whoami(pool) for _ in range(2)}
+        await pool.shutdown()
+        return pids
+
+    pids = asyncio.run(run())
+    assert len(pids) == 2
+    deadline = time.monotonic() + 5
+    while any(alive(pid) for pid in pids) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(alive(pid) for pid in pids)
@@ -0,0 +1,155 @@
+import asyncio
+import math
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from allinone.model_tiers import ModelTierPolicy
+
+CONTEXT = SimpleNamespace(invocation_id="i1", agent_name="Agent")
+
+
+def stub_factory(answers):
+    """Returns an `llm_factory` whose models answer with `answers[model]`, and the requests they got."""
+    requests = []
+
+    class StubLlm:
+        def __init__(self, model):
+            self.model = model
+
+        async def generate_content_async(self, llm_request, stream=False):
+            requests.append(llm_request)
+            answer = answers[self.model]
+            if isinstance(answer, Exception):
+                raise answer
+            yield answer
+
+    return StubLlm, requests
+
+
+def response(text, confidence=None, prompt_tokens=10, output_tokens=5):
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+        avg_logprobs=math.log(confidence) if confidence else None,
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens, candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens),
+    )
+
+
+def request():
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text="Question")])])
+
+
+def call(policy, llm_response):
+    """Runs one model call answered by the cheapest tier with `llm_response`; returns the request."""
+    llm_request = request()
+    policy.before_model(CONTEXT, llm_request)
+    asyncio.run(policy.after_model(CONTEXT, llm_response))
+    return llm_request
+
+
+def text(llm_response):
+    return llm_response.content.parts[0].text
+
+
+def test_low_confidence_answers_are_replaced_in_place():
+    factory, requests = stub_factory({"strong": response("sure answer", prompt_tokens=12, output_tokens=7)})
+    policy = ModelTierPolicy(["cheap", "strong"], min_confidence=0.5, llm_factory=factory)
+
+    cheap = response("maybe", confidence=0.2)
+    llm_request = call(policy, cheap)
+    # The object the other callbacks hold now carries the strong tier's answer.
+    assert text(cheap) == "sure answer" and cheap.avg_logprobs is None
+    assert [r.model for r in requests] == ["strong"]
+    assert llm_request.model == "cheap" and requests[0] is not llm_request
+    assert policy.stats()["escalations"]["low_confidence"] == 1
+
+    # The rest of the turn stays on the strong tier.
+    next_request = request()
+    policy.before_model(CONTEXT, next_request)
+    assert next_request.model == "strong"
+
+
+def test_confident_answers_are_not_escalated():
+    factory, requests = stub_factory({})
+    policy = ModelTierPolicy(["cheap", "strong"], min_confidence=0.5, llm_factory=factory)
+
+    confident = response("answer", confidence=0.9)
+    call(policy, confident)
+    # Responses without log-probabilities are not checked.
+    call(policy, response("answer"))
+    assert text(confident) == "answer"
+    assert requests == []
+    assert policy.stats()["escalations"] == {"low_confidence": 0, "model_failure": 0, "tool_failure": 0}
+
+
+def test_exceptions_are_answered_by_the_next_tier():
+    factory, requests = stub_factory({"strong": response("recovered")})
+    policy = ModelTierPolicy(["cheap", "strong"], llm_factory=factory)
+
+    llm_request = request()
+    policy.before_model(CONTEXT, llm_request)
+    answer = asyncio.run(policy.on_model_error(CONTEXT, llm_request, RuntimeError("quota exceeded")))
+    assert text(answer) == "recovered" and answer.error_code is None
+    assert policy.stats()["escalations"]["model_failure"] == 1
+
+    # On the last tier the error is left to ADK, which re-raises it.
+    policy.before_model(CONTEXT, request())
+    assert asyncio.run(policy.on_model_error(CONTEXT, llm_request, RuntimeError("quota exceeded"))) is None
+
+
+def test_failures_escalate_through_every_tier():
+    factory, requests = stub_factory({
+        "middle": LlmResponse(error_code="UNAVAILABLE", error_message="overloaded"),
+        "strong": response("final"),
+    })
+    policy = ModelTierPolicy(["cheap", "middle", "strong"], llm_factory=factory)
+
+    # A call to a tool the agent does not have is a model failure.
+    cheap = LlmResponse(content=types.Content(role="model", parts=[
+        types.Part(function_call=types.FunctionCall(name="missing_tool", args={}))]))
+    call(policy, cheap)
+    assert text(cheap) == "final" and cheap.error_code is None
+    assert [r.model for r in requests] == ["middle", "strong"]
+    assert policy.stats()["escalations"]["model_failure"] == 2
+
+
+def test_failed_escalations_keep_the_cheap_answer():
+    factory, requests = stub_factory({"strong": RuntimeError("offline")})
+    policy = ModelTierPolicy(["cheap", "strong"], llm_factory=factory)
+
+    cheap = response("maybe", confidence=0.2)
+    call(policy, cheap)
+    assert text(cheap) == "maybe"
+
+
+def test_tool_failures_move_the_rest_of_the_turn_up():
+    policy = ModelTierPolicy(["cheap", "strong"], llm_factory=stub_factory({})[0])
+    tool_context = SimpleNamespace(invocation_id="i1", agent_name="Agent")
+
+    policy.after_tool(None, {}, tool_context, {"status": "ok"})
+    llm_request = request()
+    policy.before_model(CONTEXT, llm_request)
+    assert llm_request.model == "cheap"
+
+    policy.after_tool(None, {}, tool_context, {"results": [{"status": "timeout", "error": "slow"}]})
+    policy.before_model(CONTEXT, llm_request)
+    assert llm_request.model == "strong"
+    assert policy.stats()["escalations"]["tool_failure"] == 1
+
+
+def test_usage_and_latency_are_counted_per_tier():
+    factory, requests = stub_factory({"strong": response("sure", prompt_tokens=40, output_tokens=20)})
+    policy = ModelTierPolicy(["cheap", "strong"], llm_factory=factory)
+
+    call(policy, response("answer", confidence=0.9, prompt_tokens=10, output_tokens=5))
+    call(policy, response("maybe", confidence=0.1, prompt_tokens=11, output_tokens=6))
+    tiers = policy.stats()["tiers"]
+    assert {key: tiers["cheap"][key] for key in ("calls", "prompt_tokens", "output_tokens")} == \
+        {"calls": 2, "prompt_tokens": 21, "output_tokens": 11}
+    assert {key: tiers["strong"][key] for key in ("calls", "prompt_tokens", "output_tokens")} == \
+        {"calls": 1, "prompt_tokens": 40, "output_tokens": 20}
+    assert tiers["cheap"]["latency_p50"] is not None and tiers["strong"]["latency_p95"] is not None
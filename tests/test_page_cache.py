@@ -0,0 +1,195 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from allinone.cache import ContentStore
+from allinone.page_cache import PageCache, normalize_url
+
+
+class Site:
+    """Serves `pages` ({path: body}) with an ETag, answering matching conditional requests with 304."""
+
+    def __init__(self):
+        self.pages = {}
+        self.robots = None
+        self.status = None
+        self.cache_control = None
+        self.requests = []
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests.append(self.path)
+                if self.path == "/robots.txt":
+                    if site.robots is None:
+                        self.send_error(404)
+                    else:
+                        self._send(200, site.robots.encode(), "text/plain")
+                    return
+                if site.status:
+                    self.send_error(site.status)
+                    return
+                body = site.pages[self.path].encode()
+                etag = f'"{hash(body)}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self._send(200, body, "text/html; charset=utf-8", {"ETag": etag})
+
+            def _send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if site.cache_control:
+                    self.send_header("Cache-Control", site.cache_control)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def site():
+    site = Site()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), site.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site.url = f"http://127.0.0.1:{server.server_port}"
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+def page(title, text):
+    return f"<html><head><title>{title}</title></head><body><p>{text}</p></body></html>"
+
+
+def fetch(cache, url, **kwargs):
+    return asyncio.run(cache.fetch(url, **kwargs))
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80/a?b=2&a=1&utm_source=x&fbclid=y#top") == "http://example.com/a?a=1&b=2"
+    assert normalize_url("https://example.com:443") == "https://example.com/"
+    assert normalize_url("https://example.com:8443/a?q=") == "https://example.com:8443/a?q="
+
+
+def test_unchanged_pages_are_revalidated_with_a_304(site, tmp_path):
+    site.pages["/a"] = page("A", "first")
+    cache = PageCache(ContentStore(str(tmp_path)), max_age=0)
+
+    assert fetch(cache, site.url + "/a")["cache"] == "miss"
+    result = fetch(cache, site.url + "/a?utm_source=mail")
+    assert (result["cache"], result["title"]) == ("revalidated", "A")
+    site.pages["/a"] = page("A", "second")
+    result = fetch(cache, site.url + "/a")
+    assert result["cache"] == "miss" and "second" in result["content"]
+    assert cache.stats()["revalidated"] == 1
+
+
+def test_fresh_entries_are_served_without_a_request(site, tmp_path):
+    site.pages["/a"] = page("A", "first")
+    cache = PageCache(ContentStore(str(tmp_path)), max_age=300)
+
+    fetch(cache, site.url + "/a")
+    requests = len(site.requests)
+    assert fetch(cache, site.url + "/a")["cache"] == "hit"
+    assert len(site.requests) == requests
+
+
+def test_no_store_pages_are_not_cached(site, tmp_path):
+    site.pages["/a"] = page("A", "private")
+    site.cache_control = "private, no-store"
+    cache = PageCache(ContentStore(str(tmp_path)), max_age=300)
+
+    assert fetch(cache, site.url + "/a")["cache"] == "miss"
+    assert fetch(cache, site.url + "/a")["cache"] == "miss"
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_stale_copies_are_served_on_server_errors(site, tmp_path, status):
+    site.pages["/a"] = page("A", "cached")
+    cache = PageCache(ContentStore(str(tmp_path)), max_age=0)
+    fetch(cache, site.url + "/a")
+
+    site.status = status
+    result = fetch(cache, site.url + "/a")
+    assert result["cache"] == "stale" and "cached" in result["content"]
+    assert f"HTTP {status}" in result["note"]
+    # Without a cached copy the error is returned.
+    assert "HTTPError" in fetch(cache, site.url + "/b")["error"]
+
+
+def test_client_errors_are_not_hidden_by_stale_copies(site, tmp_path):
+    site.pages["/a"] = page("A", "cached")
+    cache = PageCache(ContentStore(str(tmp_path)), max_age=0)
+    fetch(cache, site.url + "/a")
+
+    site.status = 404
+    assert "404" in fetch(cache, site.url + "/a")["error"]
+
+
+def test_stale_copies_are_served_when_the_server_is_gone(tmp_path):
+    site = Site()
+    site.pages["/a"] = page("A", "cached")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), site.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/a"
+    cache = PageCache(ContentStore(str(tmp_path)), max_age=0, timeout=2)
+    fetch(cache, url)
+    server.shutdown()
+    server.server_close()
+
+    assert fetch(cache, url)["cache"] == "stale"
+
+
+def test_long_pages_are_read_in_parts(site, tmp_path):
+    site.pages["/long"] = page("Long", "x" * 250)
+    cache = PageCache(ContentStore(str(tmp_path)))
+
+    first = fetch(cache, site.url + "/long", max_length=100)
+    assert (first["start_index"], first["next_start_index"]) == (0, 100)
+    parts = [first["content"]]
+    while first["next_start_index"] is not None:
+        first = fetch(cache, site.url + "/long", start_index=first["next_start_index"], max_length=100)
+        parts.append(first["content"])
+    assert "".join(parts) == fetch(cache, site.url + "/long", max_length=10000)["content"]
+    assert len(parts) == -(-first["total_length"] // 100)
+    # Only the first read downloaded the page.
+    assert site.requests.count("/long") == 1
+
+
+def test_truncated_downloads_are_marked(site, tmp_path):
+    site.pages["/big"] = page("Big", "y" * 2000)
+    site.pages["/small"] = page("Small", "z")
+    cache = PageCache(ContentStore(str(tmp_path)), max_download_bytes=1000)
+
+    result = fetch(cache, site.url + "/big")
+    assert result["truncated"] is True and "cut off after 1000 bytes" in result["note"]
+    assert fetch(cache, site.url + "/big")["truncated"] is True
+    assert fetch(cache, site.url + "/small")["truncated"] is False
+
+
+def test_robots_txt_is_respected(site, tmp_path):
+    site.pages["/private/a"] = page("Private", "secret")
+    site.pages["/public/a"] = page("Public", "open")
+    site.robots = "User-agent: GemAgent\nDisallow: /private/\n"
+    cache = PageCache(ContentStore(str(tmp_path)))
+
+    assert "RobotsDisallowed" in fetch(cache, site.url + "/private/a")["error"]
+    assert fetch(cache, site.url + "/public/a")["cache"] == "miss"
+    assert "/private/a" not in site.requests
+    # The rules are fetched once per site.
+    assert site.requests.count("/robots.txt") == 1
+
+    ignoring = PageCache(ContentStore(str(tmp_path / "ignoring")), respect_robots=False)
+    assert fetch(ignoring, site.url + "/private/a")["cache"] == "miss"
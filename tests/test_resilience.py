@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.tools.base_tool import BaseTool
+
+from allinone.lazy import LazyAgentTool
+from allinone.resilience import CircuitBreaker, ResilienceLayer, is_idempotent, parse_timeouts
+from benchmarks import faults
+
+
+class FlakyTool(BaseTool):
+    """Fails with a connection error `failures` times, then answers."""
+
+    def __init__(self, failures, name="flaky"):
+        super().__init__(name=name, description="A flaky stub.")
+        self.failures = failures
+        self.calls = 0
+
+    async def run_async(self, *, args, tool_context):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("connection reset")
+        return {"result": "ok"}
+
+
+def layer():
+    return ResilienceLayer(min_timeout=0.05, max_timeout=1.0, max_retries=2, backoff=0.01)
+
+
+def call(tool):
+    return asyncio.run(tool.run_async(args={}, tool_context=None))
+
+
+def test_idempotent_tools_are_retried():
+    stub = FlakyTool(failures=1)
+    assert call(layer().wrap(stub, idempotent=True)) == {"result": "ok"}
+    assert stub.calls == 2
+
+
+def test_other_tools_are_not_retried():
+    stub = FlakyTool(failures=1)
+    result = call(layer().wrap(stub))
+    assert result["status"] == "error" and result["attempts"] == 1
+    assert stub.calls == 1
+
+
+def test_agent_tools_are_never_retried():
+    stub = FlakyTool(failures=1)
+    agent_tool = LazyAgentTool("StubAgent", "A stub agent.", factory=None)
+    agent_tool._agent_tool = stub  # Already built; runs go straight to the stub.
+    result = call(layer().wrap(agent_tool, idempotent=True))
+    assert result["status"] == "error"
+    assert stub.calls == 1
+
+
+def test_timed_out_writes_are_reported_as_possibly_completed():
+    class SlowTool(BaseTool):
+        async def run_async(self, *, args, tool_context):
+            await asyncio.sleep(2)
+
+    resilience = ResilienceLayer(min_timeout=0.05, max_timeout=0.2)
+    result = call(resilience.wrap(SlowTool(name="write_file", description="Writes a file.")))
+    assert result["status"] == "timeout"
+    assert result["retryable"] is False and "may still have completed" in result["error"]
+
+
+def test_mcp_annotations_mark_idempotent_tools():
+    def mcp_tool(**hints):
+        return SimpleNamespace(raw_mcp_tool=SimpleNamespace(annotations=SimpleNamespace(**hints)))
+
+    assert is_idempotent(mcp_tool(read_only_hint=True))
+    assert is_idempotent(mcp_tool(idempotent_hint=True))
+    assert not is_idempotent(mcp_tool(read_only_hint=False, destructive_hint=True))
+    assert not is_idempotent(SimpleNamespace(raw_mcp_tool=SimpleNamespace(annotations=None)))
+
+
+def test_only_the_probe_closes_an_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    # A call that started before the breaker opened reports back late.
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_fault_injection_keeps_healthy_tools_fast():
+    """A short run of benchmarks.faults: one backend degrades, hangs and recovers."""
+    args = argparse.Namespace(clients=8, phase_seconds=1.5, latency=0.02, think_time=0.02, slow_seconds=1.0,
+                              hang_seconds=3.0, min_timeout=0.1, max_timeout=0.5, reset_timeout=0.5)
+    summary = asyncio.run(faults.run("guarded", args))
+
+    for phase in faults.PHASES:
+        for backend in ("search", "fetch"):
+            assert summary[phase][backend]["status"] == {"ok": summary[phase][backend]["calls"]}
+            assert summary[phase][backend]["p99_ms"] < 300
+    for phase in ("degraded", "down"):
+        assert summary[phase]["youtube"]["max_ms"] < (args.max_timeout + 0.3) * 1000
+    down = summary["down"]["youtube"]["status"]
+    assert set(down) <= {"unavailable", "timeout"}
+    assert down["unavailable"] > down.get("timeout", 0)
+    assert summary["recovered"]["youtube"]["status"].get("ok")
+    assert summary["youtube_breaker"][-1][1] == CircuitBreaker.CLOSED
+
+
+def test_parse_timeouts():
+    assert parse_timeouts("") == {}
+    assert parse_timeouts("FetchAgent=60, fetch_url = 15,bad") == {"FetchAgent": 60.0, "fetch_url": 15.0}
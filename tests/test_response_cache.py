@@ -0,0 +1,68 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+from google.genai import types
+
+from allinone.response_cache import ResponseCache
+
+_invocations = itertools.count()
+
+
+def new_session(user_id="alice", app_name="allinone"):
+    return SimpleNamespace(app_name=app_name, user_id=user_id, state={})
+
+
+def ask(cache, session, text, answer, agent=None):
+    """Runs one turn through the cache callbacks; returns the cached answer or None."""
+    context = SimpleNamespace(
+        invocation_id=f"inv-{next(_invocations)}",
+        user_content=types.Content(role="user", parts=[types.Part(text=text)]),
+        state=session.state,
+        session=session,
+        user_id=session.user_id,
+    )
+    served = asyncio.run(cache.before_agent(context))
+    if served is not None:
+        return served.parts[0].text
+    if agent:
+        cache.after_tool(SimpleNamespace(name=agent), {}, context, {"result": "ok"})
+    response = types.Content(role="model", parts=[types.Part(text=answer)])
+    cache.after_model(context, SimpleNamespace(partial=False, content=response))
+    asyncio.run(cache.after_agent(context))
+    return None
+
+
+def test_first_turn_is_served_to_a_new_session_of_the_same_user():
+    cache = ResponseCache()
+    ask(cache, new_session(), "Who wrote the novel War and Peace?", "Tolstoy", agent="SearchAgent")
+    assert ask(cache, new_session(), "who wrote the novel war and peace", "-", agent="SearchAgent") == "Tolstoy"
+
+
+def test_entries_are_not_shared_between_users():
+    cache = ResponseCache()
+    ask(cache, new_session("alice"), "Who wrote the novel War and Peace?", "Tolstoy", agent="SearchAgent")
+    assert ask(cache, new_session("bob"), "Who wrote the novel War and Peace?", "-", agent="SearchAgent") is None
+
+
+def test_follow_up_depends_on_earlier_turns():
+    cache = ResponseCache()
+    first = new_session()
+    ask(cache, first, "Summarize the plot of Hamlet in two sentences", "Hamlet summary", agent="SearchAgent")
+    ask(cache, first, "Can you translate that into Korean please", "햄릿 요약", agent="SearchAgent")
+
+    other = new_session()
+    ask(cache, other, "Summarize the plot of Macbeth in two sentences", "Macbeth summary", agent="SearchAgent")
+    assert ask(cache, other, "Can you translate that into Korean please", "맥베스 요약", agent="SearchAgent") is None
+
+    same = new_session()
+    assert ask(cache, same, "Summarize the plot of Hamlet in two sentences", "-") == "Hamlet summary"
+    assert ask(cache, same, "Can you translate that into Korean please", "-") == "햄릿 요약"
+
+
+def test_follow_ups_without_a_sub_agent_are_not_stored():
+    cache = ResponseCache()
+    session = new_session()
+    ask(cache, session, "Tell me a fun fact about octopuses", "They have three hearts")
+    ask(cache, session, "Can you translate that into Korean please", "세 개의 심장")
+    assert cache.stats()["entries"] == 1
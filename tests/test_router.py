@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+from allinone.router import EVALUATION_CORPUS, FastPathRouter, evaluate, route_message
+
+
+def test_corpus_is_routed_without_errors():
+    result = evaluate()
+    assert result["errors"] == []
+
+
+@pytest.mark.parametrize("message", [
+    "오늘 날짜 기준으로 3일 후는?",
+    "지금 시간 있어?",
+    "주사위 굴려서 나온 숫자만큼 농담해줘",
+    "roll 2 dice and add 5",
+    "https://youtu.be/dQw4w9WgXcQ",
+])
+def test_requests_beyond_the_tool_go_to_the_model(message):
+    assert (message, None) in EVALUATION_CORPUS
+    route = route_message(message)
+    assert route.intent is None or route.confidence < 0.8
+
+
+def test_korean_number_words_set_the_dice_count():
+    assert route_message("주사위 두 개 굴려 줘").args == {"n_dice": 2}
+
+
+def test_handlers_run_off_the_event_loop():
+    threads = []
+
+    def answer(route):
+        threads.append(threading.current_thread())
+        return "12:00"
+
+    router = FastPathRouter({"datetime": answer})
+    request = SimpleNamespace(contents=[types.Content(role="user", parts=[types.Part(text="What time is it?")])])
+    response = asyncio.run(router.before_model(None, request))
+    assert response.content.parts[0].text == "12:00"
+    assert threads[0] is not threading.main_thread()
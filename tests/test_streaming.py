@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from api_client import ApiClient
+from event_view import final_text_from_events, stream_text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A turn as /run_sse sends it: partial text, a tool call and its result, more partial
+# text, and the final event repeating the whole answer.
+EVENTS = [
+    {"partial": True, "content": {"parts": [{"text": "Let me "}]}},
+    {"partial": True, "content": {"parts": [{"text": "check. "}]}},
+    {"content": {"parts": [{"functionCall": {"name": "SearchAgent", "args": {}}}]}},
+    {"content": {"parts": [{"functionResponse": {"name": "SearchAgent", "response": {}}}]}},
+    {"partial": True, "content": {"parts": [{"text": "It is "}]}},
+    {"partial": True, "content": {"parts": [{"text": "sunny."}]}},
+    {"content": {"parts": [{"text": "It is sunny."}]}},
+]
+
+# Seconds between two events of the stub server.
+EVENT_DELAY = 0.1
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def sse_server():
+    """Serves the session endpoints and /run_sse of the ADK API server with EVENTS."""
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+
+    @app.get("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+    @app.post("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+    async def session(app_name: str, user_id: str, session_id: str):
+        return {"id": session_id, "appName": app_name, "userId": user_id, "state": {}, "events": []}
+
+    @app.post("/run_sse")
+    async def run_sse():
+        async def events():
+            for event in EVENTS:
+                yield f"data: {json.dumps(event)}\n\n"
+                await asyncio.sleep(EVENT_DELAY)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+
+
+def test_partial_text_is_streamed_once_with_tool_progress():
+    events = []
+    chunks = list(stream_text(iter(EVENTS), events))
+    text = "".join(chunks)
+    assert chunks[:2] == ["Let me ", "check. "]
+    assert "Calling `SearchAgent`" in text and "`SearchAgent` finished" in text
+    # The final event repeats the partials and is not rendered a second time.
+    assert text.count("It is sunny.") == 1
+    assert events == EVENTS
+
+
+def test_final_event_without_partials_is_rendered():
+    final = {"content": {"parts": [{"text": "Done."}]}}
+    assert "".join(stream_text(iter([final]), [])) == "Done."
+
+
+def test_error_events_are_rendered():
+    assert "**Error:** quota exceeded" in "".join(stream_text(iter([{"error": "quota exceeded"}]), []))
+
+
+def test_final_text_skips_partial_events():
+    assert final_text_from_events(EVENTS + [{"partial": True, "content": {"parts": [{"text": "x"}]}}]) == \
+        "It is sunny."
+    assert final_text_from_events([]) == ""
+
+
+def test_text_arrives_before_the_stream_ends(sse_server):
+    client = ApiClient(sse_server)
+    start = time.perf_counter()
+    arrivals = []
+    for _ in stream_text(client.run_sse({"new_message": {}}), []):
+        arrivals.append(time.perf_counter() - start)
+    total = time.perf_counter() - start
+    assert arrivals[0] < total - (len(EVENTS) - 2) * EVENT_DELAY
+    assert "run_sse.first_event" in client.metrics()
+
+
+def test_frontend_renders_the_streamed_answer(sse_server, tmp_path, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.setenv("ADK_API_URL", sse_server)
+    monkeypatch.setenv("GEMAGENT_CACHE_DIR", str(tmp_path))
+    app_test = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    app_test.run()
+    app_test.chat_input[0].set_value("What's the weather?").run()
+
+    assert not app_test.error
+    assistant = app_test.chat_message[-1]
+    assert assistant.name == "assistant"
+    rendered = "".join(markdown.value for markdown in assistant.markdown)
+    assert rendered.count("It is sunny.") == 1
+    assert "Calling `SearchAgent`" in rendered
+
+    from chat_store import ChatStore, default_chat_store_path
+    store = ChatStore(default_chat_store_path())
+    messages = store.recent(app_test.session_state["session_id"])
+    store.close()
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[-1]["content"] == "It is sunny."
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import threading
+from types import SimpleNamespace
+
+from google.genai import types
+
+from allinone.cache import ContentStore
+from allinone.summarize import CONDENSED_HEADER, MapReduceSummarizer, chunk_text, estimate_tokens
+
+
+class StubModel:
+    """Stands in for the Gemini client: answers every prompt with a short digest of it."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        return f"Summary {hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}."
+
+
+def document(paragraphs=120, edited=None):
+    """A long document of numbered paragraphs; `edited` changes one of them."""
+    return "\n\n".join(
+        f"Paragraph {i} {'was edited and ' if i == edited else ''}talks about topic {i} in some detail. " * 6
+        for i in range(paragraphs)
+    )
+
+
+def summarizer(model, store=None, name="stub-model"):
+    return MapReduceSummarizer(model.generate, store=store, model=name, max_chunk_tokens=400,
+                               threshold_tokens=1000, fan_in=4)
+
+
+def test_chunks_stay_within_the_token_bound():
+    chunks = chunk_text(document(), 400)
+    assert len(chunks) > 4
+    assert all(estimate_tokens(chunk) <= 400 for chunk in chunks)
+
+
+def test_edit_only_moves_nearby_chunk_boundaries():
+    before = chunk_text(document(), 400)
+    after = chunk_text(document(edited=60), 400)
+    assert len(set(before) - set(after)) <= 2
+
+
+def test_long_text_is_mapped_and_reduced():
+    model = StubModel()
+    summary = asyncio.run(summarizer(model).summarize(document()))
+    assert summary.startswith("Summary ")
+    chunks = chunk_text(document(), 400)
+    # One call per chunk, then at least one reduce call.
+    assert len(model.prompts) > len(chunks)
+
+
+def test_edited_document_only_resummarizes_changed_chunks(tmp_path):
+    model = StubModel()
+    store = ContentStore(str(tmp_path))
+    first = summarizer(model, store)
+    asyncio.run(first.summarize(document()))
+    calls_cold = first.model_calls
+
+    # A second summarizer over the same store, as after a restart.
+    second = summarizer(model, store)
+    asyncio.run(second.summarize(document()))
+    assert second.model_calls == 0
+    assert second.cache_hits > 0
+
+    edited = summarizer(model, store)
+    asyncio.run(edited.summarize(document(edited=60)))
+    assert 0 < edited.model_calls < calls_cold / 2
+    assert edited.cache_hits >= len(chunk_text(document(), 400)) - 2
+
+
+def test_another_model_does_not_reuse_cached_summaries(tmp_path):
+    model = StubModel()
+    store = ContentStore(str(tmp_path))
+    asyncio.run(summarizer(model, store).summarize(document()))
+
+    switched = summarizer(model, store, name="other-model")
+    asyncio.run(switched.summarize(document()))
+    assert switched.cache_hits == 0
+
+
+def test_store_io_runs_off_the_event_loop(tmp_path):
+    store = ContentStore(str(tmp_path))
+    loop_threads, store_threads = set(), []
+
+    class RecordingStore:
+        def get(self, key):
+            store_threads.append(threading.get_ident())
+            return store.get(key)
+
+        def put(self, key, data):
+            store_threads.append(threading.get_ident())
+            return store.put(key, data)
+
+    async def run():
+        loop_threads.add(threading.get_ident())
+        await summarizer(StubModel(), RecordingStore()).summarize(document())
+
+    asyncio.run(run())
+    assert store_threads and loop_threads.isdisjoint(store_threads)
+
+
+def test_before_model_keeps_the_users_instructions():
+    model = StubModel()
+    message = "Summarize this in 3 bullets in Korean:\n" + document() + "\nKeep the numbers."
+    request = SimpleNamespace(contents=[types.Content(role="user", parts=[types.Part(text=message)])])
+    asyncio.run(summarizer(model).before_model(None, request))
+
+    parts = [part.text for part in request.contents[-1].parts]
+    assert parts[0] == "Summarize this in 3 bullets in Korean:"
+    assert parts[1].startswith(CONDENSED_HEADER)
+    assert parts[-1] == "Keep the numbers."
+    assert estimate_tokens("".join(parts)) < estimate_tokens(message) / 4
+
+
+def test_short_messages_are_left_alone():
+    model = StubModel()
+    request = SimpleNamespace(contents=[types.Content(role="user", parts=[types.Part(text="Summarize: hi")])])
+    asyncio.run(summarizer(model).before_model(None, request))
+    assert request.contents[-1].parts[0].text == "Summarize: hi"
+    assert model.prompts == []
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+import trace_view
+from allinone import tracing
+
+
+class ScriptedLlm(BaseLlm):
+    """Calls `tool` with `args` on the first request of a turn and answers once the tool returned."""
+
+    tool: str = ""
+    args: dict = {}
+
+    async def generate_content_async(self, llm_request, stream=False):
+        last = llm_request.contents[-1]
+        if self.tool and not any(part.function_response for part in last.parts or []):
+            part = types.Part(function_call=types.FunctionCall(name=self.tool, args=self.args))
+        else:
+            part = types.Part(text="done")
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=10, candidates_token_count=2, total_token_count=12),
+        )
+
+
+@tracing.traced("lookup.load")
+def load(word):
+    return {"word": word, "length": len(word)}
+
+
+def lookup(word: str) -> dict:
+    """Looks up a word."""
+    return load(word)
+
+
+def run_turn(tracer):
+    child = LlmAgent(name="Child", model=ScriptedLlm(model="child-model", tool="lookup", args={"word": "cache"}),
+                     tools=[lookup])
+    root = LlmAgent(name="Root", model=ScriptedLlm(model="root-model", tool="Child", args={"request": "cache"}),
+                    tools=[AgentTool(child)])
+    tracer.instrument(child)
+    tracer.instrument(root)
+
+    async def run():
+        runner = InMemoryRunner(agent=root, app_name="test")
+        session = await runner.session_service.create_session(app_name="test", user_id="user")
+        message = types.Content(role="user", parts=[types.Part(text="What about cache?")])
+        events = [event async for event in runner.run_async(user_id="user", session_id=session.id,
+                                                             new_message=message)]
+        await runner.close()
+        return events
+
+    return asyncio.run(run())
+
+
+def test_a_turn_is_recorded_as_one_span_tree(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    # `@traced` records to the process-wide tracer, so the turn is traced with it too.
+    monkeypatch.setattr(tracing.tracer, "exporters", [tracing.JsonlExporter(path)])
+    events = run_turn(tracing.tracer)
+    assert events[-1].content.parts[0].text == "done"
+
+    trace_id = trace_view.trace_id_from_events([event.model_dump(by_alias=True) for event in events])
+    spans = trace_view.load_trace(path, trace_id)
+    assert len(spans) == 9
+    assert all(span["end"] is not None for span in spans)
+
+    by_id = {span["span_id"]: span for span in spans}
+    parents = {(span["kind"], span["name"]): (by_id[span["parent_id"]]["kind"], by_id[span["parent_id"]]["name"])
+               if span["parent_id"] else None for span in spans}
+    assert parents == {
+        ("agent", "Root"): None,
+        ("model", "root-model"): ("agent", "Root"),
+        ("tool", "Child"): ("agent", "Root"),
+        # The sub-agent runs inside the AgentTool call, under a new invocation ID.
+        ("agent", "Child"): ("tool", "Child"),
+        ("model", "child-model"): ("agent", "Child"),
+        ("tool", "lookup"): ("agent", "Child"),
+        ("function", "lookup.load"): ("tool", "lookup"),
+    }
+
+    rows = trace_view.waterfall_rows(spans)
+    assert [row["span"] for row in rows] == [
+        "00 agent: Root",
+        "01   model: root-model",
+        "02   tool: Child",
+        "03     agent: Child",
+        "04       model: child-model",
+        "05       tool: lookup",
+        "06         function: lookup.load",
+        "07       model: child-model",
+        "08   model: root-model",
+    ]
+    assert rows[0]["start_ms"] == 0.0
+    assert all(row["start_ms"] <= row["end_ms"] for row in rows)
+    assert [row["tokens"] for row in rows if row["kind"] == "model"] == [12, 12, 12, 12]
+    assert rows[5]["request_bytes"] == len('{"word": "cache"}')
+    assert rows[6]["response_bytes"] == len('{"word": "cache", "length": 5}')
+
+
+def test_traced_records_errors_and_restores_the_parent(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setattr(tracing, "tracer", tracing.Tracer([tracing.JsonlExporter(path)]))
+
+    @tracing.traced("failing")
+    def failing():
+        raise ValueError("boom")
+
+    root = tracing.tracer.start_span("root", "agent", trace_id="t1")
+    with pytest.raises(ValueError):
+        failing()
+    assert tracing._current_span.get() is root
+    tracing.tracer.end_span(root)
+    assert tracing._current_span.get() is None
+
+    [span, _] = trace_view.load_trace(path, "t1")
+    assert (span["name"], span["parent_id"]) == ("failing", root.span_id)
+    assert span["attributes"]["error"] == "ValueError: boom"
@@ -0,0 +1,132 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from youtube_transcript_api import TranscriptList
+
+from allinone import youtube
+
+
+def transcript_list(video_id, languages):
+    """Returns a real TranscriptList of stub transcripts, manually created in `languages`."""
+    transcripts = {
+        code: SimpleNamespace(language_code=code, fetch=lambda code=code: [
+            SimpleNamespace(text=f"{video_id} line {i}" + ("" if code == "en" else f" ({code})"),
+                            start=i * 2.0, duration=2.0)
+            for i in range(3)
+        ])
+        for code in languages
+    }
+    return TranscriptList(video_id, transcripts, {}, [])
+
+
+class StubTranscriptApi:
+    """Stands in for YouTubeTranscriptApi and counts the transcript lists it returns."""
+
+    calls = 0
+    languages = ("en",)
+
+    def list(self, video_id):
+        StubTranscriptApi.calls += 1
+        return transcript_list(video_id, self.languages)
+
+
+def stats():
+    """Returns the (hits, misses) of the transcript cache."""
+    counters = youtube.get_transcript_cache().stats()
+    return counters["hits"], counters["misses"]
+
+
+@pytest.fixture
+def transcript_api(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRANSCRIPT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("TRANSCRIPT_CACHE_TTL", "60")
+    monkeypatch.setattr(youtube, "YouTubeTranscriptApi", StubTranscriptApi)
+    StubTranscriptApi.calls = 0
+    StubTranscriptApi.languages = ("en",)
+    youtube.get_transcript_cache.cache_clear()
+    yield StubTranscriptApi
+    youtube.get_transcript_cache.cache_clear()
+
+
+def test_second_call_is_served_from_the_cache(transcript_api):
+    first = youtube.get_transcript_segments("abc")
+    second = youtube.get_transcript_segments("abc")
+    assert second == first
+    assert first[1] == {"text": "abc line 1", "start": 2.0, "duration": 2.0}
+    assert transcript_api.calls == 1
+    assert youtube.get_transcript_cache().stats()["hits"] == 1
+
+
+def test_entries_expire_after_the_ttl(transcript_api, monkeypatch):
+    youtube.get_transcript_segments("abc")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    youtube.get_transcript_segments("abc")
+    assert transcript_api.calls == 2
+
+
+def test_entries_survive_a_restart(transcript_api):
+    youtube.get_transcript_segments("abc")
+    # A new process starts with an empty in-memory front over the same directory.
+    youtube.get_transcript_cache.cache_clear()
+    assert youtube.get_transcript_segments("abc")[0]["text"] == "abc line 0"
+    assert transcript_api.calls == 1
+    assert youtube.get_transcript_cache().stats()["memory_hits"] == 0
+
+
+
+def test_preferred_languages_come_first(transcript_api):
+    transcript_api.languages = ("de", "en", "ko")
+    assert youtube.get_transcript_segments("abc")[0]["text"] == "abc line 0 (ko)"
+
+
+def test_falls_back_to_the_first_available_language(transcript_api):
+    transcript_api.languages = ("de", "fr")
+    assert youtube.get_transcript_segments("abc")[0]["text"] == "abc line 0 (de)"
+
+
+def test_videos_without_transcripts_return_none(transcript_api):
+    transcript_api.languages = ()
+    assert youtube.get_transcript_segments("abc") is None
+
+
+def test_windows_reuse_the_decoded_timeline(transcript_api, monkeypatch):
+    youtube.get_transcript_segments("abc")
+    youtube.get_transcript_cache.cache_clear()
+    first = youtube.get_transcript_timeline("abc")
+    assert first[1] == [0.0, 2.0, 4.0]
+
+    # Later window reads neither decode the stored transcript nor rebuild the start times.
+    def fail(data):
+        raise AssertionError("decoded again")
+
+    monkeypatch.setattr(json, "loads", fail)
+    assert youtube.get_transcript_timeline("abc") is first
+    window = list(youtube.iter_transcript_segments("abc", start_seconds=3.0))
+    assert [segment["start"] for segment in window] == [2.0, 4.0]
+
+
+def test_stats_count_every_read_once(transcript_api):
+    url = "https://www.youtube.com/watch?v=abc"
+    youtube.get_transcript_segments("abc")
+    assert stats() == (0, 1)
+    youtube.get_transcript_segments("abc")
+    assert stats() == (1, 1)
+    # The window and full-text tools check the transcript exists, then read it.
+    youtube.get_youtube_transcript_window(url, start_minute=0.05)
+    assert stats() == (3, 1)
+    for _ in range(3):
+        youtube.get_youtube_transcript(url)
+    assert stats() == (9, 1)
+    assert transcript_api.calls == 1
+
+
+def test_expired_timelines_are_refetched(transcript_api, monkeypatch):
+    youtube.get_transcript_timeline("abc")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert youtube.get_transcript_timeline("abc")[0][0]["text"] == "abc line 0"
+    assert transcript_api.calls == 2
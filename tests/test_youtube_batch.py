@@ -0,0 +1,53 @@
+import pytest
+
+from allinone import youtube
+
+
+@pytest.fixture
+def fetched(tmp_path, monkeypatch):
+    """Replaces transcript fetching with a stub that records the fetched video IDs."""
+    monkeypatch.setenv("TRANSCRIPT_CACHE_DIR", str(tmp_path))
+    youtube.get_transcript_cache.cache_clear()
+    calls = []
+
+    def fetch(video_id, max_chars):
+        calls.append(video_id)
+        if video_id.startswith("x"):
+            return {"video_id": video_id, "error": "No transcript available in any language."}
+        return {"video_id": video_id, "transcript": f"transcript of {video_id}"}
+
+    monkeypatch.setattr(youtube, "_fetch_transcript_result", fetch)
+    yield calls
+    youtube.get_transcript_cache.cache_clear()
+
+
+def url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def test_results_keep_the_order_of_the_inputs(fetched):
+    batch = youtube.get_youtube_transcripts([url("aaaaaaaaaaa"), "not a url", url("xbbbbbbbbbb"), url("aaaaaaaaaaa")])
+    assert [video.get("video_id", video.get("url")) for video in batch["videos"]] == \
+        ["aaaaaaaaaaa", "not a url", "xbbbbbbbbbb", "aaaaaaaaaaa"]
+    assert (batch["succeeded"], batch["failed"]) == (2, 2)
+    assert sorted(fetched) == ["aaaaaaaaaaa", "xbbbbbbbbbb"]
+
+
+def test_playlist_videos_follow_the_urls(fetched, monkeypatch):
+    monkeypatch.setattr(youtube, "get_playlist_video_ids",
+                        lambda playlist_id: (["ccccccccccc", "aaaaaaaaaaa", "ddddddddddd"], True))
+    batch = youtube.get_youtube_transcripts([url("aaaaaaaaaaa")], playlist_id="PL1")
+    assert [video["video_id"] for video in batch["videos"]] == ["aaaaaaaaaaa", "ccccccccccc", "ddddddddddd"]
+    assert batch["playlist"]["truncated"] is True
+    assert batch["playlist"]["videos"] == 3
+
+
+def test_playlist_errors_take_the_playlists_place(fetched, monkeypatch):
+    def fail(playlist_id):
+        raise OSError("offline")
+
+    monkeypatch.setattr(youtube, "get_playlist_video_ids", fail)
+    batch = youtube.get_youtube_transcripts(["not a url", url("aaaaaaaaaaa")], playlist_id="PL1")
+    assert [video.get("video_id") or video.get("url") or video["playlist_id"] for video in batch["videos"]] == \
+        ["not a url", "aaaaaaaaaaa", "PL1"]
+    assert "playlist" not in batch
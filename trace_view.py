@@ -0,0 +1,75 @@
+# trace_view.py
+import json
+import os
+
+
+def default_trace_path():
+    """
+    Returns the JSONL trace file written by the agent's tracer by default.
+    """
+    base = os.getenv("GEMAGENT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "gemagent"))
+    return os.getenv("TRACE_JSONL_PATH", os.path.join(base, "traces", "traces.jsonl"))
+
+
+def trace_id_from_events(events):
+    """
+    Returns the invocation ID of a turn, which is the trace ID of its spans.
+    """
+    for event in events or []:
+        if event.get("invocationId"):
+            return event["invocationId"]
+    return None
+
+
+def load_trace(path, trace_id):
+    """
+    Reads the spans of one trace from the JSONL file and its rotated predecessor.
+    """
+    spans = []
+    for file_path in (f"{path}.1", path):
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    # Cheap substring check before parsing every line of a large file.
+                    if trace_id in line:
+                        span = json.loads(line)
+                        if span.get("trace_id") == trace_id:
+                            spans.append(span)
+        except OSError:
+            continue
+    return spans
+
+
+def waterfall_rows(spans):
+    """
+    Orders spans depth-first by start time and returns one row per span for a waterfall chart,
+    with start/end offsets in milliseconds from the start of the trace.
+    """
+    if not spans:
+        return []
+    ids = {span["span_id"] for span in spans}
+    children = {}
+    for span in spans:
+        parent = span["parent_id"] if span["parent_id"] in ids else None
+        children.setdefault(parent, []).append(span)
+
+    trace_start = min(span["start"] for span in spans)
+    rows = []
+
+    def visit(parent, depth):
+        for span in sorted(children.get(parent, []), key=lambda s: s["start"]):
+            attributes = span.get("attributes", {})
+            rows.append({
+                "span": f"{len(rows):02d} {'  ' * depth}{span['kind']}: {span['name']}",
+                "kind": span["kind"],
+                "start_ms": round((span["start"] - trace_start) * 1000, 1),
+                "end_ms": round(((span["end"] or span["start"]) - trace_start) * 1000, 1),
+                "duration_ms": span.get("duration_ms"),
+                "tokens": attributes.get("total_tokens"),
+                "request_bytes": attributes.get("request_bytes", attributes.get("args_bytes")),
+                "response_bytes": attributes.get("response_bytes"),
+            })
+            visit(span["span_id"], depth + 1)
+
+    visit(None, 0)
+    return rows